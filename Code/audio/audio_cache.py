@@ -0,0 +1,126 @@
+from __future__ import annotations
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+
+class AudioCache:
+    """
+    合成好的朗读音频缓存：<root>/<前两位>/<sha256>.wav，键 = 文本 + 音色 + 语速。
+    按总大小做 LRU 淘汰：命中时刷新文件 mtime，启动时按 mtime 重建顺序，跨进程保持。
+    同一段开场白 / 重复的句子第二次起直接播放，不再合成。
+    """
+
+    def __init__(self, root: Path, *, max_bytes: int = 200 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: Optional[OrderedDict[str, int]] = None  # key -> 字节数，旧 -> 新
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str, voice_id: str, rate: int) -> str:
+        return hashlib.sha256(f"{voice_id}\0{rate}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.wav"
+
+    def _load(self) -> OrderedDict[str, int]:
+        # 首次使用时扫描目录（在朗读线程里，不占启动时间）
+        if self._entries is None:
+            found = []
+            if self.root.exists():
+                for p in self.root.glob("*/*.wav"):
+                    try:
+                        st = p.stat()
+                    except OSError:
+                        continue
+                    found.append((st.st_mtime, p.stem, st.st_size))
+            found.sort()
+            self._entries = OrderedDict((k, size) for _, k, size in found)
+            self._total = sum(self._entries.values())
+        return self._entries
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            self._load()
+            return self._total
+
+    def get(self, key: str) -> Optional[Path]:
+        with self._lock:
+            entries = self._load()
+            if key not in entries:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                os.utime(path)
+            except OSError:
+                # 文件被外部删掉了
+                self._total -= entries.pop(key)
+                self.misses += 1
+                return None
+            entries.move_to_end(key)
+            self.hits += 1
+            return path
+
+    def put(self, key: str, render: Callable[[Path], bool]) -> Optional[Path]:
+        """
+        render(tmp_path) 把音频写到临时文件，成功后原子改名进缓存并按需淘汰旧文件。
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{key}.{threading.get_ident()}.tmp.wav")
+        try:
+            if not render(tmp) or not tmp.exists():
+                return None
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                try:
+                    tmp.unlink()
+                except OSError:
+                    pass
+        size = path.stat().st_size
+        with self._lock:
+            entries = self._load()
+            self._total += size - entries.pop(key, 0)
+            entries[key] = size
+            self._evict_locked(keep=key)
+        return path
+
+    def get_or_render(self, text: str, voice_id: str, rate: int, render: Callable[[str, Path], bool]) -> Optional[Path]:
+        key = self.key(text, voice_id, rate)
+        path = self.get(key)
+        if path is not None:
+            return path
+        return self.put(key, lambda tmp: render(text, tmp))
+
+    def _evict_locked(self, *, keep: str) -> None:
+        entries = self._entries
+        while self._total > self.max_bytes and len(entries) > 1:
+            key, size = next(iter(entries.items()))
+            if key == keep:
+                break
+            del entries[key]
+            self._total -= size
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._load()):
+                try:
+                    self._path(key).unlink()
+                except OSError:
+                    pass
+            self._entries = OrderedDict()
+            self._total = 0
@@ -0,0 +1,97 @@
+from __future__ import annotations
+import re
+
+from core.general_tools import markdown_to_text
+
+# 句末标点（英文句点另判：后面必须跟空白，避免把 3.5 / a.b 切开）
+_ENDS = frozenset("。！？!?…；;\n")
+# 句末标点之后仍属于本句的收尾字符
+_CLOSERS = frozenset("”’」』）)》\"'")
+# 超长无句末标点时，优先在这些位置切开
+_SOFT = "，,、：:—"
+# markdown_to_text 之后仍残留的标记（跨句的 ** / ` 等），朗读时去掉
+_SYMBOLS = re.compile(r"[*_`#>|~]+")
+_SPEAKABLE = re.compile(r"\w")
+
+
+class SentenceSegmenter:
+    """
+    把流式到达的文本切成完整的句子，供朗读队列逐句播放。
+    feed() 每次只扫描新到达的部分；过短的句子（如“啊！”）与下一句合并，
+    超过 max_chars 仍无句末标点时在逗号等处强制切开；flush() 取出剩余部分。
+    """
+
+    def __init__(self, *, min_chars: int = 6, max_chars: int = 120):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buf = ""
+        self._scan = 0
+
+    @staticmethod
+    def _end_at(buf: str, i: int) -> int:
+        """
+        1：i 处是句末；0：不是；-1：还不能确定（句点在末尾，要看下一块）。
+        """
+        ch = buf[i]
+        if ch in _ENDS:
+            return 1
+        if ch == ".":
+            if i + 1 >= len(buf):
+                return -1
+            return 1 if buf[i + 1].isspace() else 0
+        return 0
+
+    @staticmethod
+    def clean(text: str) -> str:
+        return _SYMBOLS.sub("", markdown_to_text(text)).strip()
+
+    def _emit(self, seg: str, out: list[str], *, force: bool = False) -> bool:
+        text = self.clean(seg)
+        if len(text) < self.min_chars and not force:
+            return False
+        if _SPEAKABLE.search(text):
+            out.append(text)
+        return True
+
+    def feed(self, text: str) -> list[str]:
+        if not text:
+            return []
+        self._buf += text
+        buf, n = self._buf, len(self._buf)
+        out: list[str] = []
+        start, i = 0, self._scan
+        while i < n:
+            end = self._end_at(buf, i)
+            if end < 0:
+                break
+            if not end:
+                i += 1
+                continue
+            j = i + 1
+            while j < n and (buf[j] in _CLOSERS or self._end_at(buf, j) > 0):
+                j += 1
+            if j >= n:
+                # 标点在末尾：后面可能还有引号 / 省略号，等下一块再定
+                break
+            if self._emit(buf[start:j], out):
+                start = j
+            i = j
+
+        while n - start > self.max_chars:
+            window = buf[start:start + self.max_chars]
+            k = max(window.rfind(c) for c in _SOFT)
+            cut = start + (k + 1 if k >= self.min_chars else self.max_chars)
+            self._emit(buf[start:cut], out, force=True)
+            start = cut
+
+        self._buf = buf[start:]
+        self._scan = max(0, i - start)
+        return out
+
+    def flush(self) -> list[str]:
+        out: list[str] = []
+        if self._buf.strip():
+            self._emit(self._buf, out, force=True)
+        self._buf = ""
+        self._scan = 0
+        return out
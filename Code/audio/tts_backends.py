@@ -0,0 +1,321 @@
+from __future__ import annotations
+import importlib.util
+import shutil
+import subprocess
+import sys
+import threading
+import wave
+from pathlib import Path
+from typing import Callable, Optional
+
+# 各后端的方法除 stop() 外都只在 VoiceManager 的朗读线程里调用；stop() 可以来自任意线程。
+OnStart = Optional[Callable[[], None]]
+
+
+class TTSBackend:
+    """
+    朗读后端接口：
+    - speak(text, on_start)：直接出声，阻塞到说完或被 stop()；开始出声时调用 on_start；
+    - render(text, path)：合成到 WAV 文件（供 AudioCache 缓存），不支持时返回 False；
+    - open() / close()：在朗读线程里初始化 / 释放（COM、引擎等）。
+    voice_id 与 rate 一起作为缓存键的一部分。
+    """
+    name = "base"
+    can_render = False
+
+    def __init__(self, rate: int = 200, voice: str = ""):
+        self.rate = rate
+        self.voice = voice
+
+    @property
+    def voice_id(self) -> str:
+        return f"{self.name}:{self.voice or 'default'}"
+
+    def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def speak(self, text: str, on_start: OnStart = None) -> None:
+        raise NotImplementedError
+
+    def render(self, text: str, path: Path) -> bool:
+        return False
+
+    def stop(self) -> None:
+        pass
+
+
+def _pyttsx3_engine(rate: int):
+    import pyttsx3
+    engine = pyttsx3.init()
+    engine.setProperty("rate", rate)
+    return engine
+
+
+class Pyttsx3Backend(TTSBackend):
+    """
+    pyttsx3（Windows 上为 SAPI5）：引擎在朗读线程内只创建一次，出错后丢弃、下次重建。
+    """
+    name = "pyttsx3"
+    can_render = True
+
+    def __init__(self, rate: int = 200, voice: str = "", *, engine_factory: Optional[Callable[[int], object]] = None):
+        super().__init__(rate, voice)
+        self._engine_factory = engine_factory or _pyttsx3_engine
+        self._engine = None
+        self._on_start: OnStart = None
+        self._stopping = threading.Event()
+        self._com = None
+
+    def open(self) -> None:
+        try:
+            import pythoncom
+        except ImportError:  # 非 Windows：pyttsx3 走 espeak / nsss，不需要 COM
+            return
+        pythoncom.CoInitialize()
+        self._com = pythoncom
+
+    def close(self) -> None:
+        self._engine = None
+        if self._com is not None:
+            self._com.CoUninitialize()
+            self._com = None
+
+    def _ensure_engine(self):
+        if self._engine is None:
+            engine = self._engine_factory(self.rate)
+            if self.voice:
+                engine.setProperty("voice", self.voice)
+
+            def on_utterance(name):
+                cb, self._on_start = self._on_start, None
+                if cb is not None:
+                    cb()
+
+            def on_word(name, location, length):
+                # 在引擎自己的回调里停下，引擎状态保持完好，可以继续复用
+                if self._stopping.is_set():
+                    engine.stop()
+
+            engine.connect("started-utterance", on_utterance)
+            engine.connect("started-word", on_word)
+            self._engine = engine
+        return self._engine
+
+    def _run(self, fn) -> None:
+        self._stopping.clear()
+        engine = self._ensure_engine()
+        try:
+            fn(engine)
+            engine.runAndWait()
+        except Exception:
+            self._engine = None
+            raise
+
+    def speak(self, text: str, on_start: OnStart = None) -> None:
+        self._on_start = on_start
+        self._run(lambda e: e.say(text))
+
+    def render(self, text: str, path: Path) -> bool:
+        self._on_start = None
+        self._run(lambda e: e.save_to_file(text, str(path)))
+        # 被 stop() 打断时 WAV 只写了一部分，不能进缓存
+        if self._stopping.is_set():
+            return False
+        return path.exists() and path.stat().st_size > 0
+
+    def stop(self) -> None:
+        self._stopping.set()
+        engine = self._engine
+        if engine is not None:
+            try:
+                engine.stop()
+            except Exception:
+                pass
+
+
+class EspeakBackend(TTSBackend):
+    """
+    espeak-ng / espeak 命令行：Linux 上无需 Python 依赖；每句一个子进程，stop() 直接结束它。
+    """
+    name = "espeak"
+    can_render = True
+
+    def __init__(self, rate: int = 200, voice: str = "cmn", *, exe: Optional[str] = None):
+        super().__init__(rate, voice or "cmn")
+        self.exe = exe or self.find()
+        if self.exe is None:
+            raise FileNotFoundError("未找到 espeak-ng / espeak")
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def find() -> Optional[str]:
+        return shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def _call(self, args: list[str], on_start: OnStart = None) -> int:
+        cmd = [self.exe, "-s", str(self.rate), "-v", self.voice, *args]
+        with self._lock:
+            self._proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if on_start is not None:
+            on_start()
+        try:
+            return self._proc.wait()
+        finally:
+            with self._lock:
+                self._proc = None
+
+    def speak(self, text: str, on_start: OnStart = None) -> None:
+        self._call(["--", text], on_start)
+
+    def render(self, text: str, path: Path) -> bool:
+        return self._call(["-w", str(path), "--", text]) == 0 and path.exists()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None:
+                self._proc.terminate()
+
+
+def write_silence(path: Path, seconds: float, *, rate: int = 16000) -> None:
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\0\0" * int(seconds * rate))
+
+
+def wav_seconds(path: Path) -> float:
+    with wave.open(str(path), "rb") as w:
+        return w.getnframes() / float(w.getframerate() or 1)
+
+
+class FileBackend(TTSBackend):
+    """
+    离线替身：不出声，按 chars_per_s 的语速生成等长的静音 WAV / 等待相应时长。
+    用于没有语音引擎的机器、基准测试与缓存逻辑的验证。
+    """
+    name = "file"
+    can_render = True
+
+    def __init__(self, rate: int = 200, voice: str = "", *, chars_per_s: float = 6.0):
+        super().__init__(rate, voice)
+        self.chars_per_s = chars_per_s
+        self._stopping = threading.Event()
+
+    def duration(self, text: str) -> float:
+        return len(text) / self.chars_per_s if self.chars_per_s > 0 else 0.0
+
+    def speak(self, text: str, on_start: OnStart = None) -> None:
+        self._stopping.clear()
+        if on_start is not None:
+            on_start()
+        self._stopping.wait(self.duration(text))
+
+    def render(self, text: str, path: Path) -> bool:
+        write_silence(path, self.duration(text))
+        return True
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+
+class WavPlayer:
+    """
+    播放缓存的 WAV：Windows 用 winsound（标准库），其他平台用找到的第一个命令行播放器。
+    play() 阻塞到播完或 stop()；available 为 False 时 VoiceManager 不走缓存，直接让后端出声。
+    """
+    _COMMANDS = (("paplay",), ("aplay", "-q"), ("afplay",), ("ffplay", "-nodisp", "-autoexit", "-loglevel", "quiet"))
+
+    def __init__(self, command: Optional[list[str]] = None):
+        self._winsound = None
+        self._cmd = command
+        if command is None:
+            if sys.platform == "win32":
+                import winsound
+                self._winsound = winsound
+            else:
+                for c in self._COMMANDS:
+                    exe = shutil.which(c[0])
+                    if exe:
+                        self._cmd = [exe, *c[1:]]
+                        break
+        self._proc: Optional[subprocess.Popen] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self._winsound is not None or bool(self._cmd)
+
+    def play(self, path: Path, on_start: OnStart = None) -> None:
+        self._stopping.clear()
+        if self._winsound is not None:
+            ws = self._winsound
+            ws.PlaySound(str(path), ws.SND_FILENAME | ws.SND_ASYNC)
+            if on_start is not None:
+                on_start()
+            if self._stopping.wait(wav_seconds(path)):
+                ws.PlaySound(None, ws.SND_PURGE)
+            return
+        with self._lock:
+            self._proc = subprocess.Popen([*self._cmd, str(path)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if on_start is not None:
+            on_start()
+        try:
+            self._proc.wait()
+        finally:
+            with self._lock:
+                self._proc = None
+
+    def stop(self) -> None:
+        self._stopping.set()
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None:
+                self._proc.terminate()
+
+
+class SilentPlayer(WavPlayer):
+    """
+    不出声，只按 WAV 时长等待；配合 FileBackend 使用。
+    """
+
+    def __init__(self):
+        super().__init__(command=[])
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    def play(self, path: Path, on_start: OnStart = None) -> None:
+        self._stopping.clear()
+        if on_start is not None:
+            on_start()
+        self._stopping.wait(wav_seconds(path))
+
+
+BACKENDS = {"pyttsx3": Pyttsx3Backend, "espeak": EspeakBackend, "file": FileBackend}
+
+
+def make_backend(name: str = "auto", *, rate: int = 200, voice: str = "") -> TTSBackend:
+    """
+    auto：Windows 用 pyttsx3（SAPI5）；其他平台优先 espeak 命令行，其次已安装的 pyttsx3，都没有时用静音替身。
+    """
+    if name != "auto":
+        return BACKENDS[name](rate, voice)
+    if sys.platform == "win32":
+        return Pyttsx3Backend(rate, voice)
+    if EspeakBackend.find():
+        return EspeakBackend(rate, voice)
+    # 只确认已安装，真正导入 pyttsx3 留到朗读线程第一次出声
+    if importlib.util.find_spec("pyttsx3") is not None:
+        return Pyttsx3Backend(rate, voice)
+    print("[voice] 未找到可用的语音引擎，朗读将静音")
+    return FileBackend(rate, voice)
+
+
+def default_player(backend: TTSBackend) -> WavPlayer:
+    return SilentPlayer() if isinstance(backend, FileBackend) else WavPlayer()
+
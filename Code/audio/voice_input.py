@@ -0,0 +1,268 @@
+from __future__ import annotations
+import json
+import queue
+import re
+import threading
+import time
+import wave
+from collections import deque
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+# Vosk 中文模型逐词输出、词间带空格；汉字之间的空格去掉，英文单词之间保留
+_CJK_SPACE = re.compile(r"(?<=[\u3000-\u9fff\uff00-\uffef])\s+(?=[\u3000-\u9fff\uff00-\uffef])")
+
+
+def join_cjk(text: str) -> str:
+    return _CJK_SPACE.sub("", text).strip()
+
+
+class MicrophoneSource:
+    """
+    麦克风（PyAudio）：16kHz 单声道 16bit，每块 block_ms 毫秒。
+    """
+    # 实时音源：识别跟不上时丢弃旧数据，而不是让录音端等待
+    live = True
+
+    def __init__(self, *, sample_rate: int = 16000, block_ms: int = 100, device_index: Optional[int] = None):
+        self.sample_rate = sample_rate
+        self.block_frames = sample_rate * block_ms // 1000
+        self.device_index = device_index
+        self._closed = threading.Event()
+
+    def blocks(self) -> Iterator[bytes]:
+        import pyaudio
+        pa = pyaudio.PyAudio()
+        stream = pa.open(format=pyaudio.paInt16, channels=1, rate=self.sample_rate, input=True,
+                         frames_per_buffer=self.block_frames, input_device_index=self.device_index)
+        try:
+            while not self._closed.is_set():
+                yield stream.read(self.block_frames, exception_on_overflow=False)
+        finally:
+            stream.stop_stream()
+            stream.close()
+            pa.terminate()
+
+    def close(self) -> None:
+        self._closed.set()
+
+
+class WavFileSource:
+    """
+    WAV 文件（单声道 16bit PCM），用于测试与基准；realtime=True 时按实际时长匀速送出，模拟麦克风
+    （此时与麦克风一样，识别跟不上会丢块），否则尽快送出且不丢块。
+    """
+
+    def __init__(self, path: Path, *, block_ms: int = 100, realtime: bool = False):
+        self.path = path
+        self.block_ms = block_ms
+        self.realtime = realtime
+        self.live = realtime
+        with wave.open(str(path), "rb") as w:
+            if w.getnchannels() != 1 or w.getsampwidth() != 2:
+                raise ValueError(f"需要单声道 16bit PCM WAV：{path}")
+            self.sample_rate = w.getframerate()
+        self._closed = threading.Event()
+
+    def blocks(self) -> Iterator[bytes]:
+        n = self.sample_rate * self.block_ms // 1000
+        t0 = time.perf_counter()
+        sent = 0.0
+        with wave.open(str(self.path), "rb") as w:
+            while not self._closed.is_set():
+                data = w.readframes(n)
+                if not data:
+                    break
+                if self.realtime:
+                    sent += len(data) / 2 / self.sample_rate
+                    delay = t0 + sent - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                yield data
+
+    def close(self) -> None:
+        self._closed.set()
+
+
+def _vosk_recognizer(model_dir: Path, sample_rate: int):
+    from vosk import KaldiRecognizer, Model, SetLogLevel
+    SetLogLevel(-1)
+    return KaldiRecognizer(Model(str(model_dir)), sample_rate)
+
+
+class VoiceInput:
+    """
+    离线语音输入：采集线程把音频块放进有界队列，识别线程逐块送进 Vosk。
+    - 识别中的部分结果变化时回调 on_partial(text)，一句话结束时回调 on_final(text)；
+    - 队列满（识别跟不上）时丢弃最旧的块，延迟不会随会话变长而累积；
+    - 单句超过 max_utterance_s 强制断句，避免解码图越积越大、部分结果越来越慢；
+    - muted() 为 True 期间（朗读中）不识别，避免把朗读声当成玩家发言。
+    回调在识别线程里执行，界面代码需自行投递回 Tk 主线程。
+    """
+
+    def __init__(self, model_dir: Path, *, on_partial: Callable[[str], None], on_final: Callable[[str], None],
+                 on_error: Optional[Callable[[BaseException], None]] = None,
+                 max_queue_blocks: int = 30, max_utterance_s: float = 20.0,
+                 recognizer_factory: Optional[Callable[[Path, int], object]] = None,
+                 muted: Optional[Callable[[], bool]] = None):
+        self.model_dir = model_dir
+        self.on_partial = on_partial
+        self.on_final = on_final
+        self.on_error = on_error
+        self.max_utterance_s = max_utterance_s
+        # muted() 为 True 时（例如正在朗读）丢弃音频并清空识别中的半句，不产生任何结果
+        self.muted = muted
+        self._factory = recognizer_factory or _vosk_recognizer
+        self._q: queue.Queue[Optional[bytes]] = queue.Queue(maxsize=max_queue_blocks)
+        self._source = None
+        self._threads: list[threading.Thread] = []
+        self._worker: Optional[threading.Thread] = None
+        self._recognizers: dict[int, object] = {}
+        self.dropped_blocks = 0
+        # 每块的识别耗时（秒），最近若干块；用于确认识别速度跟得上
+        self.decode_times: deque[float] = deque(maxlen=200)
+        self.last_error: Optional[BaseException] = None
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self, source, *, join_timeout: float = 1.0) -> bool:
+        """
+        开始识别 source。上一次的线程还没结束（例如关掉后马上又打开、模型还在加载）时先停止并等待
+        join_timeout 秒；仍未结束则返回 False，不启动，调用方稍后重试。
+        """
+        if self.running:
+            self.stop()
+            self.join(join_timeout)
+            if self.running:
+                source.close()
+                return False
+        self._source = source
+        self.dropped_blocks = 0
+        self.last_error = None
+        self._q = queue.Queue(maxsize=self._q.maxsize)
+        self._worker = threading.Thread(target=self._recognize, args=(source.sample_rate, self._q),
+                                        name="voice-recognize", daemon=True)
+        self._threads = [
+            threading.Thread(target=self._capture, args=(source, self._q), name="voice-capture", daemon=True),
+            self._worker,
+        ]
+        for t in self._threads:
+            t.start()
+        return True
+
+    def stop(self) -> None:
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        for t in self._threads:
+            t.join(timeout)
+
+    def _put(self, q: queue.Queue, item: Optional[bytes]) -> None:
+        while True:
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                    self.dropped_blocks += 1
+                except queue.Empty:
+                    pass
+
+    def _put_wait(self, q: queue.Queue, item: Optional[bytes]) -> bool:
+        # 非实时的文件：不丢数据，读取端等待识别；识别线程已退出时放弃
+        while True:
+            try:
+                q.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                if not self._worker.is_alive():
+                    return False
+
+    def _capture(self, source, q: queue.Queue) -> None:
+        try:
+            for data in source.blocks():
+                if source.live:
+                    self._put(q, data)
+                elif not self._put_wait(q, data):
+                    return
+        except Exception as e:
+            self._fail(e, "录音失败")
+        finally:
+            if source.live:
+                self._put(q, None)
+            else:
+                self._put_wait(q, None)
+
+    def _fail(self, e: BaseException, what: str) -> None:
+        self.last_error = e
+        print(f"[voice-input] {what}：{e}")
+        if self.on_error is not None:
+            self.on_error(e)
+
+    def _recognizer(self, sample_rate: int):
+        # 模型加载较慢（数百 MB），同一采样率只建一次，识别器在句间 Reset 复用
+        rec = self._recognizers.get(sample_rate)
+        if rec is None:
+            rec = self._recognizers[sample_rate] = self._factory(self.model_dir, sample_rate)
+        return rec
+
+    def _recognize(self, sample_rate: int, q: queue.Queue) -> None:
+        try:
+            rec = self._recognizer(sample_rate)
+        except Exception as e:
+            self._fail(e, "加载识别模型失败")
+            self.stop()
+            return
+        try:
+            partial = ""
+            utter_s = 0.0
+            while True:
+                data = q.get()
+                if data is None:
+                    break
+                if self.muted is not None and self.muted():
+                    if utter_s or partial:
+                        rec.Reset()
+                        utter_s = 0.0
+                        if partial:
+                            partial = ""
+                            self.on_partial("")
+                    continue
+                t0 = time.perf_counter()
+                if rec.AcceptWaveform(data):
+                    text = join_cjk(json.loads(rec.Result()).get("text", ""))
+                    utter_s = 0.0
+                    partial = ""
+                    if text:
+                        self.on_final(text)
+                else:
+                    utter_s += len(data) / 2 / sample_rate
+                    if utter_s >= self.max_utterance_s:
+                        text = join_cjk(json.loads(rec.FinalResult()).get("text", ""))
+                        rec.Reset()
+                        utter_s = 0.0
+                        partial = ""
+                        if text:
+                            self.on_final(text)
+                    else:
+                        text = join_cjk(json.loads(rec.PartialResult()).get("partial", ""))
+                        if text != partial:
+                            partial = text
+                            self.on_partial(text)
+                self.decode_times.append(time.perf_counter() - t0)
+            # 音源结束（停止录音 / 文件读完）：把最后半句也交出去
+            text = join_cjk(json.loads(rec.FinalResult()).get("text", ""))
+            rec.Reset()
+            if text and not (self.muted is not None and self.muted()):
+                self.on_final(text)
+        except Exception as e:
+            # 解码出错：报告给界面并停止录音，不让线程悄悄退出
+            self._fail(e, "识别失败")
+            # 识别器状态可能已损坏，下次重新创建
+            self._recognizers.pop(sample_rate, None)
+            self.stop()
@@ -1,41 +1,110 @@
 from __future__ import annotations
 import threading
+import time
 from queue import Queue, Empty
-import pythoncom
-import pyttsx3
+from typing import Callable, Optional
+
+from audio.audio_cache import AudioCache
+from audio.tts_backends import TTSBackend, WavPlayer, default_player, make_backend
+
 
 class VoiceManager:
-    def __init__(self, rate: int=200):
-        self.rate = rate
-        self._q: Queue[str] = Queue()
-        self._stop = threading.Event()
+    """
+    朗读：一个常驻工作线程 + 一个可替换的 TTS 后端（见 audio/tts_backends.py）。
+    - speak()：整段朗读，默认打断当前朗读；
+    - begin_stream() + enqueue()：流式朗读，回复还在生成时就逐句排队播放；
+    打断（stop / 新的一段）会让旧的排队句子全部作废，正在说的那句立即停止。
+    配置了 AudioCache 且有可用的播放器时，每句先合成到缓存再播放，重复的句子直接播放缓存。
+    朗读线程（以及后端的 open()：COM / 引擎初始化）推迟到第一次有句子要说时才启动，不勾选朗读就不占线程。
+    """
+    def __init__(self, rate: int=200, *, backend: Optional[TTSBackend] = None, cache: Optional[AudioCache] = None,
+                 player: Optional[WavPlayer] = None):
+        self.backend = backend or make_backend(rate=rate)
+        self.rate = self.backend.rate
+        self.cache = cache if cache is not None and self.backend.can_render else None
+        self.player = player or (default_player(self.backend) if self.cache is not None else None)
+        if self.player is not None and not self.player.available:
+            self.player = None
+        if self.player is None:
+            self.cache = None
+        self._q: Queue[tuple[int, str]] = Queue()
         self._closed = threading.Event()
         self._lock = threading.Lock()
-        self._engine = None
+        # 段号：每次打断 +1，队列里段号不一致的句子直接丢弃
+        self._gen = 0
+        self._speaking_gen: Optional[int] = None
+        self._announced_gen: Optional[int] = None
+        # 每段第一次真正出声时回调 (段号, perf_counter)，用于统计首字到出声的延迟
+        self.on_audio_start: Optional[Callable[[int, float], None]] = None
+
+        self._t: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # 最后一句说完的时刻；busy 在此之后再延续 echo_tail_s 秒，覆盖扬声器余音
+        self.echo_tail_s = 0.6
+        self._last_said = 0.0
+
+    @property
+    def busy(self) -> bool:
+        """
+        正在朗读、还有句子排队，或刚说完不久。语音输入据此忽略识别结果，避免把朗读声当成玩家发言。
+        """
+        if self._q.unfinished_tasks > 0:
+            return True
+        return time.perf_counter() - self._last_said < self.echo_tail_s
+
+    @property
+    def started(self) -> bool:
+        return self._t is not None
 
-        self._t = threading.Thread(target=self._loop, daemon=True)
-        self._t.start()
+    def start(self) -> None:
+        """
+        启动朗读线程；speak / enqueue 会自动调用，界面在勾选朗读时提前调用以便预热后端。
+        """
+        if self._t is not None or self._closed.is_set():
+            return
+        with self._start_lock:
+            if self._t is None:
+                self._t = threading.Thread(target=self._loop, name="voice", daemon=True)
+                self._t.start()
 
     def speak(self, text: str, interrupt: bool=True):
+        self.start()
         with self._lock:
             if interrupt:
-                self.stop()
-                self._drain_queue()
-            self._q.put(text)
+                self._interrupt_locked()
+            self._q.put((self._gen, text))
+
+    def begin_stream(self) -> int:
+        """
+        打断当前朗读，开始新的一段；返回段号，之后 enqueue(text, gen) 追加句子。
+        """
+        with self._lock:
+            self._interrupt_locked()
+            return self._gen
+
+    def enqueue(self, text: str, gen: int) -> None:
+        """
+        可在任意线程调用；段已被打断时忽略。
+        """
+        if text and gen == self._gen:
+            self.start()
+            self._q.put((gen, text))
 
     def stop(self):
-        self._stop.set()
         with self._lock:
-            if self._engine:
-                try:
-                    self._engine.stop()
-                except:
-                    pass
+            self._interrupt_locked()
 
     def close(self):
         self._closed.set()
         self.stop()
+
+    def _interrupt_locked(self) -> None:
+        self._gen += 1
         self._drain_queue()
+        if self._speaking_gen is not None:
+            self.backend.stop()
+            if self.player is not None:
+                self.player.stop()
 
     def _drain_queue(self):
         while True:
@@ -45,34 +114,51 @@ class VoiceManager:
             except Empty:
                 break
 
+    def _on_start(self, gen: int) -> None:
+        if gen != self._announced_gen:
+            self._announced_gen = gen
+            cb = self.on_audio_start
+            if cb is not None:
+                cb(gen, time.perf_counter())
+
+    def _say(self, gen: int, text: str) -> None:
+        def on_start():
+            self._on_start(gen)
+
+        def render(t: str, path) -> bool:
+            ok = self.backend.render(t, path)
+            # 合成期间被打断：文件可能不完整，不放进缓存
+            return ok and gen == self._gen
+
+        if self.cache is not None:
+            path = self.cache.get_or_render(text, self.backend.voice_id, self.backend.rate, render)
+            if path is not None:
+                # 合成期间被打断：不再播放
+                if gen == self._gen:
+                    self.player.play(path, on_start)
+                return
+        if gen == self._gen:
+            self.backend.speak(text, on_start)
+
     def _loop(self):
-        pythoncom.CoInitialize()
+        self.backend.open()
         try:
             while not self._closed.is_set():
-                self._stop.clear()
                 try:
-                    text = self._q.get(timeout=0.2)
+                    gen, text = self._q.get(timeout=0.2)
                 except Empty:
                     continue
 
                 try:
-                    with self._lock:
-                        self._engine = pyttsx3.init()
-                        self._engine.setProperty("rate", self.rate)
-
-                    def on_word(name, location, length):
-                        if self._stop.is_set():
-                            raise RuntimeError("interrupted")
-
-                    self._engine.connect("started-word", on_word)
-                    self._engine.say(text)
-                    self._engine.runAndWait()
-
-                except RuntimeError:
-                    pass
+                    if gen != self._gen:
+                        continue
+                    self._speaking_gen = gen
+                    self._say(gen, text)
+                except Exception as e:
+                    print(f"[voice] 朗读失败：{e}")
                 finally:
-                    with self._lock:
-                        self._engine = None
+                    self._speaking_gen = None
+                    self._last_said = time.perf_counter()
                     self._q.task_done()
         finally:
-            pythoncom.CoUninitialize()
+            self.backend.close()
@@ -0,0 +1,77 @@
+"""
+对比 LLMClient 长连接复用 vs 每次新建 OpenAI() 的单请求开销。
+
+用法（在 Code/ 目录下）：
+    python -m bench.bench_llm_client --requests 200
+"""
+from __future__ import annotations
+import argparse
+import statistics
+import time
+
+from openai import OpenAI
+
+from bench.fake_llm_server import FakeLLMServer
+from llm.llm_client import LLMClient
+
+MESSAGES = [{"role": "user", "content": "你好"}]
+
+
+def _summary(name: str, samples: list[float]) -> str:
+    ms = sorted(x * 1000 for x in samples)
+    p95 = ms[int(len(ms) * 0.95) - 1] if len(ms) >= 20 else ms[-1]
+    return f"{name:<14} mean={statistics.mean(ms):7.2f}ms  p50={statistics.median(ms):7.2f}ms  p95={p95:7.2f}ms"
+
+
+def bench_fresh_client(base_url: str, n: int, stream: bool) -> list[float]:
+    # 旧实现：每次 chat() 都 new 一个 OpenAI，连接池随之丢弃
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        client = OpenAI(api_key="sk-fake", base_url=base_url)
+        res = client.chat.completions.create(model="fake", messages=MESSAGES, stream=stream)
+        if stream:
+            for _chunk in res:
+                pass
+        out.append(time.perf_counter() - t0)
+        client.close()
+    return out
+
+
+def bench_pooled_client(base_url: str, n: int, stream: bool) -> list[float]:
+    client = LLMClient(api_key="sk-fake", base_url=base_url, model="fake")
+    out = []
+    try:
+        for _ in range(n):
+            t0 = time.perf_counter()
+            res = client.chat(MESSAGES, stream=stream)
+            if stream:
+                for _chunk in res:
+                    pass
+            out.append(time.perf_counter() - t0)
+    finally:
+        client.close()
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--warmup", type=int, default=10)
+    args = ap.parse_args()
+
+    with FakeLLMServer() as srv:
+        for stream in (False, True):
+            mode = "stream" if stream else "non-stream"
+            bench_fresh_client(srv.base_url, args.warmup, stream)
+            fresh = bench_fresh_client(srv.base_url, args.requests, stream)
+            pooled = bench_pooled_client(srv.base_url, args.requests, stream)
+            print(f"[{mode}] {args.requests} requests")
+            print("  " + _summary("new OpenAI()", fresh))
+            print("  " + _summary("pooled", pooled))
+            saved = (statistics.mean(fresh) - statistics.mean(pooled)) * 1000
+            print(f"  per-request overhead saved: {saved:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+日志写入基准：模拟一局 N 轮、每轮玩家 / 主持人 / 系统各记一条日志并 dump() 一次，对比
+- 旧：三个列表无限增长，dump() 每次从头重写三个文件（原子写）；
+- 新：环形缓冲 + 后台追加写 JSONL。
+输出前 / 后 10% 轮次的每轮耗时与最终内存占用（tracemalloc），新实现应与轮数无关。
+
+用法（在 Code/ 目录下）：
+    python -m bench.bench_log_manager --turns 2000
+"""
+from __future__ import annotations
+import argparse
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from bench.bench_markdown import KP_REPLIES
+from core.file_manager import atomic_write_text
+from core.log_manager import LogData, LogManager
+
+
+class LegacyLogManager:
+    """
+    改写前的 LogManager（逻辑原样保留）。
+    """
+
+    def __init__(self, log_dir: Path):
+        self.log_dir = log_dir
+        self.start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.game_log: list[LogData] = []
+        self.story_log: list[LogData] = []
+        self.total_log: list[LogData] = []
+
+    def update(self, content: str, owner: str = "system", mode: str = "total") -> None:
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        item = LogData(self.start_time, now, owner, content)
+        if mode == "game":
+            self.game_log.append(item); self.total_log.append(item)
+        elif mode == "story":
+            self.story_log.append(item); self.total_log.append(item)
+        else:
+            self.total_log.append(item)
+
+    def dump(self) -> None:
+        def write(path: Path, data: list[LogData]):
+            text = "".join(f"[{x.start_time}] >> [{x.owner}]: {x.content}\n" for x in data)
+            atomic_write_text(path, text)
+
+        write(self.log_dir / "game_log.txt", self.game_log)
+        write(self.log_dir / "story_log.txt", self.story_log)
+        write(self.log_dir / "total_log.txt", self.total_log)
+
+
+def run(make, turns: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        tracemalloc.start()
+        log = make(Path(tmp))
+        per_turn: list[float] = []
+        for i in range(turns):
+            t0 = time.perf_counter()
+            log.update(f"第 {i} 轮：我检查酒架", owner="player", mode="game")
+            log.update(KP_REPLIES[i % len(KP_REPLIES)], owner="kp", mode="story")
+            log.update(f"状态更新 turn={i}", owner="system")
+            log.dump()
+            per_turn.append(time.perf_counter() - t0)
+        mem = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        if hasattr(log, "close"):
+            log.close()
+        disk = sum(p.stat().st_size for p in Path(tmp).iterdir())
+    k = max(1, turns // 10)
+    return {
+        "head_ms": statistics.mean(per_turn[:k]) * 1000,
+        "tail_ms": statistics.mean(per_turn[-k:]) * 1000,
+        "total_s": sum(per_turn),
+        "mem_kb": mem / 1024,
+        "disk_kb": disk / 1024,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=2000)
+    ap.add_argument("--keep", type=int, default=500)
+    args = ap.parse_args()
+
+    print(f"{args.turns} 轮，每轮 3 条日志 + dump()")
+    for name, make in (("legacy", LegacyLogManager),
+                       ("jsonl", lambda d: LogManager(d, keep=args.keep, max_bytes=1024 * 1024))):
+        r = run(make, args.turns)
+        print(f"{name:<7} 每轮 前10% {r['head_ms']:7.3f}ms  后10% {r['tail_ms']:7.3f}ms  "
+              f"总计 {r['total_s']:6.2f}s  内存 {r['mem_kb']:8.0f}KB  磁盘 {r['disk_kb']:7.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+markdown_to_text 微基准：典型主持人回复（标题 / 粗体 / 列表 / 引用 / 骰点代码块），
+对比旧版 9 次 re.sub 的实现，分别给出冷（无缓存）与热（命中缓存）吞吐 MB/s，
+并检查两者在样本上的输出是否一致。若 Save/ 下有存档，也把其中的回复加入样本。
+
+用法（在 Code/ 目录下）：
+    python -m bench.bench_markdown --seconds 1
+"""
+from __future__ import annotations
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+
+from core import general_tools
+from core.general_tools import markdown_to_text
+
+KP_REPLIES = [
+    """### 第三幕：古宅地下室
+
+你推开**吱呀作响**的木门，一股潮湿的霉味扑面而来。手电筒的光束在墙上晃动，照出一排排*落满灰尘*的酒架。
+
+> 墙角传来细微的抓挠声，像是有什么东西在木板后面移动。
+
+**当前可执行的行动：**
+- 检查酒架（侦查）
+- 靠近墙角（聆听）
+- 返回楼梯口
+
+---
+【状态】理智 52/60，生命 11/12""",
+    """## 检定结果
+
+```
+侦查 (45) → d100 = 23  成功
+```
+
+你在第三层酒架的背面发现了一张泛黄的照片，照片上是**韦斯特家族**的合影。背面用铅笔写着一行小字：[1923年冬](note://photo)。
+
+* 照片边缘有焦痕
+* 其中一个人的脸被刮花了
+
+你想怎么做？""",
+    """# 序章 · 雨夜来客
+
+雨下得很大。你坐在侦探事务所里，窗外的霓虹灯在雨水中**模糊成一片**。
+
+门被推开，一位穿着黑色风衣的女士走了进来，她摘下帽子，露出一张苍白的脸。
+
+> “侦探先生，我需要你帮我找一个人——我的丈夫，三天前他去了 `黑砂古城`，再也没有回来。”
+
+- **委托人**：艾琳·韦斯特
+- **报酬**：500 美元
+- **线索**：一张车票、一枚*狐狸面具*
+
+请描述你的回应。""",
+    """走廊尽头的门虚掩着。你屏住呼吸，听到里面有人在低声交谈，但听不清内容。
+
+**你可以：**
+1. 贴近门缝偷听（聆听 -10）
+2. 直接推门而入
+3. 悄悄绕到窗户外观察（潜行）
+
+*提示：夜晚的古宅里，任何响动都可能引来不速之客。*""",
+]
+
+
+def legacy_markdown_to_text(md_text: str) -> str:
+    text = re.sub(r'^(#+)\s+', '', md_text, flags=re.M)
+    text = re.sub(r'\*\*?([^*]+)\*\*?', r'\1', text)
+    text = re.sub(r'!\[([^\]]*)\]\([^)]+\)', r'\1', text)
+    text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)
+    text = re.sub(r'^>\s+', '', text, flags=re.M)
+    text = re.sub(r'`{3}[\s\S]*?`{3}', '', text)
+    text = re.sub(r'`([^`]+)`', r'\1', text)
+    text = re.sub(r'^(-|\*)\s+', '', text, flags=re.M)
+    text = re.sub(r'^---+$', '', text, flags=re.M)
+    return text.strip()
+
+
+def _session_replies() -> list[str]:
+    save_dir = Path(__file__).resolve().parents[2] / "Save"
+    out = []
+    for p in sorted(save_dir.glob("TRPG_SAVE_*.json")):
+        try:
+            data = json.loads(p.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        hist = data.get("history", []) if isinstance(data, dict) else data
+        out += [m["content"] for m in hist if m.get("role") == "assistant" and isinstance(m.get("content"), str)]
+    return out
+
+
+def _throughput(fn, samples: list[str], seconds: float) -> float:
+    nbytes = sum(len(s.encode("utf-8")) for s in samples)
+    done = 0
+    t0 = time.perf_counter()
+    while True:
+        for s in samples:
+            fn(s)
+        done += nbytes
+        dt = time.perf_counter() - t0
+        if dt >= seconds:
+            return done / dt / 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=1.0)
+    args = ap.parse_args()
+
+    session = _session_replies()
+    samples = KP_REPLIES + session
+    print(f"样本：{len(KP_REPLIES)} 条典型回复 + {len(session)} 条存档回复，"
+          f"共 {sum(len(s.encode('utf-8')) for s in samples) / 1024:.1f} KB")
+
+    diff = [s for s in samples if markdown_to_text(s) != legacy_markdown_to_text(s)]
+    print(f"与旧实现输出不同：{len(diff)}/{len(samples)}")
+    for s in diff[:3]:
+        print("  旧:", repr(legacy_markdown_to_text(s)[:80]))
+        print("  新:", repr(markdown_to_text(s)[:80]))
+
+    legacy = _throughput(legacy_markdown_to_text, samples, args.seconds)
+    cold = _throughput(general_tools._convert, samples, args.seconds)
+    warm = _throughput(markdown_to_text, samples, args.seconds)
+    print(f"旧版 9 次 re.sub：{legacy:8.1f} MB/s")
+    print(f"单遍（无缓存）  ：{cold:8.1f} MB/s  ({cold / legacy:.1f}x)")
+    print(f"单遍（命中缓存）：{warm:8.1f} MB/s  ({warm / legacy:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+整局回放基准：本地假 LLM 服务 + Gameplay/Story 剧本生成的脚本化对局，不需要 DeepSeek key。
+
+两段测量：
+1. agent：直接驱动 AgentManager（流式 talk → commit → update_status_json → 日志存档），
+   每轮记录首字延迟、流式总耗时、状态请求与存档耗时；
+2. ui：隐藏窗口的 StreamDisplayApp 走完整的 process_input 流程，
+   每轮记录首字延迟、UI 排空延迟（数据到达缓冲 → 插入文本框）、历史面板渲染与存档耗时。
+   没有显示器时跳过（Linux 下可用 xvfb-run 运行）。
+
+用法（在 Code/ 目录下）：
+    python -m bench.bench_session --rule COC --story THE_FOX --turns 10 --rate 40 --jitter 0.3
+    python -m bench.bench_session --recording recorded.jsonl   # 用录制的流（见 fake_llm_server.load_recording）
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from bench.fake_llm_server import FakeLLMServer, FakeReply, load_recording
+from config import AppConfig
+from core.file_manager import FileManager
+from core.metrics import MetricsRegistry
+from core.save_journal import SaveJournal
+from core.stream_buffer import StreamBuffer
+from llm.agent_manager import AgentManager, AgentSession
+from llm.context_window import ContextWindow
+from llm.llm_client import LLMClient
+from llm.summarizer import StorySummarizer
+from paths import ProjectPaths
+
+PLAYER_ACTIONS = [
+    "我环顾四周，仔细观察房间里的陈设。",
+    "我走近那扇门，贴着门缝听里面的动静。",
+    "我询问管家最近宅子里发生过什么怪事。",
+    "我检查桌上的信件和抽屉。",
+    "我点亮油灯，沿着回廊往里走。",
+    "我进行一次侦查检定。",
+    "我把发现的东西收进背包，继续前进。",
+    "我回头看看身后有没有人跟着。",
+]
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def story_sections(text: str, size: int) -> list[str]:
+    """
+    把剧本按段落切成若干段约 size 字的“主持人回复”（保留原有 Markdown）。
+    """
+    out: list[str] = []
+    cur = ""
+    for para in text.split("\n\n"):
+        cur = f"{cur}\n\n{para}" if cur else para
+        if len(cur) >= size:
+            out.append(cur.strip())
+            cur = ""
+    if cur.strip():
+        out.append(cur.strip())
+    return out or [text]
+
+
+class ScriptedReplies:
+    """
+    按请求类型路由：状态请求（json_object）返回 JSON，前情提要请求返回短摘要，
+    其余按顺序返回剧本段落（流式时按设定的速率 / 抖动 / 首字延迟吐字）。
+    """
+
+    def __init__(self, sections: list[str], *, rate: float, jitter: float, first_delay: float,
+                 recording: FakeReply | None = None):
+        self.sections = sections
+        self.rate = rate
+        self.jitter = jitter
+        self.first_delay = first_delay
+        self.recording = recording
+        self._i = 0
+        self._turn = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, body: dict) -> FakeReply:
+        messages = body.get("messages") or []
+        last = str(messages[-1].get("content", "")) if messages else ""
+        if (body.get("response_format") or {}).get("type") == "json_object":
+            with self._lock:
+                self._turn += 1
+                n = self._turn
+            status = {"生理状态": "良好" if n % 3 else "轻伤", "恐惧程度": ["低", "中", "高"][n % 3],
+                      "NPC队友": "周伯", "背包物品": f"油灯、线索×{n}", "对怪物的认知": "暂无"}
+            return FakeReply(json.dumps(status, ensure_ascii=False), first_delay=self.first_delay)
+        if "跑团记录员" in last:
+            return FakeReply("调查员抵达老宅，结识管家，发现了若干线索。", first_delay=self.first_delay)
+        if self.recording is not None:
+            return self.recording
+        with self._lock:
+            text = self.sections[self._i % len(self.sections)]
+            self._i += 1
+        return FakeReply(text, chunk_chars=2, rate=self.rate, jitter=self.jitter, first_delay=self.first_delay)
+
+
+class TimedStreamBuffer(StreamBuffer):
+    """
+    记录每块写入的时间，read() 时得到“最早一块未读数据等了多久才被 UI 取走”。
+    """
+    __slots__ = ("_stamps", "lags")
+
+    def __init__(self):
+        super().__init__()
+        self._stamps: list[float] = []
+        self.lags: list[float] = []
+
+    def append(self, s: str) -> None:
+        if s:
+            self._stamps.append(time.perf_counter())
+        super().append(s)
+
+    def read(self, max_chars: int = 0) -> str:
+        start = self._read_idx
+        out = super().read(max_chars)
+        if out:
+            self.lags.append((time.perf_counter() - self._stamps[start]) * 1000)
+        return out
+
+
+def _make_paths(tmp: Path) -> ProjectPaths:
+    # 临时项目根：Gameplay 指向仓库，Save / Log 写到临时目录
+    (tmp / "Save").mkdir()
+    (tmp / "Log").mkdir()
+    try:
+        os.symlink(REPO_ROOT / "Gameplay", tmp / "Gameplay", target_is_directory=True)
+    except OSError:
+        import shutil
+        shutil.copytree(REPO_ROOT / "Gameplay", tmp / "Gameplay")
+    return ProjectPaths(tmp)
+
+
+def _make_agent(paths: ProjectPaths, base_url: str, rule: str, story: str, metrics: MetricsRegistry) -> AgentManager:
+    cfg = AppConfig()
+    fm = FileManager()
+    client = LLMClient(api_key="sk-fake", base_url=base_url, model="fake", metrics=metrics)
+    summarizer = StorySummarizer(client, model="fake", trigger_tokens=cfg.summary_trigger_tokens,
+                                 keep_recent=cfg.summary_keep_recent)
+    agent = AgentManager(paths, client, fm, ContextWindow(cfg.context_token_budget), summarizer)
+    rule_text = fm.read_text(paths.rule_dir / f"{rule}_PROMPT.txt") or ""
+    story_text = fm.read_text(paths.story_dir / rule / f"{story}.txt") or ""
+    agent.init_session(AgentSession(rule_text, story_text, rule_name=rule, story_name=story))
+    return agent
+
+
+def _stats(values: list[float]) -> str:
+    vals = sorted(v for v in values if v is not None)
+    if not vals:
+        return "-"
+    p95 = vals[min(len(vals) - 1, int(len(vals) * 0.95))]
+    return f"p50={statistics.median(vals):7.1f}  p95={p95:7.1f}  max={vals[-1]:7.1f}"
+
+
+def run_agent(paths: ProjectPaths, base_url: str, args) -> list[dict]:
+    metrics = MetricsRegistry()
+    agent = _make_agent(paths, base_url, args.rule, args.story, metrics)
+    journal = SaveJournal(paths.save_dir / "TRPG_SAVE_AUTO_bench_agent.jsonl")
+    agent.show_beginning()
+    rows = []
+    for turn in range(args.turns):
+        t0 = time.perf_counter()
+        ttft = None
+        parts = []
+        for chunk in agent.talk(PLAYER_ACTIONS[turn % len(PLAYER_ACTIONS)], stream=True):
+            choices = getattr(chunk, "choices", None)
+            text = choices[0].delta.content if choices and choices[0].delta else None
+            if text:
+                if ttft is None:
+                    ttft = (time.perf_counter() - t0) * 1000
+                parts.append(text)
+        stream_ms = (time.perf_counter() - t0) * 1000
+        agent.commit_assistant_reply("".join(parts))
+
+        t1 = time.perf_counter()
+        status = agent.update_status_json()
+        status_ms = (time.perf_counter() - t1) * 1000
+
+        t2 = time.perf_counter()
+        journal.append({"history": list(agent.history), "status": status, "meta": {"timestamp": str(turn)}})
+        save_ms = (time.perf_counter() - t2) * 1000
+        rows.append({"turn": turn + 1, "ttft_ms": ttft, "stream_ms": stream_ms, "status_ms": status_ms, "save_ms": save_ms})
+    agent.client.close()
+    return rows
+
+
+def run_ui(paths: ProjectPaths, base_url: str, args) -> list[dict] | None:
+    import tkinter as tk
+    from ui.tk_app import StreamDisplayApp
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"[ui] 跳过：无法创建 Tk 窗口（{e}）。Linux 下可用 xvfb-run 运行。")
+        return None
+    root.withdraw()
+
+    class BenchApp(StreamDisplayApp):
+        stream_buffer_factory = TimedStreamBuffer
+
+        def safe_update_history(self):
+            t0 = time.perf_counter()
+            super().safe_update_history()
+            self.history_ms = (time.perf_counter() - t0) * 1000
+
+    metrics = MetricsRegistry()
+    agent = _make_agent(paths, base_url, args.rule, args.story, metrics)
+    app = BenchApp(root, agent, paths, voice=None)
+    app.auto_save_var.set(True)
+    rows = []
+    for turn in range(args.turns):
+        done_before = len(metrics.turns)
+        app.input_text.delete("1.0", tk.END)
+        app.input_text.insert("1.0", PLAYER_ACTIONS[turn % len(PLAYER_ACTIONS)])
+        app.history_ms = None
+        app.process_input()
+        deadline = time.monotonic() + args.turn_timeout
+        while len(metrics.turns) == done_before and time.monotonic() < deadline:
+            root.update()
+            time.sleep(0.001)
+        rec = metrics.turns[-1] if len(metrics.turns) > done_before else {}
+        lags = app._stream_buf.lags
+        rows.append({
+            "turn": turn + 1,
+            "ttft_ms": rec.get("ttft_ms"),
+            "drain_lag_ms": statistics.mean(lags) if lags else None,
+            "drain_lag_max_ms": max(lags) if lags else None,
+            "history_ms": app.history_ms,
+            "save_ms": rec.get("save_ms"),
+            "turn_ms": rec.get("turn_ms"),
+        })
+    app.maintenance.close()
+    app._post_turn_q.put(None)
+    agent.client.close()
+    root.destroy()
+    return rows
+
+
+def _print(title: str, rows: list[dict]) -> None:
+    print(f"\n== {title} ==")
+    cols = [k for k in rows[0] if k != "turn"]
+    print("turn  " + "  ".join(f"{c:>16}" for c in cols))
+    for r in rows:
+        print(f"{r['turn']:>4}  " + "  ".join(f"{r[c]:16.1f}" if r[c] is not None else f"{'-':>16}" for c in cols))
+    for c in cols:
+        print(f"  {c:<18} {_stats([r[c] for r in rows])}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rule", default="COC")
+    ap.add_argument("--story", default="THE_FOX")
+    ap.add_argument("--turns", type=int, default=8)
+    ap.add_argument("--rate", type=float, default=60.0, help="每秒吐出的块数")
+    ap.add_argument("--jitter", type=float, default=0.3)
+    ap.add_argument("--first-delay", type=float, default=0.3, help="首字延迟（秒）")
+    ap.add_argument("--section-chars", type=int, default=400)
+    ap.add_argument("--recording", help="用录制的流代替剧本段落")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--turn-timeout", type=float, default=120.0)
+    ap.add_argument("--skip-ui", action="store_true")
+    ap.add_argument("--json", help="把每轮结果写到这个 JSON 文件")
+    args = ap.parse_args()
+
+    story = (REPO_ROOT / "Gameplay" / "Story" / args.rule / f"{args.story}.txt").read_text(encoding="utf-8")
+    recording = load_recording(Path(args.recording), first_delay=args.first_delay) if args.recording else None
+    replies = ScriptedReplies(story_sections(story, args.section_chars), rate=args.rate, jitter=args.jitter,
+                              first_delay=args.first_delay, recording=recording)
+
+    result = {}
+    with FakeLLMServer(replies, seed=args.seed) as srv, tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+        (tmp / "agent").mkdir()
+        result["agent"] = run_agent(_make_paths(tmp / "agent"), srv.base_url, args)
+        _print("AgentManager", result["agent"])
+        if not args.skip_ui:
+            (tmp / "ui").mkdir()
+            rows = run_ui(_make_paths(tmp / "ui"), srv.base_url, args)
+            if rows:
+                result["ui"] = rows
+                _print("StreamDisplayApp（隐藏窗口）", rows)
+        print(f"\n假服务共处理 {srv.request_count} 个请求")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
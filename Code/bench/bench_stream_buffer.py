@@ -0,0 +1,133 @@
+"""
+回放一段约 1 万 token 的流式回复，对比接收线程的两种写法：
+- 旧：self.full_response_md += token，并逐 token queue.Queue.put，UI 每 33ms get_nowait 取空再 join；
+- 新：StreamBuffer.append，UI 每 33ms 按读取位置 read() 一次。
+UI 侧用线程模拟（不需要显示器），统计接收线程每 token 开销、UI 每帧取数耗时与总耗时。
+
+用法（在 Code/ 目录下）：
+    python -m bench.bench_stream_buffer --tokens 10000
+    python -m bench.bench_stream_buffer --file recorded.jsonl   # 每行一个 JSON 字符串（delta.content）
+"""
+from __future__ import annotations
+import argparse
+import json
+import queue
+import random
+import statistics
+import threading
+import time
+from pathlib import Path
+
+from bench.bench_markdown import KP_REPLIES
+from core.stream_buffer import StreamBuffer
+
+
+def synth_stream(n_tokens: int, seed: int = 7) -> list[str]:
+    # DeepSeek 中文流式输出大多是 1~3 个字一个 delta
+    rnd = random.Random(seed)
+    text = "\n\n".join(KP_REPLIES)
+    out: list[str] = []
+    i = 0
+    while len(out) < n_tokens:
+        k = rnd.choice((1, 1, 2, 2, 2, 3))
+        out.append(text[i % len(text):i % len(text) + k] or text[:k])
+        i += k
+    return out
+
+
+class _LegacyApp:
+    def __init__(self):
+        self.full_response_md = ""
+        self._stream_q: queue.Queue[str] = queue.Queue()
+
+    def write(self, tok: str):
+        self.full_response_md += tok
+        self._stream_q.put(tok)
+
+    def drain(self) -> str:
+        pieces = []
+        while True:
+            try:
+                pieces.append(self._stream_q.get_nowait())
+            except queue.Empty:
+                break
+        return "".join(pieces)
+
+    def result(self) -> str:
+        return self.full_response_md
+
+
+class _BufferApp:
+    def __init__(self):
+        self.buf = StreamBuffer()
+
+    def write(self, tok: str):
+        self.buf.append(tok)
+
+    def drain(self) -> str:
+        return self.buf.read()
+
+    def result(self) -> str:
+        return self.buf.text()
+
+
+def run(app, tokens: list[str], *, frame_ms: float, token_delay: float) -> dict:
+    done = threading.Event()
+    frames: list[float] = []
+    shown: list[str] = []
+
+    def ui():
+        while True:
+            finished = done.is_set()
+            t0 = time.perf_counter()
+            s = app.drain()
+            frames.append(time.perf_counter() - t0)
+            if s:
+                shown.append(s)
+            if finished:
+                break
+            time.sleep(frame_ms / 1000)
+
+    ut = threading.Thread(target=ui)
+    ut.start()
+    t0 = time.perf_counter()
+    for tok in tokens:
+        app.write(tok)
+        if token_delay:
+            time.sleep(token_delay)
+    write_s = time.perf_counter() - t0
+    final = app.result()
+    done.set()
+    ut.join()
+    total_s = time.perf_counter() - t0
+    assert "".join(shown) == final == "".join(tokens)
+    return {
+        "write_us_per_token": write_s / len(tokens) * 1e6,
+        "frame_ms_mean": statistics.mean(frames) * 1000,
+        "frame_ms_max": max(frames) * 1000,
+        "total_ms": total_s * 1000,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tokens", type=int, default=10000)
+    ap.add_argument("--file", help="录制的流：每行一个 JSON 字符串")
+    ap.add_argument("--frame-ms", type=float, default=33.0)
+    ap.add_argument("--token-delay", type=float, default=0.0, help="模拟网络间隔（秒），0 为尽快回放")
+    args = ap.parse_args()
+
+    if args.file:
+        tokens = [json.loads(line) for line in Path(args.file).read_text(encoding="utf-8").splitlines() if line.strip()]
+    else:
+        tokens = synth_stream(args.tokens)
+    print(f"回放 {len(tokens)} 个 token，{sum(map(len, tokens))} 字符")
+
+    for name, factory in (("queue + str +=", _LegacyApp), ("StreamBuffer", _BufferApp)):
+        r = run(factory(), tokens, frame_ms=args.frame_ms, token_delay=args.token_delay)
+        print(f"{name:<15} 写入 {r['write_us_per_token']:6.2f} us/token  "
+              f"UI 每帧 mean={r['frame_ms_mean']:.3f}ms max={r['frame_ms_max']:.3f}ms  总计 {r['total_ms']:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
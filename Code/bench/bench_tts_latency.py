@@ -0,0 +1,172 @@
+"""
+朗读延迟基准：首字到达 → 第一次出声。
+
+本地假 LLM 服务按设定速率吐出主持人回复，对比两种朗读方式：
+- 旧：流结束、_finalize_stream 拿到整段回复后才 speak()，且每段都重新 pyttsx3.init()；
+- 新：常驻引擎 + SentenceSegmenter，生成过程中逐句排队播放。
+TTS 引擎用 FakeEngine 模拟（初始化耗时、合成起播延迟、语速），不需要声卡；
+加 --real 使用真正的 pyttsx3 引擎。
+
+用法（在 Code/ 目录下）：
+    python -m bench.bench_tts_latency --rate 30 --init-ms 250 --turns 5
+"""
+from __future__ import annotations
+import argparse
+import statistics
+import threading
+import time
+from queue import Queue
+
+from audio.sentence_splitter import SentenceSegmenter
+from audio.tts_backends import Pyttsx3Backend, _pyttsx3_engine
+from audio.voice_manager import VoiceManager
+from bench.bench_markdown import KP_REPLIES
+from bench.fake_llm_server import FakeLLMServer, FakeReply
+from core.general_tools import markdown_to_text
+from core.metrics import MetricsRegistry
+from llm.llm_client import LLMClient
+
+
+class FakeEngine:
+    """
+    pyttsx3 引擎的最小替身：构造耗时 init_ms，say 后 start_ms 开始“出声”，按 cps 字/秒播放，可被 stop() 打断。
+    """
+
+    def __init__(self, rate: int, *, init_ms: float, start_ms: float, cps: float):
+        time.sleep(init_ms / 1000)
+        self.rate = rate
+        self.start_ms = start_ms
+        self.cps = cps
+        self._cbs: dict[str, list] = {}
+        self._texts: list[str] = []
+        self._stop = threading.Event()
+
+    def setProperty(self, name, value):
+        pass
+
+    def connect(self, name, cb):
+        self._cbs.setdefault(name, []).append(cb)
+
+    def say(self, text):
+        self._texts.append(text)
+
+    def stop(self):
+        self._stop.set()
+
+    def runAndWait(self):
+        self._stop.clear()
+        texts, self._texts = self._texts, []
+        for text in texts:
+            time.sleep(self.start_ms / 1000)
+            for cb in self._cbs.get("started-utterance", []):
+                cb("utt")
+            for i in range(0, len(text), 4):
+                for cb in self._cbs.get("started-word", []):
+                    cb("utt", i, 4)
+                if self._stop.is_set():
+                    return
+                time.sleep(4 / self.cps)
+
+
+class LegacyVoice:
+    """
+    旧版 VoiceManager 的朗读路径：每段文本都新建一次引擎。
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._q: Queue[str] = Queue()
+        self._engine = None
+        self.on_audio_start = None
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def speak(self, text: str):
+        self._q.put(text)
+
+    def stop(self):
+        if self._engine is not None:
+            self._engine.stop()
+
+    def _loop(self):
+        while True:
+            text = self._q.get()
+            engine = self._engine = self._factory(200)
+            engine.connect("started-utterance", lambda name: self.on_audio_start(0, time.perf_counter()))
+            engine.say(text)
+            engine.runAndWait()
+
+
+def run_turn(client: LLMClient, mode: str, voice, timeout: float) -> dict:
+    heard = threading.Event()
+    out = {}
+
+    def on_audio(gen, t):
+        if not heard.is_set():
+            out["audio_at"] = t
+            heard.set()
+    voice.on_audio_start = on_audio
+
+    seg = SentenceSegmenter() if mode == "stream" else None
+    gen = voice.begin_stream() if mode == "stream" else 0
+    t0 = time.perf_counter()
+    first = None
+    parts: list[str] = []
+    for chunk in client.chat([{"role": "user", "content": "继续"}], stream=True, purpose="narration"):
+        text = chunk.choices[0].delta.content if chunk.choices else ""
+        if not text:
+            continue
+        if first is None:
+            first = time.perf_counter()
+        parts.append(text)
+        if seg is not None:
+            for s in seg.feed(text):
+                voice.enqueue(s, gen)
+    stream_end = time.perf_counter()
+    if seg is not None:
+        for s in seg.flush():
+            voice.enqueue(s, gen)
+    else:
+        voice.speak(markdown_to_text("".join(parts)))
+    heard.wait(timeout)
+    voice.stop()
+    return {
+        "ttft_ms": (first - t0) * 1000,
+        "stream_ms": (stream_end - t0) * 1000,
+        "first_audio_ms": (out["audio_at"] - first) * 1000 if "audio_at" in out else None,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=5)
+    ap.add_argument("--rate", type=float, default=30.0, help="每秒吐出的块数")
+    ap.add_argument("--chunk-chars", type=int, default=2)
+    ap.add_argument("--first-delay", type=float, default=0.6, help="服务端首字延迟（秒）")
+    ap.add_argument("--init-ms", type=float, default=250.0, help="模拟 pyttsx3.init() 耗时")
+    ap.add_argument("--start-ms", type=float, default=60.0, help="模拟 say 到出声的合成延迟")
+    ap.add_argument("--cps", type=float, default=6.0, help="模拟语速（字/秒）")
+    ap.add_argument("--real", action="store_true", help="使用真实的 pyttsx3 引擎")
+    args = ap.parse_args()
+
+    if args.real:
+        factory = _pyttsx3_engine
+    else:
+        def factory(rate: int):
+            return FakeEngine(rate, init_ms=args.init_ms, start_ms=args.start_ms, cps=args.cps)
+
+    reply = FakeReply(text=KP_REPLIES[0], chunk_chars=args.chunk_chars, rate=args.rate, first_delay=args.first_delay)
+    with FakeLLMServer(reply) as srv:
+        client = LLMClient(api_key="sk-fake", base_url=srv.base_url, model="fake", metrics=MetricsRegistry())
+        print(f"回复 {len(reply.text)} 字，约 {reply.duration():.1f}s 吐完；每种方式 {args.turns} 轮")
+        for mode, voice in (("legacy", LegacyVoice(factory)), ("stream", VoiceManager(backend=Pyttsx3Backend(engine_factory=factory)))):
+            rows = [run_turn(client, mode, voice, timeout=reply.duration() + 10) for _ in range(args.turns)]
+            audio = [r["first_audio_ms"] for r in rows if r["first_audio_ms"] is not None]
+            print(f"{mode:<7} 首字 {statistics.mean(r['ttft_ms'] for r in rows):7.0f}ms  "
+                  f"流式 {statistics.mean(r['stream_ms'] for r in rows):7.0f}ms  "
+                  f"首字→出声 mean={statistics.mean(audio):7.0f}ms max={max(audio):7.0f}ms")
+            if hasattr(voice, "close"):
+                voice.close()
+
+
+if __name__ == "__main__":
+    main()
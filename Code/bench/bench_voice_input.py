@@ -0,0 +1,74 @@
+"""
+语音输入基准：把 WAV 按实时速度送进 VoiceInput（Vosk），检查长时间运行时识别延迟是否保持稳定。
+
+输出每段（默认 60 秒音频）的单块识别耗时 p50 / p95、丢弃的块数与识别出的句子数；
+各段数字接近说明延迟不随会话变长而增长。需要安装 vosk 并下载模型。
+
+用法（在 Code/ 目录下）：
+    python -m bench.bench_voice_input --model ../Model/vosk --wav sample.wav --repeat 10
+    python -m bench.bench_voice_input --model ../Model/vosk --wav sample.wav --fast   # 不按实时速度，测吞吐
+"""
+from __future__ import annotations
+import argparse
+import statistics
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+from audio.voice_input import VoiceInput, WavFileSource
+
+
+def _repeat_wav(src: Path, times: int) -> Path:
+    if times <= 1:
+        return src
+    out = Path(tempfile.mkdtemp()) / f"repeat_{times}_{src.name}"
+    with wave.open(str(src), "rb") as r:
+        params = r.getparams()
+        frames = r.readframes(r.getnframes())
+    with wave.open(str(out), "wb") as w:
+        w.setparams(params)
+        for _ in range(times):
+            w.writeframes(frames)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", required=True, help="Vosk 模型目录")
+    ap.add_argument("--wav", required=True, help="单声道 16bit PCM WAV")
+    ap.add_argument("--repeat", type=int, default=1, help="把 WAV 重复拼接 N 次，模拟长会话")
+    ap.add_argument("--segment", type=float, default=60.0, help="统计分段长度（秒音频）")
+    ap.add_argument("--fast", action="store_true", help="尽快送入（不丢块），测识别吞吐")
+    args = ap.parse_args()
+
+    try:
+        import vosk  # noqa: F401
+    except ImportError:
+        print("未安装 vosk，跳过")
+        return
+
+    wav = _repeat_wav(Path(args.wav), args.repeat)
+    finals: list[tuple[float, str]] = []
+    t0 = time.perf_counter()
+    vi = VoiceInput(Path(args.model), on_partial=lambda text: None,
+                    on_final=lambda text: finals.append((time.perf_counter() - t0, text)))
+    # decode_times 默认只保留最近的样本，这里换成列表记录完整序列
+    times: list[float] = []
+    vi.decode_times = times
+
+    source = WavFileSource(wav, realtime=not args.fast)
+    vi.start(source)
+    vi.join()
+    wall = time.perf_counter() - t0
+
+    blocks_per_seg = max(1, int(args.segment * 1000 / source.block_ms))
+    print(f"音频 {len(times) * source.block_ms / 1000:.0f}s，耗时 {wall:.1f}s，识别 {len(finals)} 句，丢弃 {vi.dropped_blocks} 块")
+    for i in range(0, len(times), blocks_per_seg):
+        seg = sorted(times[i:i + blocks_per_seg])
+        p95 = seg[min(len(seg) - 1, int(len(seg) * 0.95))]
+        print(f"  {i * source.block_ms / 1000:6.0f}s  块识别 p50={statistics.median(seg) * 1000:6.2f}ms  p95={p95 * 1000:6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+本地 OpenAI 兼容的假 LLM 服务（仅标准库），用于无 key 的性能基准。
+
+支持 POST /chat/completions 与 /v1/chat/completions：
+- stream=false：返回完整 JSON
+- stream=true ：按 SSE 逐块返回 delta
+HTTP/1.1 keep-alive，便于对比连接复用。
+
+回复可以是固定文本（按 chunk_chars 切块），也可以是录制下来的流（load_recording，
+保留原始块间隔）；可设置首字延迟、生成速率与抖动。reply 也可以传一个函数，按请求内容
+返回不同的 FakeReply（例如状态请求返回 JSON）。
+"""
+from __future__ import annotations
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+from llm.context_window import message_tokens
+
+
+@dataclass
+class FakeReply:
+    text: str = "调查员推开了吱呀作响的木门，一股潮湿的霉味扑面而来。"
+    chunk_chars: int = 4
+    chunk_delay: float = 0.0
+    # 录制的流：chunks 为各块文本，delays 为每块之前的间隔（秒），优先于 text / chunk_delay
+    chunks: Optional[list[str]] = None
+    delays: Optional[list[float]] = None
+    first_delay: float = 0.0   # 首字延迟（秒）
+    rate: float = 0.0          # 每秒块数，> 0 时覆盖 chunk_delay
+    jitter: float = 0.0        # 块间隔的随机抖动比例，如 0.3 表示 ±30%
+
+    def __post_init__(self):
+        if self.chunks is not None:
+            self.text = "".join(self.chunks)
+
+    def iter_chunks(self, rnd: Optional[random.Random] = None) -> Iterator[tuple[float, str]]:
+        """
+        逐块给出 (发送前等待的秒数, 文本)。
+        """
+        rnd = rnd or random
+        if self.chunks is not None:
+            pieces = self.chunks
+        else:
+            step = max(1, self.chunk_chars)
+            pieces = [self.text[i:i + step] for i in range(0, len(self.text), step)]
+        base = 1.0 / self.rate if self.rate > 0 else self.chunk_delay
+        for i, piece in enumerate(pieces):
+            if self.delays is not None and self.rate <= 0:
+                delay = self.delays[i] if i < len(self.delays) else 0.0
+            else:
+                delay = base
+            if self.jitter and delay:
+                delay *= 1.0 + rnd.uniform(-self.jitter, self.jitter)
+            if i == 0:
+                delay += self.first_delay
+            yield max(0.0, delay), piece
+
+    def duration(self) -> float:
+        return sum(d for d, _ in self.iter_chunks(random.Random(0)))
+
+
+ReplySource = Union[FakeReply, Callable[[dict], FakeReply]]
+
+
+def load_recording(path: Path, **overrides) -> FakeReply:
+    """
+    读取录制的流：JSONL，每行 {"t": 距请求开始的秒数, "content": "..."}。
+    """
+    chunks: list[str] = []
+    delays: list[float] = []
+    last = 0.0
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        rec = json.loads(line)
+        t = float(rec.get("t", last))
+        chunks.append(rec.get("content", ""))
+        delays.append(max(0.0, t - last))
+        last = t
+    return FakeReply(chunks=chunks, delays=delays, **overrides)
+
+
+def record_stream(stream: Iterable, path: Path, extract: Callable[[object], str]) -> Iterator:
+    """
+    透传一个真实的流式响应，同时按 load_recording 的格式录下每块的到达时间与文本。
+    """
+    t0 = time.perf_counter()
+    lines = []
+    try:
+        for chunk in stream:
+            content = extract(chunk)
+            if content:
+                lines.append(json.dumps({"t": round(time.perf_counter() - t0, 4), "content": content}, ensure_ascii=False))
+            yield chunk
+    finally:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self.server.request_count += 1
+        reply = self.server.reply_for(body)
+        usage = self.server.usage_for(body.get("messages") or [], body.get("model", "fake"), reply)
+
+        if body.get("stream"):
+            self._send_stream(body, reply, usage)
+        else:
+            self._send_json(body, reply, usage)
+
+    def _send_json(self, body: dict, reply: FakeReply, usage: dict):
+        # 非流式也模拟生成耗时
+        wait = reply.duration()
+        if wait:
+            time.sleep(wait)
+        payload = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply.text},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, body: dict, reply: FakeReply, usage: dict):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def emit(obj) -> None:
+            line = obj if isinstance(obj, str) else json.dumps(obj, ensure_ascii=False)
+            data = f"data: {line}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        for delay, piece in reply.iter_chunks(self.server.rnd):
+            if delay:
+                time.sleep(delay)
+            emit({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            })
+        if (body.get("stream_options") or {}).get("include_usage"):
+            emit({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [],
+                "usage": usage,
+            })
+        emit("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, reply: ReplySource, seed: Optional[int] = None):
+        super().__init__(addr, _Handler)
+        self.reply = reply
+        self.rnd = random.Random(seed)
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._seen: list[tuple[str, list[dict]]] = []
+
+    def reply_for(self, body: dict) -> FakeReply:
+        return self.reply(body) if callable(self.reply) else self.reply
+
+    def usage_for(self, messages: list[dict], model: str, reply: FakeReply) -> dict:
+        """
+        模拟 DeepSeek 前缀缓存：与之前请求逐条相同的开头消息计为缓存命中。
+        """
+        prompt = sum(message_tokens(m) for m in messages)
+        hit = 0
+        with self._lock:
+            for seen_model, seen in self._seen:
+                if seen_model != model:
+                    continue
+                n = 0
+                for a, b in zip(seen, messages):
+                    if a != b:
+                        break
+                    n += message_tokens(a)
+                hit = max(hit, n)
+            self._seen = (self._seen + [(model, messages)])[-16:]
+        completion = message_tokens({"content": reply.text})
+        return {
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "total_tokens": prompt + completion,
+            "prompt_cache_hit_tokens": hit,
+            "prompt_cache_miss_tokens": prompt - hit,
+        }
+
+
+class FakeLLMServer:
+    """
+    with FakeLLMServer() as srv:
+        client = LLMClient("sk-fake", srv.base_url, "fake")
+    """
+    def __init__(self, reply: Optional[ReplySource] = None, host: str = "127.0.0.1", port: int = 0,
+                 *, seed: Optional[int] = None):
+        self._server = _Server((host, port), reply or FakeReply(), seed)
+        self._t: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def request_count(self) -> int:
+        return self._server.request_count
+
+    def start(self) -> "FakeLLMServer":
+        self._t = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._t.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    srv = FakeLLMServer(port=8765).start()
+    print(f"fake LLM server listening on {srv.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.stop()
@@ -0,0 +1,129 @@
+"""
+崩溃安全压力测试：子进程不停地覆盖写存档 / 追加写日志，父进程在随机时刻 SIGKILL 它，
+然后检查磁盘上的存档是否仍可加载，且内容正是子进程最后完整写完（或正在写）的那一份。
+对照组使用直接 write_text 覆盖写；atomic 组或日志出现任何损坏时以状态码 1 退出。
+
+用法（在 Code/ 目录下）：
+    python -m bench.stress_atomic_write --rounds 50
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from core.file_manager import atomic_write_text
+from core.save_journal import SaveJournal
+
+
+def _payload(i: int) -> dict:
+    # 足够大的存档，让写入窗口跨越多个系统调用
+    history = [{"role": "system", "content": "规则" * 20000}]
+    history += [{"role": "user" if k % 2 == 0 else "assistant", "content": f"第{k}轮 " + "剧情" * 500} for k in range(i % 40)]
+    return {"history": history, "status": {"生理状态": str(i)}, "meta": {"timestamp": str(i)}}
+
+
+def writer(folder: Path, mode: str) -> None:
+    save = folder / "save.json"
+    journal = SaveJournal(folder / "save.jsonl")
+    i = 0
+    while True:
+        payload = _payload(i)
+        text = json.dumps(payload, ensure_ascii=False)
+        if mode == "atomic":
+            atomic_write_text(save, text)
+        else:
+            save.write_text(text, encoding="utf-8")
+        print(f"save {i}", flush=True)
+        journal.append(payload)
+        print(f"journal {i}", flush=True)
+        i += 1
+
+
+def _acceptable(done: list[int]) -> set[int]:
+    # 最后写完的一份，或被打断时正在写的下一份（rename 完成但还没来得及报告）
+    last = done[-1] if done else -1
+    return {last, last + 1} - {-1}
+
+
+def _matches(data: dict, accept: set[int]) -> bool:
+    try:
+        i = int(data["meta"]["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    expected = _payload(i)
+    return i in accept and data["history"] == expected["history"] and data["status"] == expected["status"]
+
+
+def check(folder: Path, done: dict[str, list[int]]) -> tuple[bool, bool]:
+    """
+    done：子进程报告已写完的序号。存档必须可加载，且与其中最后一份（或正在写的下一份）完全一致。
+    """
+    save_ok = journal_ok = True
+    save = folder / "save.json"
+    if save.exists():
+        try:
+            save_ok = _matches(json.loads(save.read_text(encoding="utf-8")), _acceptable(done["save"]))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            save_ok = False
+    else:
+        save_ok = not done["save"]
+    journal = folder / "save.jsonl"
+    if journal.exists() and journal.stat().st_size:
+        try:
+            journal_ok = _matches(SaveJournal.load(journal), _acceptable(done["journal"]))
+        except (ValueError, UnicodeDecodeError):
+            journal_ok = False
+    else:
+        journal_ok = not done["journal"]
+    return save_ok, journal_ok
+
+
+def run(mode: str, rounds: int) -> tuple[int, int]:
+    save_fail = journal_fail = 0
+    for _ in range(rounds):
+        with tempfile.TemporaryDirectory() as d:
+            folder = Path(d)
+            proc = subprocess.Popen([sys.executable, "-m", "bench.stress_atomic_write", "--writer", mode, "--dir", d],
+                                    stdout=subprocess.PIPE, text=True)
+            time.sleep(random.uniform(0.3, 1.2))
+            proc.kill()
+            out, _ = proc.communicate()
+            done: dict[str, list[int]] = {"save": [], "journal": []}
+            for line in out.splitlines():
+                kind, _, i = line.partition(" ")
+                if kind in done and i.isdigit():
+                    done[kind].append(int(i))
+            save_ok, journal_ok = check(folder, done)
+            save_fail += not save_ok
+            journal_fail += not journal_ok
+    print(f"[{mode:>6}] {rounds} kills: corrupt save.json={save_fail}, unloadable save.jsonl={journal_fail}")
+    return save_fail, journal_fail
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=30)
+    ap.add_argument("--writer", choices=["atomic", "direct"])
+    ap.add_argument("--dir")
+    args = ap.parse_args()
+
+    if args.writer:
+        writer(Path(args.dir), args.writer)
+        return
+
+    _, direct_journal = run("direct", args.rounds)
+    atomic_save, atomic_journal = run("atomic", args.rounds)
+    # 直接覆盖写损坏是预期内的对照结果；原子写与日志都必须零损坏
+    if atomic_save or atomic_journal or direct_journal:
+        print("FAIL: 原子写 / 日志在崩溃后出现了不可加载或不一致的存档")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,40 @@ class AppConfig:
     default_model: str = "deepseek-chat"
     default_temperature: float = 1.0
 
+    # LLM 连接池 / 超时 / 重试
+    llm_timeout: float = 60.0
+    llm_max_connections: int = 10
+    llm_max_keepalive: int = 5
+    llm_max_retries: int = 2
+
+    # 异步后端：叙述流 / 状态提取 / 前情提要在同一个事件循环里并发，共用一个连接池
+    async_llm: bool = True
+    llm_max_concurrency: int = 4      # 同时在途的请求总数
+    llm_side_concurrency: int = 2     # 其中旁路调用（状态 / 提要）最多占用的名额
+
+    # 每次请求的上下文 token 预算（规则 / 剧本 system 消息固定保留）
+    context_token_budget: int = 24000
+
+    # 前情提要：未压缩的旧对话超过阈值后在后台压缩
+    summary_model: str = "deepseek-chat"
+    summary_trigger_tokens: int = 6000
+    summary_keep_recent: int = 6
+
+    # 主持人在流式回复末尾附带 <status> 状态块，省掉每轮单独的状态请求
+    inline_status: bool = False
+
+    # 朗读：后端 auto / pyttsx3 / espeak / file（静音替身）；合成音频缓存在 Cache/tts，按大小 LRU 淘汰
+    tts_backend: str = "auto"
+    tts_voice: str = ""
+    tts_rate: int = 200
+    tts_cache_mb: int = 200
+
+    # 自动存档 / 日志追加的 fsync 合并间隔（秒）：0 表示每次写入都 fsync；退出时统一补齐
+    save_fsync_interval: float = 1.0
+
+    # 语音输入：Vosk 模型目录，留空时用 <项目根>/Model/vosk
+    voice_input_model: str = ""
+
 def load_api_key(key_file: Path) -> str:
     key = key_file.read_text(encoding="utf-8").strip()
     if not key:
@@ -0,0 +1,77 @@
+from __future__ import annotations
+import hashlib
+from pathlib import Path
+
+from core.file_manager import atomic_write_text
+
+_REF_PREFIX = "sha256:"
+
+
+class BlobStore:
+    """
+    Save/ 下的内容寻址文本仓库：规则 / 剧本这类大段 system prompt 只存一份，
+    存档里用 {"role": "system", "content_ref": "sha256:<hex>"} 引用。
+    """
+
+    def __init__(self, root: Path, *, min_chars: int = 1024, encoding: str = "utf-8"):
+        self.root = root
+        self.min_chars = min_chars
+        self.encoding = encoding
+        self._digests: dict[str, str] = {}   # text -> ref
+        self._texts: dict[str, str] = {}     # ref -> text
+
+    def _path(self, ref: str) -> Path:
+        hexdigest = ref[len(_REF_PREFIX):]
+        return self.root / hexdigest[:2] / f"{hexdigest}.txt"
+
+    def put(self, text: str) -> str:
+        ref = self._digests.get(text)
+        if ref is None:
+            ref = _REF_PREFIX + hashlib.sha256(text.encode(self.encoding)).hexdigest()
+        # 即使命中内存缓存也确认文件仍在（后台维护可能回收过无人引用的文本块）
+        path = self._path(ref)
+        if not path.exists():
+            atomic_write_text(path, text, encoding=self.encoding)
+        self._digests[text] = ref
+        self._texts[ref] = text
+        return ref
+
+    def get(self, ref: str) -> str:
+        text = self._texts.get(ref)
+        if text is not None:
+            return text
+        path = self._path(ref)
+        try:
+            text = path.read_text(encoding=self.encoding)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"存档引用的文本块不存在：{path}") from None
+        self._texts[ref] = text
+        self._digests[text] = ref
+        return text
+
+    def pack_messages(self, messages: list[dict]) -> list[dict]:
+        out = []
+        for m in messages:
+            content = m.get("content")
+            if m.get("role") == "system" and isinstance(content, str) and len(content) >= self.min_chars:
+                packed = {k: v for k, v in m.items() if k != "content"}
+                packed["content_ref"] = self.put(content)
+                out.append(packed)
+            else:
+                out.append(m)
+        return out
+
+    def unpack_messages(self, messages: list[dict]) -> list[dict]:
+        """
+        还原 content_ref；旧存档里内联的 content 原样保留。
+        """
+        out = []
+        for m in messages:
+            ref = m.get("content_ref") if isinstance(m, dict) else None
+            if ref is None:
+                out.append(m)
+                continue
+            restored = {k: v for k, v in m.items() if k != "content_ref"}
+            restored["content"] = self.get(ref)
+            out.append(restored)
+        return out
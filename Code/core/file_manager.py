@@ -1,11 +1,62 @@
 from __future__ import annotations
-from dataclasses import dataclass
+import os
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Iterable, Optional
 
+def _fsync_dir(folder: Path) -> None:
+    # Windows 不支持对目录 fsync；rename 本身在 NTFS 上已是原子的
+    if os.name == "nt":
+        return
+    fd = os.open(folder, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_write_text(path: Path, text: str, *, encoding: str="utf-8", fsync: bool=True,
+                      sync_dir: bool=True) -> None:
+    """
+    临时文件 + fsync + rename：任何时刻崩溃，path 要么是旧内容，要么是完整的新内容。
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with tmp.open("w", encoding=encoding, newline="") as f:
+            f.write(text)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    if fsync and sync_dir:
+        _fsync_dir(path.parent)
+
+def append_text(path: Path, text: str, *, encoding: str="utf-8", fsync: bool=True) -> None:
+    """
+    追加写：崩溃最多留下半行，读取方（如 SaveJournal.load）负责忽略不完整的尾行。
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding=encoding, newline="") as f:
+        f.write(text)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+
 @dataclass
 class FileManager:
     encoding: str = "utf-8"
+    # fsync_interval > 0 时合并 fsync：追加写与目录项的 fsync 最多每隔这么久做一次，
+    # 原子写的文件内容仍然先 fsync 再 rename（否则崩溃后可能得到空文件）
+    fsync_interval: float = 0.0
+
+    _dirty: set[Path] = field(default_factory=set, init=False, repr=False)
+    _last_sync: float = field(default=0.0, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
 
     def read_text(self, path: Path, *, verbose: bool=False) -> Optional[str]:
         try:
@@ -23,3 +74,45 @@ class FileManager:
             yield from sorted(folder.rglob("*.txt"))
         else:
             yield from sorted(folder.glob("*.txt"))
+
+    def write_text_atomic(self, path: Path, text: str) -> None:
+        batched = self.fsync_interval > 0
+        atomic_write_text(path, text, encoding=self.encoding, sync_dir=not batched)
+        if batched:
+            self._mark_dirty(path.parent)
+
+    def append_text(self, path: Path, text: str) -> None:
+        batched = self.fsync_interval > 0
+        append_text(path, text, encoding=self.encoding, fsync=not batched)
+        if batched:
+            self._mark_dirty(path)
+
+    def _mark_dirty(self, path: Path) -> None:
+        with self._lock:
+            self._dirty.add(path)
+            due = time.monotonic() - self._last_sync >= self.fsync_interval
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        把合并中的 fsync 立即落盘（退出前调用）。
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            self._last_sync = time.monotonic()
+        for p in dirty:
+            try:
+                if p.is_dir():
+                    _fsync_dir(p)
+                else:
+                    # Windows 上 fsync（FlushFileBuffers）要求句柄可写，只读打开会报 EBADF
+                    fd = os.open(p, os.O_RDWR)
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"[file] fsync 失败：{p}：{e}")
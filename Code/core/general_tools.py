@@ -1,13 +1,52 @@
 import re
+from functools import lru_cache
+
+# 行内元素：代码块 / 图片 / 链接 / 行内代码 / 粗体斜体
+_INLINE = r"""
+  (?P<fence>`{3}[\s\S]*?`{3})
+| !\[(?P<alt>[^\]]*)\]\([^)]+\)
+| \[(?P<label>[^\]]+)\]\([^)]+\)
+| `(?P<code>[^`]+)`
+| \*\*?(?P<emph>[^*]+)\*\*?
+"""
+# 行首元素：分隔线 / 标题、引用、列表标记（可叠加，如 "# - xxx"、"> * xxx"）
+_LINE = r"""
+  ^(?P<hr>---+)$
+| ^(?P<prefix>\#+\s+(?:>\s+)?(?:[-*]\s+)? | >\s+(?:[-*]\s+)? | [-*]\s+)
+"""
+
+_MD_INLINE = re.compile(_INLINE, re.X)
+# 先用前瞻判断当前字符是否可能是标记的开头，普通正文字符直接跳过，不逐个尝试各分支
+_MD_TOKEN = re.compile(r"(?=[-`!\[*\#>])(?:" + _LINE + "|" + _INLINE + ")", re.M | re.X)
+
+# 太长的文本（如整份规则）不进缓存
+_CACHE_MAX_CHARS = 64 * 1024
+
+
+def _replace(m: re.Match) -> str:
+    kind = m.lastgroup
+    if kind in ("fence", "hr", "prefix"):
+        return ""
+    inner = m.group(kind)
+    if kind == "code":
+        return inner
+    # 链接文字 / 图片说明 / 粗体里还可能嵌套其他行内标记
+    return _MD_INLINE.sub(_replace, inner) if inner else inner
+
+
+def _convert(md_text: str) -> str:
+    return _MD_TOKEN.sub(_replace, md_text).strip()
+
+
+_convert_cached = lru_cache(maxsize=2048)(_convert)
+
 
 def markdown_to_text(md_text: str) -> str:
-    text = re.sub(r'^(#+)\s+', '', md_text, flags=re.M)
-    text = re.sub(r'\*\*?([^*]+)\*\*?', r'\1', text)
-    text = re.sub(r'!\[([^\]]*)\]\([^)]+\)', r'\1', text)
-    text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)
-    text = re.sub(r'^>\s+', '', text, flags=re.M)
-    text = re.sub(r'`{3}[\s\S]*?`{3}', '', text)
-    text = re.sub(r'`([^`]+)`', r'\1', text)
-    text = re.sub(r'^(-|\*)\s+', '', text, flags=re.M)
-    text = re.sub(r'^---+$', '', text, flags=re.M)
-    return text.strip()
+    """
+    去掉 Markdown 标记，只保留正文（用于历史、朗读与发给模型的上下文）。
+    所有规则合并为一个预编译正则，单遍扫描；同一条消息会在提交、朗读、历史重绘、读档时
+    反复转换，结果按内容缓存（lru_cache 以字符串哈希为键）。
+    """
+    if len(md_text) > _CACHE_MAX_CHARS:
+        return _convert(md_text)
+    return _convert_cached(md_text)
@@ -0,0 +1,97 @@
+from __future__ import annotations
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+# 阶段分隔标记：子进程在两组 import 之间写到 stderr，解析时据此切分
+_PHASE_MARK = "@@phase "
+
+
+@dataclass
+class ImportCost:
+    phase: str
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+    @property
+    def self_ms(self) -> float:
+        return self.self_us / 1000.0
+
+    @property
+    def cumulative_ms(self) -> float:
+        return self.cumulative_us / 1000.0
+
+
+def parse_importtime(text: str, phase: str = "") -> list[ImportCost]:
+    """
+    解析 `python -X importtime` 的 stderr：
+        import time: self [us] | cumulative | imported package
+        import time:       123 |        456 |   llm.llm_client
+    模块名前每两个空格为一层嵌套；遇到 "@@phase <名字>" 行切换阶段，之前的行（解释器自身启动）记为 phase。
+    """
+    rows: list[ImportCost] = []
+    for line in text.splitlines():
+        if line.startswith(_PHASE_MARK):
+            phase = line[len(_PHASE_MARK):].strip()
+            continue
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cum_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # 表头
+        name = parts[2].rstrip()
+        stripped = name.lstrip(" ")
+        rows.append(ImportCost(phase, stripped, self_us, cum_us, (len(name) - len(stripped) - 1) // 2))
+    return rows
+
+
+def profile_imports(phases: Sequence[tuple[str, Sequence[str]]], *, cwd: Optional[Path] = None,
+                    python: str = sys.executable, timeout: float = 120.0) -> list[ImportCost]:
+    """
+    在全新的子进程里按阶段依次导入模块，返回每个模块的导入耗时。
+    后一阶段只计入前面阶段还没导入过的模块，正好对应“启动时导入”与“按需导入”的增量成本。
+    """
+    lines = ["import sys"]
+    for phase, modules in phases:
+        lines.append(f"sys.stderr.write({(_PHASE_MARK + phase + chr(10))!r}); sys.stderr.flush()")
+        lines.extend(f"import {m}" for m in modules)
+    proc = subprocess.run([python, "-X", "importtime", "-c", "\n".join(lines)], cwd=cwd,
+                          capture_output=True, text=True, encoding="utf-8", errors="replace", timeout=timeout)
+    if proc.returncode != 0:
+        tail = "\n".join(proc.stderr.splitlines()[-5:])
+        raise RuntimeError(f"导入失败（exit {proc.returncode}）：\n{tail}")
+    return parse_importtime(proc.stderr, phase="python")
+
+
+def phase_totals(rows: Sequence[ImportCost]) -> dict[str, float]:
+    """
+    每个阶段的总导入耗时（毫秒）= 该阶段顶层模块的累计耗时之和。
+    """
+    totals: dict[str, float] = {}
+    for r in rows:
+        if r.depth == 0:
+            totals[r.phase] = totals.get(r.phase, 0.0) + r.cumulative_ms
+    return totals
+
+
+def format_table(rows: Sequence[ImportCost], *, top: int = 30) -> str:
+    """
+    按累计耗时从高到低列出前 top 个模块，末尾附各阶段合计。
+    """
+    ranked = sorted(rows, key=lambda r: r.cumulative_us, reverse=True)[:top]
+    width = max([len(r.module) for r in ranked] + [6])
+    out = [f"{'phase':<10} {'module':<{width}} {'self ms':>9} {'cum ms':>9}"]
+    for r in ranked:
+        out.append(f"{r.phase:<10} {r.module:<{width}} {r.self_ms:>9.1f} {r.cumulative_ms:>9.1f}")
+    out.append("")
+    for phase, total in phase_totals(rows).items():
+        out.append(f"{phase:<10} total {total:>9.1f} ms")
+    return "\n".join(out)
@@ -1,22 +1,53 @@
 from __future__ import annotations
 import json
+from typing import Optional
+
+class JSONObjectScanner:
+    """
+    增量扫描第一段括号平衡的 {...}：可分多次 feed（流式 chunk），
+    正确跳过字符串内部的括号与转义引号。
+    """
+    def __init__(self):
+        self._buf: list[str] = []
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self.result: Optional[str] = None
+
+    def feed(self, text: str) -> Optional[str]:
+        if self.result is not None:
+            return self.result
+        for ch in text:
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._buf.append(ch)
+                continue
+
+            self._buf.append(ch)
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+            elif ch == '"':
+                self._in_str = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.result = "".join(self._buf)
+                    return self.result
+        return None
 
 def _extract_first_json_object(s: str) -> str | None:
     """
     从字符串中提取第一段括号平衡的 {...}。
     """
-    start = s.find("{")
-    if start < 0:
-        return None
-    depth = 0
-    for i in range(start, len(s)):
-        if s[i] == "{":
-            depth += 1
-        elif s[i] == "}":
-            depth -= 1
-            if depth == 0:
-                return s[start:i+1]
-    return None
+    return JSONObjectScanner().feed(s)
 
 def parse_json_object(s: str) -> dict:
     # 轻量替换中文符号（不做 destructive 变换）
@@ -1,7 +1,17 @@
 from __future__ import annotations
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
+from typing import Optional, TextIO, Union
+
+_MODES = {"total": ("total",), "game": ("game", "total"), "story": ("story", "total")}
+
 
 @dataclass(order=True)
 class LogData:
@@ -9,37 +19,198 @@ class LogData:
     time: str
     owner: str
     content: str
+    mode: str = "total"
+
+    def to_json(self) -> str:
+        return json.dumps({"time": self.time, "session": self.start_time, "mode": self.mode,
+                           "owner": self.owner, "content": self.content},
+                          ensure_ascii=False, separators=(",", ":"))
+
 
 class LogManager:
-    def __init__(self, log_dir: Path):
+    """
+    追加式日志：Log/{game,story,total}_log.jsonl，每行一条 {time, session, mode, owner, content}。
+    - update() 只把条目放进内存环形缓冲和写入队列，开销与会话长度无关；
+    - 后台线程批量追加写入，每 flush_interval 秒刷一次盘；dump() 等待已提交的条目全部落盘；
+    - 单个文件超过 max_bytes 时轮转为 *.1.jsonl ... *.<backups>.jsonl，最旧的删除；
+    - game_log / story_log / total_log 只保留最近 keep 条，供界面查看。
+    """
+
+    def __init__(self, log_dir: Path, *, keep: int = 500, flush_interval: float = 1.0,
+                 max_bytes: int = 5 * 1024 * 1024, backups: int = 5, fsync: bool = False):
         self.log_dir = log_dir
         self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.fsync = fsync
 
         self.start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.game_log: list[LogData] = []
-        self.story_log: list[LogData] = []
-        self.total_log: list[LogData] = []
+        self.game_log: deque[LogData] = deque(maxlen=keep)
+        self.story_log: deque[LogData] = deque(maxlen=keep)
+        self.total_log: deque[LogData] = deque(maxlen=keep)
+        self._lock = threading.Lock()
+
+        # 写入队列：LogData / threading.Event（dump 的刷盘请求）/ None（关闭）
+        self._q: queue.Queue[Union[LogData, threading.Event, None]] = queue.Queue()
+        self._files: dict[str, TextIO] = {}
+        self._sizes: dict[str, int] = {}
+        self._closed = False
+        self.written = 0
+        self.rotations = 0
+        self._t = threading.Thread(target=self._writer_loop, name="log-writer", daemon=True)
+        self._t.start()
+
+    def path(self, target: str, index: int = 0) -> Path:
+        suffix = f".{index}" if index else ""
+        return self.log_dir / f"{target}_log{suffix}.jsonl"
 
     def update(self, content: str, owner: str="system", mode: str="total") -> None:
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        item = LogData(self.start_time, now, owner, content)
-
-        if mode == "game":
-            self.game_log.append(item); self.total_log.append(item)
-        elif mode == "story":
-            self.story_log.append(item); self.total_log.append(item)
-        elif mode == "total":
-            self.total_log.append(item)
-        else:
+        targets = _MODES.get(mode)
+        if targets is None:
             raise ValueError("mode must be one of: total/game/story")
+        if self._closed:
+            raise RuntimeError("LogManager 已关闭")
+        now = datetime.now().isoformat(sep=" ", timespec="milliseconds")
+        item = LogData(self.start_time, now, owner, content, mode)
+        with self._lock:
+            for target in targets:
+                getattr(self, f"{target}_log").append(item)
+        self._q.put(item)
+
+    def recent(self, mode: str = "total", n: Optional[int] = None) -> list[LogData]:
+        if mode not in _MODES:
+            raise ValueError("mode must be one of: total/game/story")
+        with self._lock:
+            items = list(getattr(self, f"{mode}_log"))
+        return items[-n:] if n else items
+
+    def dump(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待此前 update() 的条目全部写入并刷盘；返回是否在 timeout 内完成。
+        """
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._q.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._q.put(None)
+        self._t.join(timeout)
+
+    # ---------------------------
+    # Writer thread
+    # ---------------------------
+
+    def _open(self, target: str) -> TextIO:
+        f = self._files.get(target)
+        if f is None:
+            path = self.path(target)
+            f = self._files[target] = open(path, "a", encoding="utf-8", newline="\n")
+            self._sizes[target] = path.stat().st_size
+        return f
+
+    def _rotate(self, target: str) -> None:
+        self._files.pop(target).close()
+        oldest = self.path(target, self.backups)
+        if oldest.exists():
+            oldest.unlink()
+        for i in range(self.backups - 1, -1, -1):
+            src = self.path(target, i)
+            if src.exists():
+                os.replace(src, self.path(target, i + 1))
+        self.rotations += 1
+
+    def _write(self, target: str, lines: list[str]) -> None:
+        """
+        按行累计大小，写满 max_bytes 就轮转，连续的行合并成一次 write。
+        """
+        f = self._open(target)
+        size = self._sizes[target]
+        pending: list[str] = []
+        for line in lines:
+            n = len(line.encode("utf-8"))
+            if size and size + n > self.max_bytes:
+                f.write("".join(pending))
+                pending = []
+                f.flush()
+                self._rotate(target)
+                f = self._open(target)
+                size = 0
+            pending.append(line)
+            size += n
+        f.write("".join(pending))
+        self._sizes[target] = size
+
+    def _flush(self) -> None:
+        for target, f in self._files.items():
+            try:
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            except OSError as e:
+                print(f"[log] 刷新 {target} 日志失败：{e}")
+
+    def _write_batch(self, items: list[LogData]) -> None:
+        lines: dict[str, list[str]] = {}
+        for item in items:
+            line = item.to_json() + "\n"
+            for target in _MODES[item.mode]:
+                lines.setdefault(target, []).append(line)
+        for target, parts in lines.items():
+            try:
+                self._write(target, parts)
+            except OSError as e:
+                print(f"[log] 写入 {target} 日志失败：{e}")
+        self.written += len(items)
+
+    def _writer_loop(self) -> None:
+        last_flush = time.monotonic()
+        dirty = False
+        while True:
+            try:
+                first = self._q.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if dirty:
+                    self._flush()
+                    dirty = False
+                    last_flush = time.monotonic()
+                continue
+
+            # 取走队列里已有的全部条目，合并成每个文件一次写入
+            batch = [first]
+            while True:
+                try:
+                    batch.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
 
-    def dump(self) -> None:
-        def write(path: Path, data: list[LogData]):
-            path.parent.mkdir(parents=True, exist_ok=True)
-            with path.open("w", encoding="utf-8") as f:
-                for x in data:
-                    f.write(f"[{x.start_time}] >> [{x.owner}]: {x.content}\n")
+            items: list[LogData] = []
+            waiters: list[threading.Event] = []
+            stop = False
+            for x in batch:
+                if x is None:
+                    stop = True
+                elif isinstance(x, threading.Event):
+                    waiters.append(x)
+                else:
+                    items.append(x)
+            if items:
+                self._write_batch(items)
+                dirty = True
 
-        write(self.log_dir / "game_log.txt", self.game_log)
-        write(self.log_dir / "story_log.txt", self.story_log)
-        write(self.log_dir / "total_log.txt", self.total_log)
+            if waiters or stop or (dirty and time.monotonic() - last_flush >= self.flush_interval):
+                self._flush()
+                dirty = False
+                last_flush = time.monotonic()
+            for w in waiters:
+                w.set()
+            if stop:
+                for f in self._files.values():
+                    f.close()
+                self._files.clear()
+                return
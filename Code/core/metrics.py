@@ -0,0 +1,127 @@
+from __future__ import annotations
+import bisect
+import csv
+import io
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Optional, Sequence
+
+from core.file_manager import atomic_write_text
+
+# 默认桶边界（毫秒）：覆盖 10ms ~ 60s 的请求 / UI 耗时
+MS_BOUNDS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+# tokens/s 的桶边界
+RATE_BOUNDS = (5, 10, 20, 30, 50, 75, 100, 150, 250)
+
+
+class Histogram:
+    """
+    固定桶计数 + 最近 N 个样本（用于分位数）。observe() 只做一次二分和几次加法。
+    """
+
+    def __init__(self, bounds: Sequence[float] = MS_BOUNDS, *, keep: int = 512):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.recent: deque[float] = deque(maxlen=keep)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.total += value
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+            self.recent.append(value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            data = sorted(self.recent)
+        if not data:
+            return None
+        return data[min(len(data) - 1, int(q * len(data)))]
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        with self._lock:
+            out = {
+                "count": self.count,
+                "mean": round(self.total / self.count, 2),
+                "min": round(self.min, 2),
+                "max": round(self.max, 2),
+                "buckets": {f"<={b}": c for b, c in zip(self.bounds, self.counts)} | {"+inf": self.counts[-1]},
+            }
+        for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            out[name] = round(self.quantile(q), 2)
+        return out
+
+
+class MetricsRegistry:
+    """
+    进程内的轻量指标：按名字分组的直方图 + 最近若干轮的逐轮记录。
+    LLMClient 记录 llm.<purpose>.*（首字延迟 / 总耗时 / tokens/s），
+    界面记录 turn.*（整轮耗时、状态更新、存档、UI 阻塞）。可导出到 Log/。
+    """
+
+    def __init__(self, *, keep_turns: int = 1000):
+        self._hists: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self.turns: deque[dict] = deque(maxlen=keep_turns)
+        self.started = time.time()
+
+    def histogram(self, name: str, bounds: Optional[Sequence[float]] = None) -> Histogram:
+        h = self._hists.get(name)
+        if h is None:
+            with self._lock:
+                h = self._hists.get(name)
+                if h is None:
+                    h = self._hists[name] = Histogram(bounds or (RATE_BOUNDS if name.endswith("tokens_per_s") else MS_BOUNDS))
+        return h
+
+    def observe(self, name: str, value: Optional[float]) -> None:
+        if value is not None:
+            self.histogram(name).observe(float(value))
+
+    def record_turn(self, record: dict) -> None:
+        self.turns.append(dict(record, time=time.strftime("%Y-%m-%d %H:%M:%S")))
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            items = sorted(self._hists.items())
+        return {name: h.summary() for name, h in items}
+
+    def export(self, log_dir: Path) -> tuple[Path, Path]:
+        """
+        写出 TRPG_METRICS_<时间>.json（直方图汇总 + 逐轮记录）与同名 .csv（逐轮记录）。
+        """
+        ts = time.strftime("%Y%m%d_%H%M%S")
+        json_path = log_dir / f"TRPG_METRICS_{ts}.json"
+        csv_path = log_dir / f"TRPG_METRICS_{ts}.csv"
+        turns = list(self.turns)
+        payload = {"started": self.started, "exported": time.time(), "histograms": self.snapshot(), "turns": turns}
+        atomic_write_text(json_path, json.dumps(payload, ensure_ascii=False, indent=2))
+
+        cols: list[str] = []
+        for t in turns:
+            cols.extend(k for k in t if k not in cols)
+        buf = io.StringIO()
+        w = csv.DictWriter(buf, fieldnames=cols)
+        w.writeheader()
+        w.writerows(turns)
+        atomic_write_text(csv_path, buf.getvalue(), encoding="utf-8-sig")
+        return json_path, csv_path
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
@@ -0,0 +1,165 @@
+from __future__ import annotations
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Optional
+
+from core.file_manager import atomic_write_text
+
+INDEX_NAME = "index.json"
+_INDEX_VERSION = 2
+
+
+def session_key(history: list[dict]) -> str:
+    """
+    按开头的规则 / 剧本 system 消息归组：同一剧本的存档属于同一组。
+    已做内容寻址的存档直接用 content_ref；旧存档按同样的 sha256 口径计算，两者归到同一组。
+    """
+    h = hashlib.sha1()
+    for m in history[:2]:
+        if m.get("role") != "system":
+            break
+        ref = m.get("content_ref") or "sha256:" + hashlib.sha256(str(m.get("content", "")).encode("utf-8")).hexdigest()
+        h.update(ref.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+
+def _preview(history: list[dict]) -> str:
+    for m in reversed(history):
+        if m.get("role") == "assistant":
+            return str(m.get("content", "")).strip().replace("\n", " ")[:60]
+    return ""
+
+
+def describe_save(path: Path) -> dict:
+    """
+    读取一个存档并提取索引条目（仅在文件新增或变更时调用）。
+    """
+    st = path.stat()
+    entry = {
+        "name": path.name,
+        "mtime": st.st_mtime,
+        "size": st.st_size,
+        "kind": "journal" if path.suffix == ".jsonl" else ("auto" if "_AUTO_" in path.name else "manual"),
+    }
+
+    if path.suffix == ".jsonl":
+        lines = path.read_text(encoding="utf-8").splitlines()
+        history: list[dict] = []
+        last_messages: list[dict] = []
+        meta: dict = {}
+        turns = snapshots = 0
+        for line in lines:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            if rec.get("type") == "snapshot":
+                snapshots += 1
+                history = last_messages = rec.get("history") or []
+                turns = sum(1 for m in history if m.get("role") == "user")
+            else:
+                msgs = rec.get("messages") or []
+                turns += sum(1 for m in msgs if m.get("role") == "user")
+                if msgs:
+                    last_messages = msgs
+            meta.update(rec.get("meta") or {})
+        entry.update(lines=len(lines), snapshots=snapshots)
+    else:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        history = data.get("history", []) if isinstance(data, dict) else data
+        meta = data.get("meta", {}) if isinstance(data, dict) else {}
+        turns = sum(1 for m in history if m.get("role") == "user")
+        last_messages = history
+
+    entry.update(
+        session=session_key(history),
+        refs=sorted({m["content_ref"] for m in history if isinstance(m, dict) and "content_ref" in m}),
+        campaign=meta.get("campaign", ""),
+        rule=meta.get("rule", ""),
+        story=meta.get("story", ""),
+        timestamp=meta.get("timestamp", ""),
+        turns=turns,
+        preview=_preview(last_messages),
+    )
+    return entry
+
+
+class SaveIndex:
+    """
+    Save/index.json：存档列表的缓存，按 (mtime, size) 增量刷新，
+    列出 / 筛选存档时不必逐个打开 JSON。
+    """
+
+    def __init__(self, save_dir: Path):
+        self.save_dir = save_dir
+        self.path = save_dir / INDEX_NAME
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        self.failed: set[str] = set()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if data.get("version") == _INDEX_VERSION:
+            self._entries = {e["name"]: e for e in data.get("entries", [])}
+
+    def _dump(self) -> None:
+        payload = {"version": _INDEX_VERSION, "entries": list(self._entries.values())}
+        atomic_write_text(self.path, json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+
+    def refresh(self) -> bool:
+        """
+        扫描 Save/ 下的存档，只重新解析新增或变更的文件。返回索引是否有变化。
+        """
+        changed = False
+        seen = set()
+        failed = set()
+        paths = sorted(self.save_dir.glob("TRPG_SAVE_*.json")) + sorted(self.save_dir.glob("TRPG_SAVE_*.jsonl"))
+        for p in paths:
+            seen.add(p.name)
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            with self._lock:
+                old = self._entries.get(p.name)
+            if old and old.get("mtime") == st.st_mtime and old.get("size") == st.st_size:
+                continue
+            try:
+                entry = describe_save(p)
+            except (OSError, ValueError, KeyError, AttributeError, IndexError):
+                failed.add(p.name)
+                continue
+            with self._lock:
+                self._entries[p.name] = entry
+            changed = True
+
+        self.failed = failed
+        with self._lock:
+            for name in set(self._entries) - seen:
+                del self._entries[name]
+                changed = True
+            if changed:
+                self._dump()
+        return changed
+
+    def forget(self, names: list[str]) -> None:
+        with self._lock:
+            for n in names:
+                self._entries.pop(n, None)
+            self._dump()
+
+    def entries(self, *, newest_first: bool = True) -> list[dict]:
+        with self._lock:
+            items = list(self._entries.values())
+        return sorted(items, key=lambda e: e.get("mtime", 0), reverse=newest_first)
+
+    def get(self, name: str) -> Optional[dict]:
+        with self._lock:
+            return self._entries.get(name)
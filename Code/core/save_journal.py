@@ -0,0 +1,130 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Any, Optional
+
+from core.blob_store import BlobStore
+from core.file_manager import FileManager
+
+_SNAPSHOT_PREFIX = '{"type":"snapshot"'
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class SaveJournal:
+    """
+    追加式自动存档（JSONL）：
+    - 第一行是完整快照 {"type":"snapshot", history, status, summary, meta}
+    - 之后每轮只追加 {"type":"turn", base, messages, status_diff, ...}：
+      history 截断到 base 再追加 messages（base 小于已写长度即表示“重试”回滚）
+    - 每 snapshot_every 轮再写一次快照，加载时只需从最后一个快照开始重放
+    - 传入 blobs 时，规则 / 剧本等大段 system 消息只写内容哈希引用
+    """
+
+    def __init__(self, path: Path, *, snapshot_every: int = 50, blobs: Optional[BlobStore] = None,
+                 fm: Optional[FileManager] = None):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.blobs = blobs
+        self.fm = fm or FileManager()
+
+        self._written: list[dict] = []
+        self._status: dict = {}
+        self._summary: Optional[dict] = None
+        self._turns_since_snapshot = 0
+        self._broken = False
+
+    def append(self, payload: dict) -> int:
+        """
+        payload 与整档存档格式相同（history / status / summary / meta）。返回本次写入的字节数。
+        """
+        history: list[dict] = payload.get("history") or []
+        status: dict = payload.get("status") or {}
+        summary = payload.get("summary")
+        meta = payload.get("meta") or {}
+
+        if not self._written or self._turns_since_snapshot >= self.snapshot_every:
+            record = {"type": "snapshot", "history": self._pack(history), "status": status, "summary": summary, "meta": meta}
+            self._turns_since_snapshot = 0
+        else:
+            # 按对象身份比较：history 里的消息 dict 不会被原地修改，重试只会 pop 尾部
+            base = 0
+            n = min(len(history), len(self._written))
+            while base < n and history[base] is self._written[base]:
+                base += 1
+
+            record = {"type": "turn", "base": base, "messages": self._pack(history[base:]), "meta": meta}
+            if status.keys() == self._status.keys():
+                record["status_diff"] = {k: v for k, v in status.items() if self._status.get(k) != v}
+            else:
+                record["status"] = status
+            if summary != self._summary:
+                record["summary"] = summary
+            self._turns_since_snapshot += 1
+
+        line = _dumps(record) + "\n"
+        if self._broken:
+            line = "\n" + line
+        try:
+            self.fm.append_text(self.path, line)
+        except BaseException:
+            # 可能留下了半行：下次先换行收尾，再写一个完整快照，加载时从它开始重放
+            self._written = []
+            self._broken = True
+            raise
+        self._broken = False
+
+        self._written = list(history)
+        self._status = dict(status)
+        self._summary = summary
+        return len(line.encode("utf-8"))
+
+    def _pack(self, messages: list[dict]) -> list[dict]:
+        return self.blobs.pack_messages(messages) if self.blobs is not None else messages
+
+    @staticmethod
+    def load(path: Path, blobs: Optional[BlobStore] = None) -> dict:
+        """
+        从最后一个快照开始重放，返回与整档存档相同结构的 dict。
+        结尾若有写了一半的行（崩溃 / 断电），忽略它，得到上一轮的完整状态。
+        """
+        lines = path.read_text(encoding="utf-8").splitlines()
+        start = None
+        snap: dict = {}
+        for i in range(len(lines) - 1, -1, -1):
+            if lines[i].startswith(_SNAPSHOT_PREFIX):
+                try:
+                    snap = json.loads(lines[i])
+                except json.JSONDecodeError:
+                    continue  # 写到一半的快照
+                start = i
+                break
+        if start is None:
+            raise ValueError(f"存档日志中没有完整快照：{path}")
+
+        history = list(snap.get("history") or [])
+        status = dict(snap.get("status") or {})
+        summary = snap.get("summary")
+        meta = dict(snap.get("meta") or {})
+
+        for line in lines[start + 1:]:
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            del history[rec.get("base", len(history)):]
+            history.extend(rec.get("messages") or [])
+            if "status" in rec:
+                status = dict(rec["status"])
+            status.update(rec.get("status_diff") or {})
+            if "summary" in rec:
+                summary = rec["summary"]
+            meta.update(rec.get("meta") or {})
+
+        if blobs is not None:
+            history = blobs.unpack_messages(history)
+        return {"history": history, "status": status, "summary": summary, "meta": meta}
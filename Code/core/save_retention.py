@@ -0,0 +1,178 @@
+from __future__ import annotations
+import json
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from core.blob_store import BlobStore
+from core.file_manager import atomic_write_text
+from core.save_index import SaveIndex
+from core.save_journal import SaveJournal
+from core.save_search import SaveSearch
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    keep_last: int = 5            # 每局（campaign）最近的 N 个自动存档
+    hourly_hours: int = 24        # 最近 24 小时内每小时保留一个
+    daily_days: int = 30          # 最近 30 天内每天保留一个
+    compact_lines: int = 200      # 非活动日志超过这么多行就压成单个快照
+    blob_grace_s: float = 3600.0  # 未被引用的文本块至少闲置这么久才删除
+
+
+def retention_group(e: dict) -> str:
+    """
+    按局归组：新游戏时生成 campaign 写进存档 meta，读档后继续沿用。
+    没有 campaign 的旧存档各自成组（即永不删除）：无法判断它们是否属于同一局，宁可不清理。
+    """
+    return e.get("campaign") or f"file:{e['name']}"
+
+
+def select_expired(entries: list[dict], policy: RetentionPolicy, *, now: float,
+                   protect: frozenset[str] = frozenset()) -> list[str]:
+    """
+    只处理自动存档（旧式 AUTO json 与 jsonl 日志）；手动存档永不删除。
+    同一局内：最新一个永远保留，另外最近 keep_last 个 + 每小时最新一个 + 每天最新一个保留，其余过期。
+    不跨局清理：每一局至少留下最新的存档；单个日志内部的精简由日志压缩负责。
+    """
+    groups: dict[str, list[dict]] = {}
+    for e in entries:
+        if e.get("kind") in ("auto", "journal"):
+            groups.setdefault(retention_group(e), []).append(e)
+
+    expired: list[str] = []
+    for items in groups.values():
+        items.sort(key=lambda e: e["mtime"], reverse=True)
+        keep = {e["name"] for e in items[:max(1, policy.keep_last)]}
+
+        hours: set[str] = set()
+        days: set[str] = set()
+        for e in items:
+            age = now - e["mtime"]
+            hour = time.strftime("%Y%m%d%H", time.localtime(e["mtime"]))
+            day = hour[:8]
+            if age <= policy.hourly_hours * 3600 and hour not in hours:
+                hours.add(hour)
+                keep.add(e["name"])
+            if age <= policy.daily_days * 86400 and day not in days:
+                days.add(day)
+                keep.add(e["name"])
+
+        expired.extend(e["name"] for e in items if e["name"] not in keep and e["name"] not in protect)
+    return expired
+
+
+class SaveMaintenance:
+    """
+    Save/ 的后台维护线程：刷新存档索引、按保留策略清理自动存档、
+    把不再写入的日志压成单个快照、回收无人引用的文本块，并增量更新跨存档检索库。
+    每次自动存档后 request() 一下即可，多次请求会合并执行。
+    """
+
+    def __init__(self, save_dir: Path, blobs: BlobStore, policy: Optional[RetentionPolicy] = None,
+                 *, debounce_s: float = 2.0, search: Optional[SaveSearch] = None):
+        self.save_dir = save_dir
+        self.blobs = blobs
+        self.policy = policy or RetentionPolicy()
+        self.debounce_s = debounce_s
+        self.index = SaveIndex(save_dir)
+        self.search = search
+
+        self._active: Optional[Path] = None
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._t = threading.Thread(target=self._loop, daemon=True)
+        self._t.start()
+
+    def request(self, active: Optional[Path] = None, *, on_done: Optional[Callable[[], None]] = None) -> None:
+        """
+        active：当前会话正在追加的日志，维护时跳过它。
+        on_done：下一次维护结束后在维护线程里调用一次（界面需自行投递回 Tk 主线程）。
+        """
+        if active is not None:
+            self._active = active
+        if on_done is not None:
+            with self._lock:
+                self._callbacks.append(on_done)
+        self._wake.set()
+
+    def close(self) -> None:
+        self._closed.set()
+        self._wake.set()
+
+    def _loop(self):
+        while not self._closed.is_set():
+            self._wake.wait()
+            if self._closed.is_set():
+                break
+            # 合并短时间内的多次请求
+            time.sleep(self.debounce_s)
+            self._wake.clear()
+            with self._lock:
+                callbacks, self._callbacks = self._callbacks, []
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[save] 存档维护失败：{e}")
+            for cb in callbacks:
+                try:
+                    cb()
+                except Exception as e:
+                    print(f"[save] 维护回调失败：{e}")
+
+    def run_once(self, *, now: Optional[float] = None) -> list[str]:
+        now = time.time() if now is None else now
+        active = self._active.name if self._active is not None else ""
+        self.index.refresh()
+
+        expired = select_expired(self.index.entries(), self.policy, now=now, protect=frozenset({active}))
+        for name in expired:
+            try:
+                (self.save_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+        if expired:
+            self.index.forget(expired)
+
+        for e in self.index.entries():
+            if e.get("kind") == "journal" and e["name"] != active and e.get("lines", 0) > self.policy.compact_lines:
+                self._compact_journal(self.save_dir / e["name"])
+
+        self.index.refresh()
+        self._collect_blobs(now)
+        if self.search is not None:
+            self.search.refresh()
+        return expired
+
+    def _compact_journal(self, path: Path) -> None:
+        state = SaveJournal.load(path, self.blobs)
+        record = {
+            "type": "snapshot",
+            "history": self.blobs.pack_messages(state["history"]),
+            "status": state["status"],
+            "summary": state["summary"],
+            "meta": state["meta"],
+        }
+        atomic_write_text(path, json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def _collect_blobs(self, now: float) -> None:
+        root = self.blobs.root
+        # 有存档解析失败时不知道它引用了哪些文本块，本轮不回收
+        if not root.exists() or self.index.failed:
+            return
+        referenced = set()
+        for e in self.index.entries():
+            referenced.update(e.get("refs") or [])
+        for p in root.glob("*/*.txt"):
+            ref = "sha256:" + p.stem
+            if ref in referenced:
+                continue
+            try:
+                if now - p.stat().st_mtime >= self.policy.blob_grace_s:
+                    p.unlink()
+            except FileNotFoundError:
+                pass
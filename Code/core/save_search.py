@@ -0,0 +1,231 @@
+from __future__ import annotations
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+from core.save_journal import SaveJournal
+
+DB_NAME = "search.sqlite3"
+_DB_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files(
+    name TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    rule TEXT NOT NULL DEFAULT '',
+    story TEXT NOT NULL DEFAULT '',
+    timestamp TEXT NOT NULL DEFAULT '',
+    digests TEXT NOT NULL DEFAULT '[]'
+);
+CREATE TABLE IF NOT EXISTS msgs(
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS msgs_file_pos ON msgs(file, pos);
+CREATE VIRTUAL TABLE IF NOT EXISTS msgs_fts USING fts5(
+    content, content='msgs', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS msgs_ai AFTER INSERT ON msgs BEGIN
+    INSERT INTO msgs_fts(rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS msgs_ad AFTER DELETE ON msgs BEGIN
+    INSERT INTO msgs_fts(msgs_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+_ROLE_EN = {"系统": "system", "玩家": "user", "主持人": "assistant", "工具": "tool"}
+# export_replay_txt 的块格式：【角色】\n正文\n----…\n\n
+_REPLAY_BLOCK = re.compile(r"【(.+?)】\n(.*?)\n-{40}\n\n", re.S)
+
+
+def _digest(role: str, content: str) -> str:
+    return hashlib.sha1(f"{role}\0{content}".encode("utf-8")).hexdigest()[:12]
+
+
+def _read_save(path: Path) -> tuple[list[tuple[str, str]], dict]:
+    if path.suffix == ".jsonl":
+        data = SaveJournal.load(path)
+    else:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, list):
+        history, meta = data, {}
+    else:
+        history, meta = data.get("history", []), data.get("meta") or {}
+    # 规则 / 剧本全文（含已做内容寻址的 content_ref）每局都一样，不进索引
+    docs = [(m.get("role", ""), str(m.get("content", ""))) for m in history
+            if isinstance(m, dict) and m.get("role") != "system" and m.get("content")]
+    return docs, meta
+
+
+def _read_replay(path: Path) -> tuple[list[tuple[str, str]], dict]:
+    text = path.read_text(encoding="utf-8")
+    docs = []
+    for role_cn, content in _REPLAY_BLOCK.findall(text):
+        role = _ROLE_EN.get(role_cn, role_cn)
+        if role != "system" and content.strip():
+            docs.append((role, content))
+    ts = path.stem[len("TRPG_REPLAY_"):]
+    return docs, {"timestamp": ts}
+
+
+def make_snippet(content: str, terms: list[str], *, width: int = 30) -> str:
+    """
+    取第一个命中词前后 width 个字符，命中处用 «» 标出。
+    """
+    low = content.lower()
+    hit, term = -1, ""
+    for t in terms:
+        i = low.find(t.lower())
+        if i >= 0 and (hit < 0 or i < hit):
+            hit, term = i, t
+    if hit < 0:
+        return content[:width * 2].replace("\n", " ")
+    a = max(0, hit - width)
+    b = min(len(content), hit + len(term) + width)
+    s = content[a:hit] + "«" + content[hit:hit + len(term)] + "»" + content[hit + len(term):b]
+    return ("…" if a else "") + s.replace("\n", " ") + ("…" if b < len(content) else "")
+
+
+class SaveSearch:
+    """
+    跨存档全文检索：Save/search.sqlite3（SQLite FTS5，trigram 分词，中文无需分词）。
+    - 数据来源：Save/ 下的存档与自动存档日志、Log/ 下导出的回放；
+    - refresh() 按 (mtime, size) 增量更新，同一文件只重建与上次不同的尾部消息，
+      由 SaveMaintenance 在每次自动存档后的后台维护中调用，查询时不扫描文件；
+    - 不足 3 个字的关键词无法走 trigram 索引，退化为 LIKE 过滤。
+    """
+
+    def __init__(self, save_dir: Path, log_dir: Optional[Path] = None):
+        self.save_dir = save_dir
+        self.log_dir = log_dir
+        self.path = save_dir / DB_NAME
+        self.failed: set[str] = set()
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            if conn.execute("PRAGMA user_version").fetchone()[0] != _DB_VERSION:
+                conn.executescript("DROP TABLE IF EXISTS msgs_fts; DROP TABLE IF EXISTS msgs; DROP TABLE IF EXISTS files;")
+            conn.executescript(_SCHEMA)
+            conn.execute(f"PRAGMA user_version={_DB_VERSION}")
+            conn.commit()
+            self._ready = True
+        return conn
+
+    def _sources(self) -> list[tuple[str, Path]]:
+        out = [("save", p) for p in sorted(self.save_dir.glob("TRPG_SAVE_*.json"))]
+        out += [("save", p) for p in sorted(self.save_dir.glob("TRPG_SAVE_*.jsonl"))]
+        if self.log_dir is not None:
+            out += [("replay", p) for p in sorted(self.log_dir.glob("TRPG_REPLAY_*.txt"))]
+        return out
+
+    def refresh(self) -> int:
+        """
+        增量同步索引，返回新写入的消息条数。
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                return self._refresh(conn)
+            finally:
+                conn.close()
+
+    def _refresh(self, conn: sqlite3.Connection) -> int:
+        known = {row[0]: row[1:] for row in conn.execute("SELECT name, mtime, size, digests FROM files")}
+        seen: set[str] = set()
+        failed: set[str] = set()
+        added = 0
+        for source, p in self._sources():
+            seen.add(p.name)
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            old = known.get(p.name)
+            if old and old[0] == st.st_mtime and old[1] == st.st_size:
+                continue
+            try:
+                docs, meta = _read_save(p) if source == "save" else _read_replay(p)
+            except (OSError, ValueError, AttributeError, TypeError):
+                failed.add(p.name)
+                continue
+
+            digests = [_digest(r, c) for r, c in docs]
+            old_digests = json.loads(old[2]) if old else []
+            # 自动存档日志每轮只追加：保留未变的前缀，只重建之后的消息
+            keep = 0
+            n = min(len(digests), len(old_digests))
+            while keep < n and digests[keep] == old_digests[keep]:
+                keep += 1
+
+            with conn:
+                conn.execute("DELETE FROM msgs WHERE file=? AND pos>=?", (p.name, keep))
+                conn.executemany(
+                    "INSERT INTO msgs(file, pos, role, content) VALUES (?, ?, ?, ?)",
+                    [(p.name, i, r, c) for i, (r, c) in enumerate(docs[keep:], start=keep)],
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO files(name, source, mtime, size, rule, story, timestamp, digests) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (p.name, source, st.st_mtime, st.st_size, meta.get("rule", ""), meta.get("story", ""),
+                     meta.get("timestamp", ""), json.dumps(digests)),
+                )
+            added += len(docs) - keep
+
+        gone = set(known) - seen
+        if gone:
+            with conn:
+                for name in gone:
+                    conn.execute("DELETE FROM msgs WHERE file=?", (name,))
+                    conn.execute("DELETE FROM files WHERE name=?", (name,))
+        self.failed = failed
+        return added
+
+    def search(self, query: str, *, limit: int = 50) -> list[dict]:
+        """
+        空格分隔的多个关键词取交集。结果按相关度（有长关键词时）或存档时间排序。
+        """
+        terms = [t for t in query.split() if t]
+        if not terms:
+            return []
+        long_terms = [t for t in terms if len(t) >= 3]
+        short_terms = [t for t in terms if len(t) < 3]
+
+        params: list = []
+        if long_terms:
+            sql = ("SELECT m.file, m.pos, m.role, m.content, f.source, f.rule, f.story, f.timestamp, f.mtime "
+                   "FROM msgs_fts JOIN msgs m ON m.id = msgs_fts.rowid JOIN files f ON f.name = m.file "
+                   "WHERE msgs_fts MATCH ?")
+            params.append(" AND ".join('"' + t.replace('"', '""') + '"' for t in long_terms))
+        else:
+            sql = ("SELECT m.file, m.pos, m.role, m.content, f.source, f.rule, f.story, f.timestamp, f.mtime "
+                   "FROM msgs m JOIN files f ON f.name = m.file WHERE 1")
+        for t in short_terms:
+            sql += " AND m.content LIKE ? ESCAPE '\\'"
+            params.append("%" + t.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        sql += " ORDER BY " + ("msgs_fts.rank" if long_terms else "f.mtime DESC, m.pos DESC") + " LIMIT ?"
+        params.append(limit)
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return [{
+            "file": file, "pos": pos, "role": role, "source": source,
+            "rule": rule, "story": story, "timestamp": ts, "mtime": mtime,
+            "snippet": make_snippet(content, terms),
+        } for file, pos, role, content, source, rule, story, ts, mtime in rows]
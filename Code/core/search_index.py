@@ -0,0 +1,86 @@
+from __future__ import annotations
+from typing import Iterable
+
+
+def _grams(text: str, n: int) -> set[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class NGramIndex:
+    """
+    面向中文的内存倒排索引：以单字 + 二元字组为词项，不依赖分词。
+    - 查询先对二元组倒排表求交集得到候选，再做一次子串确认，结果精确；
+    - add / remove 为增量操作，适合随 history 逐条维护。
+    """
+
+    def __init__(self):
+        self._docs: dict[int, str] = {}
+        self._postings: dict[str, set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return text.lower()
+
+    def _terms(self, text: str) -> set[str]:
+        return _grams(text, 1) | _grams(text, 2)
+
+    def add(self, doc_id: int, text: str) -> None:
+        if doc_id in self._docs:
+            self.remove(doc_id)
+        norm = self._normalize(text)
+        self._docs[doc_id] = norm
+        for t in self._terms(norm):
+            self._postings.setdefault(t, set()).add(doc_id)
+
+    def remove(self, doc_id: int) -> None:
+        norm = self._docs.pop(doc_id, None)
+        if norm is None:
+            return
+        for t in self._terms(norm):
+            ids = self._postings.get(t)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._postings[t]
+
+    def clear(self) -> None:
+        self._docs.clear()
+        self._postings.clear()
+
+    def search(self, query: str) -> set[int]:
+        q = self._normalize(query.strip())
+        if not q:
+            return set(self._docs)
+        terms = _grams(q, 2) if len(q) >= 2 else {q}
+        lists: list[set[int]] = []
+        for t in terms:
+            ids = self._postings.get(t)
+            if not ids:
+                return set()
+            lists.append(ids)
+        lists.sort(key=len)
+        candidates = set(lists[0])
+        for ids in lists[1:]:
+            candidates &= ids
+            if not candidates:
+                return candidates
+        if len(q) <= 2:
+            return candidates
+        # 二元组都命中不代表连续出现，最后确认子串
+        return {d for d in candidates if q in self._docs[d]}
+
+    @staticmethod
+    def find_all(text: str, query: str) -> Iterable[int]:
+        """
+        text 中 query 的所有出现位置（大小写不敏感），供高亮使用。
+        """
+        t, q = text.lower(), query.lower()
+        if not q:
+            return
+        i = t.find(q)
+        while i >= 0:
+            yield i
+            i = t.find(q, i + len(q))
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+
+class StreamBuffer:
+    """
+    流式回复的累积缓冲：单写（接收线程）单读（Tk 主线程）。
+    - append() 只做 list.append，O(1)，不加锁、不经过 queue.Queue；
+    - read() 从上次的读取位置取出新内容并合并成一段，UI 每帧只插入一次；
+    - text() 在结束时拼接一次完整回复，避免逐 token 的 str += 造成 O(n²) 拷贝。
+    CPython 中 list.append 与按快照长度切片都是原子的，写方只追加、读方只移动自己的游标，
+    因此无需加锁。每轮新建一个实例，旧轮次迟到的写入不会混进新回复。
+    """
+
+    __slots__ = ("_chunks", "_size", "_read_idx", "_read_chars", "closed")
+
+    def __init__(self):
+        self._chunks: list[str] = []
+        self._size = 0
+        self._read_idx = 0
+        self._read_chars = 0
+        self.closed = False
+
+    def append(self, s: str) -> None:
+        if s:
+            self._chunks.append(s)
+            self._size += len(s)
+
+    def close(self) -> None:
+        self.closed = True
+
+    def __len__(self) -> int:
+        return self._size
+
+    def pending(self) -> int:
+        """
+        尚未读取的块数。
+        """
+        return len(self._chunks) - self._read_idx
+
+    def read(self, max_chars: int = 0) -> str:
+        """
+        取出所有未读内容（max_chars > 0 时至多约这么多字符，按块取整）。
+        """
+        end = len(self._chunks)
+        start = self._read_idx
+        if start >= end:
+            return ""
+        if max_chars > 0:
+            total = 0
+            i = start
+            while i < end and total < max_chars:
+                total += len(self._chunks[i])
+                i += 1
+            end = i
+        out = "".join(self._chunks[start:end])
+        self._read_idx = end
+        self._read_chars += len(out)
+        return out
+
+    @property
+    def read_chars(self) -> int:
+        return self._read_chars
+
+    def text(self) -> str:
+        return "".join(self._chunks[:len(self._chunks)])
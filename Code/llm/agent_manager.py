@@ -1,11 +1,17 @@
 from __future__ import annotations
+import threading
 from dataclasses import dataclass
 from pathlib import Path
 
 from core.file_manager import FileManager
 from core.general_tools import markdown_to_text
 from core.json_tools import parse_json_object
-from llm.llm_client import LLMClient
+from llm.async_bridge import AsyncLoopThread
+from llm.async_client import AsyncLLMClient
+from llm.context_window import ContextStats, ContextWindow
+from llm.llm_client import CancelToken, LLMClient
+from llm.prompt_builder import PromptBuilder
+from llm.summarizer import StorySummarizer
 from paths import ProjectPaths
 
 
@@ -13,14 +19,37 @@ from paths import ProjectPaths
 class AgentSession:
     rule_text: str
     background_text: str
+    rule_name: str = ""
+    story_name: str = ""
 
 class AgentManager:
-    def __init__(self, paths: ProjectPaths, client: LLMClient, file_manager: FileManager):
+    def __init__(self, paths: ProjectPaths, client: LLMClient, file_manager: FileManager,
+                 context: ContextWindow | None = None, summarizer: StorySummarizer | None = None,
+                 inline_status: bool = False, aclient: AsyncLLMClient | None = None,
+                 loop: AsyncLoopThread | None = None):
         self.paths = paths
         self.client = client
+        # 可选的异步后端：a* 方法与后台前情提要走事件循环，与叙述流并发且共用连接池
+        self.aclient = aclient
+        self.loop = loop
         self.fm = file_manager
+        self.context = context or ContextWindow()
+        self.prompts = PromptBuilder(self.context)
+        self.last_context: ContextStats | None = None
+        self.last_prefix_digest = ""
+        # 让主持人在叙述末尾附带状态块（见 llm/status_stream.py），失败时再单独请求
+        self.inline_status = inline_status
 
         self.history: list[dict] = []
+        self.session: AgentSession | None = None
+
+        # 前情提要：history[:summary_upto] 的对话已压缩进 story_summary（history 本身保持完整）
+        self.summarizer = summarizer
+        self.story_summary = ""
+        self.summary_upto = 0
+        self._summary_lock = threading.Lock()
+        self._summary_busy = False
+        self._history_gen = 0
         self.last_status = {
             "生理状态": "良好",
             "恐惧程度": "低",
@@ -30,44 +59,197 @@ class AgentManager:
         }
 
     def init_session(self, session: AgentSession) -> None:
+        self.session = session
         self.history = [{"role": "system", "content": session.rule_text}]
         self.history.append({"role": "system", "content": session.background_text})
+        self.restore_summary(None)
 
-    def show_beginning(self) -> str:
+    def restore_history(self, history: list[dict], summary: dict | None = None) -> None:
+        """
+        读档：替换 history，并恢复存档里的前情提要（无需重新压缩）。
+        """
+        self.history = history
+        self.restore_summary(summary)
+
+    def restore_summary(self, summary: dict | None) -> None:
+        with self._summary_lock:
+            self._history_gen += 1
+            self.story_summary = ""
+            self.summary_upto = 0
+            if isinstance(summary, dict):
+                upto = int(summary.get("upto", 0) or 0)
+                if 0 < upto <= len(self.history):
+                    self.story_summary = str(summary.get("text", ""))
+                    self.summary_upto = upto
+        self.context.reset()
+
+    def summary_state(self) -> dict:
+        with self._summary_lock:
+            return {"text": self.story_summary, "upto": self.summary_upto}
+
+    def _prompt_messages(self, *, with_status: bool = False) -> list[dict]:
+        """
+        按 token 预算裁剪后真正发送给模型的消息；统计写到 last_context 供 UI 展示。
+        """
+        with self._summary_lock:
+            summary, upto = self.story_summary, self.summary_upto
+        messages, stats = self.prompts.narration(
+            self.history, summary=summary, summary_upto=upto,
+            inline_status=self.last_status if with_status else None,
+        )
+        self.last_context = stats
+        self.last_prefix_digest = self.prompts.prefix_digest(self.prompts.prefix(self.history, summary))
+        return messages
+
+    @property
+    def supports_async(self) -> bool:
+        return self.aclient is not None and self.loop is not None
+
+    def _beginning_prompt(self) -> str:
         prompt_path = self.paths.function_dir / "BEGINNING_PROMPT.txt"
         prompt = self.fm.read_text(prompt_path) or ""
-        prompt = markdown_to_text(prompt)
-        self.history.append({"role": "user", "content": prompt})
-        res = self.client.chat(self.history, temperature=1.0, stream=False)
+        return markdown_to_text(prompt)
+
+    def show_beginning(self) -> str:
+        self.history.append({"role": "user", "content": self._beginning_prompt()})
+        res = self.client.chat(self._prompt_messages(), temperature=1.0, stream=False, purpose="narration")
+        reply = res.choices[0].message.content or ""
+        self.history.append({"role": "assistant", "content": markdown_to_text(reply)})
+        return reply
+
+    async def ashow_beginning(self) -> str:
+        """
+        show_beginning 的异步版本；被取消或失败时撤回已追加的开场 prompt。
+        """
+        self.history.append({"role": "user", "content": self._beginning_prompt()})
+        n = len(self.history)
+        try:
+            res = await self.aclient.chat(self._prompt_messages(), temperature=1.0, stream=False, purpose="narration")
+        except BaseException:
+            if len(self.history) == n:
+                self.history.pop()
+            raise
         reply = res.choices[0].message.content or ""
         self.history.append({"role": "assistant", "content": markdown_to_text(reply)})
         return reply
 
-    def talk(self, user_text: str, *, stream: bool=False, temperature: float=1.0):
+    def _turn_messages(self, user_text: str, *, stream: bool) -> list[dict]:
         user_text = markdown_to_text(user_text)
         self.history.append({"role": "user", "content": user_text})
-        return self.client.chat(self.history, temperature=temperature, stream=stream)
+        return self._prompt_messages(with_status=self.inline_status and stream)
+
+    def talk(self, user_text: str, *, stream: bool=False, temperature: float=1.0,
+             cancel: CancelToken | None = None):
+        messages = self._turn_messages(user_text, stream=stream)
+        return self.client.chat(messages, temperature=temperature, stream=stream, purpose="narration", cancel=cancel)
+
+    async def atalk(self, user_text: str, *, temperature: float=1.0):
+        """
+        talk(stream=True) 的异步版本：返回可 async for 的流，调用方负责 aclose()。
+        """
+        messages = self._turn_messages(user_text, stream=True)
+        return await self.aclient.chat(messages, temperature=temperature, stream=True, purpose="narration")
 
     def commit_assistant_reply(self, reply_text: str) -> None:
         self.history.append({"role": "assistant", "content": markdown_to_text(reply_text)})
+        self._maybe_compact()
 
-    def update_status_json(self) -> dict:
-        json_prompt = (
-            '请你根据上一阶段的玩家信息以及这一阶段的剧情推进，'
-            '严格按照以下JSON格式响应：'
-            '{"生理状态":"良好","恐惧程度":"低","NPC队友":"暂无","背包物品":"暂无","对怪物的认知":"暂无"}'
-            '注意回答要简短、表意明确。'
-            f'上一阶段玩家信息：{self.last_status}。'
-            f'当前剧情片段：{self.history[-4:]}'
-        )
-        msg = [{"role": "system", "content": json_prompt}]
+    # ---------------------------
+    # Rolling summary (background)
+    # ---------------------------
+
+    def _maybe_compact(self) -> None:
+        """
+        未压缩的旧对话超过阈值时，在后台线程生成新的前情提要；同一时间最多一个任务，
+        talk() 始终使用当前已完成的提要，不会等待。
+        """
+        if self.summarizer is None:
+            return
+        with self._summary_lock:
+            if self._summary_busy:
+                return
+            start = max(self.summary_upto, self.context.pinned_count(self.history))
+            cut = self.summarizer.pick_cut(self.history, start)
+            if cut is None:
+                return
+            self._summary_busy = True
+            job = (self._history_gen, self.summary_upto, cut, self.story_summary, list(self.history[start:cut]),
+                   self.prompts.prefix(self.history))
+
+        if self.supports_async:
+            self.loop.submit(self._acompact(*job))
+            return
+        t = threading.Thread(target=self._compact_worker, args=job, daemon=True)
+        t.start()
+
+    def _compact_worker(self, gen: int, upto: int, cut: int, old_summary: str, messages: list[dict],
+                        prefix: list[dict]) -> None:
+        try:
+            text = self.summarizer.summarize(old_summary, messages, prefix=prefix)
+        except Exception as e:
+            print(f"[summary] 前情提要生成失败：{e}")
+            text = ""
+        self._apply_summary(gen, upto, cut, text)
+
+    async def _acompact(self, gen: int, upto: int, cut: int, old_summary: str, messages: list[dict],
+                        prefix: list[dict]) -> None:
+        text = ""
+        try:
+            text = await self.summarizer.asummarize(self.aclient, old_summary, messages, prefix=prefix)
+        except Exception as e:
+            print(f"[summary] 前情提要生成失败：{e}")
+        finally:
+            # 被取消（关闭程序）时同样要清掉 busy 标志
+            self._apply_summary(gen, upto, cut, text)
+
+    def _apply_summary(self, gen: int, upto: int, cut: int, text: str) -> None:
+        with self._summary_lock:
+            self._summary_busy = False
+            # 期间读档 / 新开局，或 history 被回退到压缩范围之内：丢弃结果
+            if not text or gen != self._history_gen or upto != self.summary_upto or cut > len(self.history):
+                return
+            self.story_summary = text
+            self.summary_upto = cut
+
+    def accept_status(self, data: dict) -> None:
+        self.last_status = data
+
+    def _status_messages(self, recent: list[dict] | None) -> list[dict]:
+        if recent is None:
+            recent = self.history[-4:]
+        with self._summary_lock:
+            summary = self.story_summary
+        return self.prompts.status(self.history, recent, self.last_status, summary=summary)
+
+    def update_status_json(self, recent: list[dict] | None = None, *, cancel: CancelToken | None = None) -> dict:
+        """
+        recent: 调用方在主线程截取的剧情片段快照；后台线程调用时必须传入，
+        避免玩家已开始下一轮、history 被追加后取到错位的片段。
+        cancel: 先行（投机）请求时传入；此时结果不写回 last_status，由调用方确认采用后 accept_status()。
+        """
         res = self.client.chat(
-            msg,
+            self._status_messages(recent),
             temperature=0.7,
             stream=False,
-            response_format={"type": "json_object"}
+            response_format={"type": "json_object"},
+            purpose="status",
+            cancel=cancel,
         )
         raw = res.choices[0].message.content or "{}"
         data = parse_json_object(raw)
-        self.last_status = data
+        if cancel is None:
+            self.last_status = data
         return data
+
+    async def aupdate_status_json(self, recent: list[dict]) -> dict:
+        """
+        update_status_json 的异步版本，只用于先行请求：结果不写回 last_status，由调用方 accept_status()。
+        """
+        res = await self.aclient.chat(
+            self._status_messages(recent),
+            temperature=0.7,
+            stream=False,
+            response_format={"type": "json_object"},
+            purpose="status",
+        )
+        return parse_json_object(res.choices[0].message.content or "{}")
@@ -0,0 +1,88 @@
+from __future__ import annotations
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Callable, Coroutine, Optional, TypeVar
+
+from llm.llm_client import CancelToken
+
+T = TypeVar("T")
+
+
+class AsyncLoopThread:
+    """
+    在一个后台守护线程里常驻 asyncio 事件循环，供 Tk 主线程与其他线程提交协程：
+    - submit() 返回 concurrent.futures.Future，可在任意线程等待 / 取消；
+    - to_tk() 把完成回调投递回 Tk 主线程（root.after），界面代码无需接触事件循环。
+    AsyncLLMClient 只能在这个循环里使用。
+    """
+
+    def __init__(self, *, name: str = "asyncio-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._t = threading.Thread(target=self._run, name=name, daemon=True)
+        self._t.start()
+        self._ready.wait()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._ready.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    @property
+    def running(self) -> bool:
+        return self._t.is_alive() and not self.loop.is_closed()
+
+    def in_loop(self) -> bool:
+        return threading.current_thread() is self._t
+
+    def submit(self, coro: Coroutine[Any, Any, T], *, cancel: Optional[CancelToken] = None) -> concurrent.futures.Future[T]:
+        """
+        cancel：CancelToken.cancel() 时取消对应的任务（进行中的流式请求随之断开）。
+        """
+        fut = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        if cancel is not None:
+            cancel.bind(fut.cancel)
+        return fut
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """
+        同步等待协程结果；不能在事件循环线程内调用。
+        """
+        if self.in_loop():
+            raise RuntimeError("不能在事件循环线程内同步等待")
+        return self.submit(coro).result(timeout)
+
+    @staticmethod
+    def to_tk(root, fut: concurrent.futures.Future, callback: Callable[[concurrent.futures.Future], None]) -> None:
+        """
+        fut 完成（含取消 / 出错）后在 Tk 主线程调用 callback(fut)。
+        """
+        fut.add_done_callback(lambda f: root.after(0, lambda: callback(f)))
+
+    def close(self, timeout: float = 2.0, *, cleanup: Optional[Callable[[], Coroutine[Any, Any, Any]]] = None) -> None:
+        """
+        取消所有未完成的任务，等它们收尾（关闭连接）后停止循环。
+        cleanup：任务全部结束后再执行的协程函数，例如 AsyncLLMClient.aclose（关闭连接池）。
+        """
+        if not self.running:
+            return
+
+        async def _shutdown():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if cleanup is not None:
+                await cleanup()
+            await self.loop.shutdown_asyncgens()
+
+        try:
+            self.submit(_shutdown()).result(timeout)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._t.join(timeout)
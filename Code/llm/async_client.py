@@ -0,0 +1,231 @@
+from __future__ import annotations
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional, TypeVar
+
+from core.metrics import MetricsRegistry, get_registry
+from llm.llm_client import StreamTimeout, TokenUsage, _has_content, retryable_errors
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+T = TypeVar("T")
+
+
+class _AsyncUsageStream:
+    """
+    _UsageStream 的异步版本：透传 chunk，记录 usage / TTFT / 总耗时 / 生成速度。
+    持有一个并发名额，流结束、出错或所在任务被取消时关闭响应并归还名额；
+    取消即 asyncio 任务取消，CancelledError 照常向上抛出。
+    """
+    def __init__(self, stream, on_usage: Callable[[TokenUsage], None], release: Callable[[], None], *,
+                 metrics: Optional[MetricsRegistry] = None, purpose: str = "chat", t_start: float = 0.0,
+                 max_seconds: float = 0.0):
+        self._stream = stream
+        self._on_usage = on_usage
+        self._release = release
+        self._metrics = metrics
+        self._purpose = purpose
+        self._t_start = t_start or time.perf_counter()
+        self._deadline = self._t_start + max_seconds if max_seconds > 0 else 0.0
+        self._closed = False
+        self.first_token_at: Optional[float] = None
+        self.chunks = 0
+
+    async def __aiter__(self):
+        usage = None
+        last = None
+        try:
+            async for chunk in self._stream:
+                u = TokenUsage.from_api(getattr(chunk, "usage", None))
+                if u is not None:
+                    usage = u
+                    self._on_usage(u)
+                if _has_content(chunk):
+                    last = time.perf_counter()
+                    self.chunks += 1
+                    if self.first_token_at is None:
+                        self.first_token_at = last
+                        if self._metrics is not None:
+                            self._metrics.observe(f"llm.{self._purpose}.ttft_ms", (last - self._t_start) * 1000)
+                    if self._deadline and last > self._deadline:
+                        raise StreamTimeout(f"流式回复超过 {self._deadline - self._t_start:g} 秒")
+                yield chunk
+        except asyncio.CancelledError:
+            if self._metrics is not None:
+                self._metrics.observe(f"llm.{self._purpose}.cancelled_ms", (time.perf_counter() - self._t_start) * 1000)
+            raise
+        finally:
+            await self.aclose()
+        if self._metrics is not None and last is not None:
+            m, p = self._metrics, self._purpose
+            m.observe(f"llm.{p}.total_ms", (time.perf_counter() - self._t_start) * 1000)
+            if last > self.first_token_at:
+                tokens = usage.completion_tokens if usage is not None and usage.completion_tokens else self.chunks
+                m.observe(f"llm.{p}.tokens_per_s", tokens / (last - self.first_token_at))
+
+    async def aclose(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            await self._stream.close()
+        finally:
+            self._release()
+
+
+@dataclass
+class AsyncLLMClient:
+    """
+    与 LLMClient 并列的异步客户端，运行在 AsyncLoopThread 的事件循环里（只能在该循环内使用）。
+    所有调用共用一个 httpx.AsyncClient 连接池；并发由两级信号量限制：
+    - max_concurrency：同时在途的请求总数；
+    - side_concurrency：状态提取 / 前情提要等旁路调用（purpose != "narration"）的上限，
+      保证旁路调用排满时主持人叙述仍有名额。
+    """
+    api_key: str
+    base_url: str
+    model: str
+
+    timeout: float = 60.0
+    connect_timeout: float = 10.0
+    max_connections: int = 10
+    max_keepalive_connections: int = 5
+    keepalive_expiry: float = 60.0
+    max_retries: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    stream_max_seconds: float = 300.0
+    max_concurrency: int = 4
+    side_concurrency: int = 2
+
+    _openai: Optional[AsyncOpenAI] = field(default=None, init=False, repr=False)
+    _slots: Optional[asyncio.Semaphore] = field(default=None, init=False, repr=False)
+    _side_slots: Optional[asyncio.Semaphore] = field(default=None, init=False, repr=False)
+
+    last_usage: dict[str, TokenUsage] = field(default_factory=dict, init=False, repr=False)
+    metrics: MetricsRegistry = field(default_factory=get_registry, repr=False)
+
+    @classmethod
+    def from_config(cls, cfg, api_key: str) -> "AsyncLLMClient":
+        return cls(
+            api_key=api_key,
+            base_url=cfg.deepseek_url,
+            model=cfg.default_model,
+            timeout=cfg.llm_timeout,
+            max_connections=cfg.llm_max_connections,
+            max_keepalive_connections=cfg.llm_max_keepalive,
+            max_retries=cfg.llm_max_retries,
+            max_concurrency=cfg.llm_max_concurrency,
+            side_concurrency=cfg.llm_side_concurrency,
+        )
+
+    def _client(self) -> AsyncOpenAI:
+        """
+        在事件循环线程内首次使用时创建；连接池与信号量都绑定在这个循环上。
+        """
+        if self._openai is None:
+            import httpx
+            from openai import AsyncOpenAI
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            )
+            self._openai = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=0,
+                http_client=http_client,
+            )
+            self._slots = asyncio.Semaphore(max(1, self.max_concurrency))
+            self._side_slots = asyncio.Semaphore(max(1, min(self.side_concurrency, self.max_concurrency)))
+        return self._openai
+
+    async def aclose(self) -> None:
+        if self._openai is not None:
+            client, self._openai = self._openai, None
+            await client.close()
+
+    async def _acquire(self, purpose: str) -> Callable[[], None]:
+        """
+        先占旁路名额再占总名额（顺序固定，避免互相等待）；返回归还函数，只生效一次。
+        """
+        side = self._side_slots if purpose != "narration" else None
+        if side is not None:
+            await side.acquire()
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            if side is not None:
+                side.release()
+            raise
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self._slots.release()
+                if side is not None:
+                    side.release()
+        return release
+
+    async def _with_retry(self, fn: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            try:
+                return await fn()
+            except retryable_errors():
+                if attempt >= self.max_retries:
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                await asyncio.sleep(delay * (0.5 + random.random() / 2))
+                attempt += 1
+
+    def _record_usage(self, purpose: str, usage: Optional[TokenUsage]) -> None:
+        if usage is not None:
+            self.last_usage[purpose] = usage
+
+    async def chat(self, messages: list[dict], *, temperature: float=1.0, stream: bool=False, response_format=None,
+                   model: Optional[str]=None, purpose: str="chat", timeout: Optional[float]=None):
+        """
+        参数与 LLMClient.chat 相同；取消请直接取消所在的任务（AsyncLoopThread.submit 的 cancel 参数）。
+        流式请求返回可 async for 的对象，迭代结束前一直占用一个并发名额。
+        """
+        client = self._client()
+        extra = {"stream_options": {"include_usage": True}} if stream else {}
+        if timeout is not None:
+            import httpx
+            extra["timeout"] = httpx.Timeout(timeout, connect=self.connect_timeout)
+        release = await self._acquire(purpose)
+        t0 = time.perf_counter()
+        try:
+            res = await self._with_retry(lambda: client.chat.completions.create(
+                model=model or self.model,
+                messages=messages,
+                temperature=temperature,
+                stream=stream,
+                response_format=response_format,
+                **extra
+            ))
+        except BaseException:
+            release()
+            raise
+        if stream:
+            return _AsyncUsageStream(res, lambda u: self._record_usage(purpose, u), release,
+                                     metrics=self.metrics, purpose=purpose, t_start=t0,
+                                     max_seconds=self.stream_max_seconds)
+        release()
+        elapsed = time.perf_counter() - t0
+        usage = TokenUsage.from_api(getattr(res, "usage", None))
+        self._record_usage(purpose, usage)
+        self.metrics.observe(f"llm.{purpose}.total_ms", elapsed * 1000)
+        if usage is not None and usage.completion_tokens and elapsed > 0:
+            self.metrics.observe(f"llm.{purpose}.tokens_per_s", usage.completion_tokens / elapsed)
+        return res
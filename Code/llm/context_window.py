@@ -0,0 +1,109 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import lru_cache
+
+# 每条消息的结构开销（role / 分隔符等），与 OpenAI 的计数方式同量级
+_MESSAGE_OVERHEAD = 4
+
+
+@lru_cache(maxsize=4096)
+def estimate_tokens(text: str) -> int:
+    """
+    无需 tokenizer 的近似计数（DeepSeek 官方口径：1 个中文字符 ≈ 0.6 token，
+    1 个英文字符 ≈ 0.3 token）。用 UTF-8 字节数反推 CJK 字符数，避免逐字符循环。
+    """
+    if not text:
+        return 0
+    n_chars = len(text)
+    n_bytes = len(text.encode("utf-8"))
+    wide = min(n_chars, (n_bytes - n_chars) // 2)
+    return int(wide * 0.6 + (n_chars - wide) * 0.3) + 1
+
+
+def message_tokens(msg: dict) -> int:
+    return estimate_tokens(str(msg.get("content", ""))) + _MESSAGE_OVERHEAD
+
+
+def summary_message(summary: str) -> dict:
+    return {"role": "system", "content": f"【前情提要】{summary}"}
+
+
+@dataclass
+class ContextStats:
+    prompt_tokens: int      # 本次实际发送的（估算）token 数
+    full_tokens: int        # 若发送完整 history 的 token 数
+    dropped_messages: int   # 被裁掉的旧消息条数
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.full_tokens - self.prompt_tokens
+
+
+class ContextWindow:
+    """
+    history 的 token 预算管理：
+    - 开头的 system 消息（规则 / 剧本背景）永远保留；
+    - 其余对话从最旧的一轮开始裁剪，直到总量低于预算；
+    - 裁剪带回差：一次裁到 low_water * budget，之后若干轮窗口起点不变，
+      发送的前缀更稳定，也不必每轮重新计算。
+    """
+
+    def __init__(self, budget_tokens: int = 24000, *, pinned: int = 2, min_recent: int = 2, low_water: float = 0.75):
+        self.budget_tokens = budget_tokens
+        self.pinned = pinned
+        self.min_recent = min_recent
+        self.low_water = low_water
+
+        self._history_id: int | None = None
+        self._start = 0
+
+    def reset(self) -> None:
+        self._history_id = None
+        self._start = 0
+
+    def pinned_count(self, history: list[dict]) -> int:
+        n = 0
+        while n < min(self.pinned, len(history)) and history[n].get("role") == "system":
+            n += 1
+        return n
+
+    def build(self, history: list[dict], *, summary: str = "", summary_upto: int = 0) -> tuple[list[dict], ContextStats]:
+        """
+        summary / summary_upto：history[:summary_upto] 中的对话已被压缩进“前情提要”，
+        以一条 system 消息的形式紧跟在固定 system 消息之后发送。
+        """
+        # 读档会整体替换 history 列表；重试会 pop 尾部，都需要让起点重新合法
+        if id(history) != self._history_id:
+            self._history_id = id(history)
+            self._start = 0
+
+        n_pin = self.pinned_count(history)
+        pinned = history[:n_pin]
+        tokens = [message_tokens(m) for m in history]
+
+        pinned_tokens = sum(tokens[:n_pin])
+        full_tokens = sum(tokens)
+
+        head: list[dict] = []
+        if summary:
+            head = [summary_message(summary)]
+        head_tokens = sum(message_tokens(m) for m in head)
+
+        # start 为 history 的绝对下标
+        limit = max(n_pin, len(history) - self.min_recent)
+        start = min(max(self._start, n_pin, summary_upto), limit)
+        kept = pinned_tokens + head_tokens + sum(tokens[start:])
+
+        if kept > self.budget_tokens:
+            target = self.budget_tokens * self.low_water
+            while start < limit and kept > target:
+                kept -= tokens[start]
+                start += 1
+            # 窗口不从 assistant 开头，保持 user/assistant 成对
+            while start < limit and history[start].get("role") == "assistant":
+                kept -= tokens[start]
+                start += 1
+        self._start = start
+
+        messages = pinned + head + history[start:]
+        return messages, ContextStats(prompt_tokens=kept, full_tokens=full_tokens, dropped_messages=start - n_pin)
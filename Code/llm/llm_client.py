@@ -1,6 +1,219 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from openai import OpenAI
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Optional, TypeVar
+
+from core.metrics import MetricsRegistry, get_registry
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+T = TypeVar("T")
+
+
+@lru_cache(maxsize=None)
+def retryable_errors() -> tuple[type[BaseException], ...]:
+    """
+    值得重试的错误：网络抖动、超时、限流、服务端 5xx。
+    openai / httpx 导入要 0.3~0.5 秒，推迟到第一次请求时才导入，不拖慢启动。
+    """
+    import openai
+    return (
+        openai.APIConnectionError,
+        openai.APITimeoutError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+
+@dataclass
+class TokenUsage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hit_tokens: int = 0
+
+    @property
+    def cache_miss_tokens(self) -> int:
+        return self.prompt_tokens - self.cache_hit_tokens
+
+    @property
+    def cache_hit_rate(self) -> float:
+        return self.cache_hit_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    @classmethod
+    def from_api(cls, usage) -> Optional["TokenUsage"]:
+        """
+        兼容两种字段：DeepSeek 的 prompt_cache_hit_tokens，
+        以及 OpenAI 的 prompt_tokens_details.cached_tokens。
+        """
+        if usage is None:
+            return None
+        hit = getattr(usage, "prompt_cache_hit_tokens", None)
+        if hit is None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            hit = getattr(details, "cached_tokens", None) if details is not None else None
+        return cls(
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            cache_hit_tokens=hit or 0,
+        )
+
+
+class RequestCancelled(Exception):
+    """
+    请求在发出前或返回后被 CancelToken 取消，结果应丢弃。
+    """
+
+
+class StreamTimeout(TimeoutError):
+    """
+    流式回复超过了总时长上限（单次读取的超时由 httpx 的 read timeout 负责）。
+    """
+
+
+class CancelToken:
+    """
+    一次请求（或一组请求）的取消句柄，可以在任意线程调用 cancel()。
+    - 流式请求：立即关闭底层连接，阻塞在读取上的接收线程马上返回，不再继续消耗带宽与 token；
+    - 非流式请求：已发出的无法中途撤回，返回后由调用方检查并丢弃结果，且不再重试。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._closers: list[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._event.set()
+            closers, self._closers = self._closers, []
+        for close in closers:
+            try:
+                close()
+            except Exception:
+                pass
+
+    def bind(self, closer: Callable[[], None]) -> None:
+        with self._lock:
+            if not self._event.is_set():
+                self._closers.append(closer)
+                return
+        closer()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise RequestCancelled()
+
+
+def _abort_response(stream) -> None:
+    """
+    从其他线程中止一个进行中的流式响应。仅 close() 不会唤醒阻塞在 recv 上的线程，
+    所以先对底层 socket 做 shutdown；连接随后被连接池丢弃，不影响后续请求。
+    """
+    response = getattr(stream, "response", None)
+    network = getattr(response, "extensions", {}).get("network_stream") if response is not None else None
+    sock = network.get_extra_info("socket") if network is not None else None
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    stream.close()
+
+
+def _has_content(chunk) -> bool:
+    choices = getattr(chunk, "choices", None)
+    if not choices:
+        return False
+    delta = getattr(choices[0], "delta", None)
+    return bool(getattr(delta, "content", None))
+
+
+class _UsageStream:
+    """
+    包一层流式响应：透传 chunk，遇到末尾带 usage 的 chunk 时回调记录；
+    同时记录首个正文 chunk 的到达时间（TTFT）、总耗时与生成速度。
+    迭代结束、中途 break、出错或被 CancelToken 取消时都会关闭底层响应；
+    被取消时迭代静默结束，调用方按自己的取消标志处理。
+    """
+    def __init__(self, stream, on_usage: Callable[[TokenUsage], None], *,
+                 metrics: Optional[MetricsRegistry] = None, purpose: str = "chat", t_start: float = 0.0,
+                 cancel: Optional[CancelToken] = None, max_seconds: float = 0.0):
+        self._stream = stream
+        self._on_usage = on_usage
+        self._metrics = metrics
+        self._purpose = purpose
+        self._t_start = t_start or time.perf_counter()
+        self._cancel = cancel
+        self._deadline = self._t_start + max_seconds if max_seconds > 0 else 0.0
+        self._closed = False
+        self.first_token_at: Optional[float] = None
+        self.chunks = 0
+        if cancel is not None:
+            cancel.bind(self.abort)
+
+    def __iter__(self):
+        usage = None
+        last = None
+        try:
+            for chunk in self._stream:
+                u = TokenUsage.from_api(getattr(chunk, "usage", None))
+                if u is not None:
+                    usage = u
+                    self._on_usage(u)
+                if _has_content(chunk):
+                    last = time.perf_counter()
+                    self.chunks += 1
+                    if self.first_token_at is None:
+                        self.first_token_at = last
+                        if self._metrics is not None:
+                            self._metrics.observe(f"llm.{self._purpose}.ttft_ms", (last - self._t_start) * 1000)
+                    if self._deadline and last > self._deadline:
+                        raise StreamTimeout(f"流式回复超过 {self._deadline - self._t_start:g} 秒")
+                yield chunk
+        except Exception:
+            if self.cancelled:
+                if self._metrics is not None:
+                    self._metrics.observe(f"llm.{self._purpose}.cancelled_ms", (time.perf_counter() - self._t_start) * 1000)
+                return
+            raise
+        finally:
+            self.close()
+        self._finish(usage, last)
+
+    def _finish(self, usage: Optional[TokenUsage], last: Optional[float]) -> None:
+        if self._metrics is None:
+            return
+        m, p = self._metrics, self._purpose
+        m.observe(f"llm.{p}.total_ms", (time.perf_counter() - self._t_start) * 1000)
+        if self.first_token_at is not None and last is not None and last > self.first_token_at:
+            tokens = usage.completion_tokens if usage is not None and usage.completion_tokens else self.chunks
+            m.observe(f"llm.{p}.tokens_per_s", tokens / (last - self.first_token_at))
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel is not None and self._cancel.cancelled
+
+    def abort(self) -> None:
+        """
+        可从其他线程调用：立即断开连接。
+        """
+        if not self._closed:
+            self._closed = True
+            _abort_response(self._stream)
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._stream.close()
+
 
 @dataclass
 class LLMClient:
@@ -8,15 +221,122 @@ class LLMClient:
     base_url: str
     model: str
 
+    # 连接池 / 超时 / 重试策略（由 LLMClient 统一管理，不交给 openai SDK 自己重试）
+    timeout: float = 60.0
+    connect_timeout: float = 10.0
+    max_connections: int = 10
+    max_keepalive_connections: int = 5
+    keepalive_expiry: float = 60.0
+    max_retries: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    # 单次流式回复的总时长上限（秒），0 表示不限制；两块之间的停顿由 timeout 控制
+    stream_max_seconds: float = 300.0
+
+    _openai: Optional[OpenAI] = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    # 每种调用（narration / status / summary ...）最近一次的 token 用量，含缓存命中
+    last_usage: dict[str, TokenUsage] = field(default_factory=dict, init=False, repr=False)
+    # 请求耗时指标，默认写进进程级的 MetricsRegistry，界面的调试面板从同一处读取
+    metrics: MetricsRegistry = field(default_factory=get_registry, repr=False)
+
+    @classmethod
+    def from_config(cls, cfg, api_key: str) -> "LLMClient":
+        return cls(
+            api_key=api_key,
+            base_url=cfg.deepseek_url,
+            model=cfg.default_model,
+            timeout=cfg.llm_timeout,
+            max_connections=cfg.llm_max_connections,
+            max_keepalive_connections=cfg.llm_max_keepalive,
+            max_retries=cfg.llm_max_retries,
+        )
+
     def _client(self) -> OpenAI:
-        return OpenAI(api_key=self.api_key, base_url=self.base_url)
+        """
+        懒加载的长连接客户端：talk / show_beginning / update_status_json 共用同一个连接池，
+        避免每次请求都重新握手 TLS。
+        """
+        if self._openai is not None:
+            return self._openai
+        with self._lock:
+            if self._openai is None:
+                import httpx
+                from openai import OpenAI
+                http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_keepalive_connections,
+                        keepalive_expiry=self.keepalive_expiry,
+                    ),
+                    timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                )
+                self._openai = OpenAI(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    max_retries=0,
+                    http_client=http_client,
+                )
+        return self._openai
+
+    def close(self) -> None:
+        with self._lock:
+            if self._openai is not None:
+                self._openai.close()
+                self._openai = None
+
+    def _with_retry(self, fn: Callable[[], T], cancel: Optional[CancelToken] = None) -> T:
+        attempt = 0
+        while True:
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            try:
+                return fn()
+            except retryable_errors():
+                if attempt >= self.max_retries or (cancel is not None and cancel.cancelled):
+                    raise
+                # 指数退避 + 抖动
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                time.sleep(delay * (0.5 + random.random() / 2))
+                attempt += 1
 
-    def chat(self, messages: list[dict], *, temperature: float=1.0, stream: bool=False, response_format=None):
+    def _record_usage(self, purpose: str, usage: Optional[TokenUsage]) -> None:
+        if usage is not None:
+            self.last_usage[purpose] = usage
+
+    def chat(self, messages: list[dict], *, temperature: float=1.0, stream: bool=False, response_format=None,
+             model: Optional[str]=None, purpose: str="chat", cancel: Optional[CancelToken]=None,
+             timeout: Optional[float]=None):
+        """
+        cancel：取消句柄，见 CancelToken；timeout：覆盖本次请求的读取超时（秒）。
+        非流式请求在取消后返回时抛出 RequestCancelled。
+        """
         client = self._client()
-        return client.chat.completions.create(
-            model=self.model,
+        extra = {"stream_options": {"include_usage": True}} if stream else {}
+        if timeout is not None:
+            import httpx
+            extra["timeout"] = httpx.Timeout(timeout, connect=self.connect_timeout)
+        t0 = time.perf_counter()
+        # 流式请求只在建立连接阶段重试；一旦开始吐字就不再重放
+        res = self._with_retry(lambda: client.chat.completions.create(
+            model=model or self.model,
             messages=messages,
             temperature=temperature,
             stream=stream,
-            response_format=response_format
-        )
+            response_format=response_format,
+            **extra
+        ), cancel)
+        if stream:
+            return _UsageStream(res, lambda u: self._record_usage(purpose, u),
+                                metrics=self.metrics, purpose=purpose, t_start=t0,
+                                cancel=cancel, max_seconds=self.stream_max_seconds)
+        if cancel is not None and cancel.cancelled:
+            raise RequestCancelled()
+        elapsed = time.perf_counter() - t0
+        usage = TokenUsage.from_api(getattr(res, "usage", None))
+        self._record_usage(purpose, usage)
+        self.metrics.observe(f"llm.{purpose}.total_ms", elapsed * 1000)
+        if usage is not None and usage.completion_tokens and elapsed > 0:
+            self.metrics.observe(f"llm.{purpose}.tokens_per_s", usage.completion_tokens / elapsed)
+        return res
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import concurrent.futures
+import threading
+import time
+from typing import Any, Callable, Coroutine, Generic, Optional, TypeVar
+
+from llm.async_bridge import AsyncLoopThread
+from llm.llm_client import CancelToken, RequestCancelled
+
+T = TypeVar("T")
+
+
+class Speculative(Generic[T]):
+    """
+    先行发起的请求：创建即在后台线程执行 fn(token)，需要结果时再 result()。
+    如果结果已经不需要（例如玩家点了重试），cancel() 会取消请求，
+    之后 result() 一律抛出 RequestCancelled，调用方据此丢弃整轮后续处理。
+    """
+
+    def __init__(self, fn: Callable[[CancelToken], T], *, name: str = "speculative"):
+        self.token = CancelToken()
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self._fn = fn
+        self._done = threading.Event()
+        # 完成或取消时置位：取消后 result() 立即返回，不等还没回来的非流式请求
+        self._wake = threading.Event()
+        self.token.bind(self._wake.set)
+        self._result: Optional[T] = None
+        self._error: Optional[BaseException] = None
+        self._t = threading.Thread(target=self._run, name=name, daemon=True)
+        self._t.start()
+
+    def _run(self) -> None:
+        try:
+            self._result = self._fn(self.token)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self.finished = time.perf_counter()
+            self._done.set()
+            self._wake.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.cancelled
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def cancel(self) -> None:
+        self.token.cancel()
+
+    def result(self, timeout: Optional[float] = None) -> T:
+        self.token.raise_if_cancelled()
+        self._wake.wait(timeout)
+        self.token.raise_if_cancelled()
+        if not self._done.is_set():
+            raise TimeoutError("先行请求尚未完成")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class AsyncSpeculative(Generic[T]):
+    """
+    Speculative 的事件循环版本：协程提交到 AsyncLoopThread 执行，接口与 Speculative 相同，
+    cancel() 直接取消任务（连接随之断开）。
+    """
+
+    def __init__(self, loop: AsyncLoopThread, coro: Coroutine[Any, Any, T]):
+        self.token = CancelToken()
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self._fut = loop.submit(coro, cancel=self.token)
+        self._fut.add_done_callback(self._on_done)
+
+    def _on_done(self, _fut) -> None:
+        self.finished = time.perf_counter()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.cancelled
+
+    def done(self) -> bool:
+        return self._fut.done()
+
+    def cancel(self) -> None:
+        self.token.cancel()
+
+    def result(self, timeout: Optional[float] = None) -> T:
+        try:
+            res = self._fut.result(timeout)
+        except concurrent.futures.TimeoutError:
+            raise TimeoutError("先行请求尚未完成") from None
+        except concurrent.futures.CancelledError:
+            raise RequestCancelled() from None
+        if self.token.cancelled:
+            raise RequestCancelled()
+        return res
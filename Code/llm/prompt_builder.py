@@ -0,0 +1,62 @@
+from __future__ import annotations
+import hashlib
+import json
+
+from llm.context_window import ContextStats, ContextWindow, summary_message
+from llm.status_stream import STATUS_CLOSE, STATUS_OPEN
+
+STATUS_TEMPLATE = '{"生理状态":"良好","恐惧程度":"低","NPC队友":"暂无","背包物品":"暂无","对怪物的认知":"暂无"}'
+
+
+class PromptBuilder:
+    """
+    所有 LLM 调用的 prompt 组装层。
+
+    DeepSeek / OpenAI 的前缀缓存按“请求开头逐字节相同”的部分计费打折，
+    所以每种调用都以同一个前缀开头：
+        [规则 system, 剧本 system, (前情提要 system)]
+    规则 / 剧本消息直接复用 history 里的原 dict，不做任何转换；
+    各调用自己的指令一律放在前缀之后（末尾），保证前缀字节不变。
+    """
+
+    def __init__(self, context: ContextWindow):
+        self.context = context
+
+    def prefix(self, history: list[dict], summary: str = "") -> list[dict]:
+        n_pin = self.context.pinned_count(history)
+        head = [summary_message(summary)] if summary else []
+        return history[:n_pin] + head
+
+    @staticmethod
+    def prefix_digest(messages: list[dict]) -> str:
+        """
+        前缀指纹：同一局内应保持不变，用来核对缓存命中率下降是否由前缀漂移导致。
+        """
+        raw = json.dumps(messages, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+    def narration(self, history: list[dict], *, summary: str = "", summary_upto: int = 0,
+                  inline_status: dict | None = None) -> tuple[list[dict], ContextStats]:
+        """
+        inline_status：传入上一轮玩家状态时，在末尾追加指令，让主持人在同一条流式回复的最后
+        附带 <status> 状态块，省掉单独的状态请求。
+        """
+        messages, stats = self.context.build(history, summary=summary, summary_upto=summary_upto)
+        if inline_status is not None:
+            messages = messages + [{"role": "system", "content": (
+                f'回复正文结束后，另起一行输出 {STATUS_OPEN}JSON{STATUS_CLOSE} 作为玩家状态，'
+                f'格式严格为：{STATUS_TEMPLATE}，字段简短、表意明确，状态块之后不要再输出任何内容。'
+                f'上一阶段玩家信息：{inline_status}。'
+            )}]
+        return messages, stats
+
+    def status(self, history: list[dict], recent: list[dict], last_status: dict, *, summary: str = "") -> list[dict]:
+        instruction = (
+            '请你根据上一阶段的玩家信息以及这一阶段的剧情推进，'
+            f'严格按照以下JSON格式响应：{STATUS_TEMPLATE}'
+            '注意回答要简短、表意明确。'
+            f'上一阶段玩家信息：{last_status}。'
+        )
+        # recent 在开局阶段可能包含规则 / 剧本本身，前缀里已有，去掉避免重复
+        tail = [m for m in recent if m.get("role") != "system"]
+        return self.prefix(history, summary) + tail + [{"role": "user", "content": instruction}]
@@ -0,0 +1,91 @@
+from __future__ import annotations
+from typing import Optional
+
+from core.json_tools import JSONObjectScanner, parse_json_object
+
+STATUS_OPEN = "<status>"
+STATUS_CLOSE = "</status>"
+
+
+def _partial_suffix(text: str, marker: str) -> int:
+    """
+    text 末尾可能是 marker 的前半截时，返回需要暂扣的字符数。
+    """
+    for k in range(min(len(marker) - 1, len(text)), 0, -1):
+        if text.endswith(marker[:k]):
+            return k
+    return 0
+
+
+class StatusBlockParser:
+    """
+    从流式回复中剥离主持人附带的 <status>{...}</status> 状态块：
+    - feed() 返回应当显示 / 提交的正文，状态块本身不会出现在正文里；
+    - 状态块内的 JSON 随 chunk 增量扫描，闭合后立刻解析到 status；
+    - 缺失或无法解析时 status 为 None，调用方回退到单独的状态请求。
+    """
+
+    def __init__(self, expected_keys: Optional[set[str]] = None):
+        self.expected_keys = expected_keys
+        self.status: Optional[dict] = None
+        self.error: Optional[str] = None
+
+        self._pending = ""
+        self._in_block = False
+        self._scanner = JSONObjectScanner()
+
+    def feed(self, chunk: str) -> str:
+        text = self._pending + chunk
+        self._pending = ""
+        visible: list[str] = []
+
+        while text:
+            marker = STATUS_CLOSE if self._in_block else STATUS_OPEN
+            i = text.find(marker)
+            if i >= 0:
+                self._emit(text[:i], visible)
+                self._in_block = not self._in_block
+                text = text[i + len(marker):]
+                continue
+            keep = _partial_suffix(text, marker)
+            self._emit(text[:len(text) - keep], visible)
+            self._pending = text[len(text) - keep:]
+            break
+
+        return "".join(visible)
+
+    def close(self) -> str:
+        """
+        流结束：吐出暂扣的正文，并对未闭合的状态块做最后一次解析尝试。
+        """
+        tail, self._pending = self._pending, ""
+        if self._in_block:
+            self._feed_block(tail)
+            if self.status is None and self.error is None:
+                self.error = "状态块未闭合"
+            return ""
+        if self.status is None and self.error is None:
+            self.error = "回复中没有状态块"
+        return tail
+
+    def _emit(self, text: str, visible: list[str]) -> None:
+        if self._in_block:
+            self._feed_block(text)
+        elif text:
+            visible.append(text)
+
+    def _feed_block(self, text: str) -> None:
+        if self.status is not None or self.error is not None or not text:
+            return
+        obj = self._scanner.feed(text)
+        if obj is None:
+            return
+        try:
+            data = parse_json_object(obj)
+        except ValueError as e:
+            self.error = f"状态块 JSON 无效：{e}"
+            return
+        if not isinstance(data, dict) or (self.expected_keys and not (self.expected_keys & data.keys())):
+            self.error = "状态块字段不符"
+            return
+        self.status = data
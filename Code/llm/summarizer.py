@@ -0,0 +1,71 @@
+from __future__ import annotations
+from typing import Optional
+
+from llm.async_client import AsyncLLMClient
+from llm.context_window import message_tokens
+from llm.llm_client import LLMClient
+
+_ROLE_CN = {"user": "玩家", "assistant": "主持人"}
+
+
+class StorySummarizer:
+    """
+    把较早的玩家/主持人对话压缩成“前情提要”。
+    只负责挑选压缩范围与发起一次非流式的廉价 LLM 调用；调度（后台线程）由 AgentManager 负责。
+    """
+
+    def __init__(self, client: LLMClient, *, model: Optional[str] = None, trigger_tokens: int = 6000,
+                 keep_recent: int = 6, max_chars: int = 800):
+        self.client = client
+        self.model = model
+        self.trigger_tokens = trigger_tokens
+        self.keep_recent = keep_recent
+        self.max_chars = max_chars
+
+    def pick_cut(self, history: list[dict], start: int) -> Optional[int]:
+        """
+        返回新的 summary_upto：history[start:cut] 将被并入前情提要。
+        最近 keep_recent 条消息保持原文；cut 落在玩家消息上，保证成对压缩。
+        未压缩部分不足 trigger_tokens 时返回 None。
+        """
+        # keep_recent 为 0 时 cut 会越界，至少从最后一条开始往前找
+        cut = min(len(history) - 1, len(history) - self.keep_recent)
+        while cut > start and history[cut].get("role") != "user":
+            cut -= 1
+        if cut <= start:
+            return None
+        pending = sum(message_tokens(m) for m in history[start:cut])
+        if pending < self.trigger_tokens:
+            return None
+        return cut
+
+    def _prompt(self, old_summary: str, messages: list[dict], prefix: Optional[list[dict]]) -> list[dict]:
+        lines = []
+        for m in messages:
+            role = _ROLE_CN.get(m.get("role", ""))
+            if role:
+                lines.append(f"{role}：{m.get('content', '')}")
+        instruction = (
+            "（以下为记录员任务，不是玩家行动）你是跑团记录员。请把“已有前情提要”和“新增剧情”合并为一份新的前情提要，"
+            "保留关键线索、登场NPC、获得/失去的物品、玩家做出的重要决定和尚未解决的悬念，"
+            f"按时间顺序叙述，不超过{self.max_chars}字，只输出前情提要正文。\n\n"
+            f"已有前情提要：{old_summary or '无'}\n\n新增剧情：\n" + "\n".join(lines)
+        )
+        return list(prefix or []) + [{"role": "user", "content": instruction}]
+
+    def summarize(self, old_summary: str, messages: list[dict], *, prefix: Optional[list[dict]] = None) -> str:
+        """
+        prefix：与正式对话相同的规则 / 剧本 system 消息，放在最前面以命中服务端前缀缓存。
+        """
+        prompt = self._prompt(old_summary, messages, prefix)
+        res = self.client.chat(prompt, temperature=0.3, stream=False, model=self.model, purpose="summary")
+        return (res.choices[0].message.content or "").strip()
+
+    async def asummarize(self, aclient: AsyncLLMClient, old_summary: str, messages: list[dict], *,
+                         prefix: Optional[list[dict]] = None) -> str:
+        """
+        summarize 的异步版本，走 AsyncLLMClient 的旁路并发名额。
+        """
+        prompt = self._prompt(old_summary, messages, prefix)
+        res = await aclient.chat(prompt, temperature=0.3, stream=False, model=self.model, purpose="summary")
+        return (res.choices[0].message.content or "").strip()
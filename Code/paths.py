@@ -31,4 +31,12 @@ class ProjectPaths:
     @property
     def save_dir(self) -> Path: return self.root / "Save"
     @property
+    def blob_dir(self) -> Path: return self.save_dir / "blobs"
+    @property
+    def cache_dir(self) -> Path: return self.root / "Cache"
+    @property
+    def tts_cache_dir(self) -> Path: return self.cache_dir / "tts"
+    @property
+    def vosk_model_dir(self) -> Path: return self.root / "Model" / "vosk"
+    @property
     def key_file(self) -> Path: return self.root / "key.txt"
@@ -3,8 +3,26 @@ from pathlib import Path
 from paths import find_project_root, ProjectPaths
 from config import AppConfig, load_api_key
 from core.file_manager import FileManager
+from core.save_search import SaveSearch
 from llm.llm_client import LLMClient
 from llm.agent_manager import AgentManager, AgentSession
+from llm.context_window import ContextWindow
+from llm.summarizer import StorySummarizer
+
+
+def search_saves(query: str, *, limit: int = 20):
+    """
+    命令行跨存档搜索：先增量同步索引（只解析新增 / 变更的文件），再查询。
+    """
+    paths = ProjectPaths(find_project_root(Path.cwd()))
+    search = SaveSearch(paths.save_dir, paths.log_dir)
+    search.refresh()
+    hits = search.search(query, limit=limit)
+    if not hits:
+        print("没有找到匹配的存档")
+    for h in hits:
+        label = "/".join(x for x in (h["rule"], h["story"]) if x) or "-"
+        print(f"{h['file']}  [{label}] #{h['pos']} {h['role']}: {h['snippet']}")
 
 
 def main(rule="DET", story="THE_FIRSTMURDER"):
@@ -17,8 +35,11 @@ def main(rule="DET", story="THE_FIRSTMURDER"):
     rule_text = fm.read_text(paths.rule_dir / f"{rule}_PROMPT.txt") or ""
     bg_text = fm.read_text(paths.story_dir / rule / f"{story}.txt") or ""
 
-    agent = AgentManager(paths, LLMClient(api_key, cfg.deepseek_url, cfg.default_model), fm)
-    agent.init_session(AgentSession(rule_text, bg_text))
+    client = LLMClient.from_config(cfg, api_key)
+    summarizer = StorySummarizer(client, model=cfg.summary_model, trigger_tokens=cfg.summary_trigger_tokens,
+                                 keep_recent=cfg.summary_keep_recent)
+    agent = AgentManager(paths, client, fm, ContextWindow(cfg.context_token_budget), summarizer)
+    agent.init_session(AgentSession(rule_text, bg_text, rule_name=rule, story_name=story))
 
     print(agent.show_beginning())
     while True:
@@ -29,6 +50,21 @@ def main(rule="DET", story="THE_FIRSTMURDER"):
         reply = res.choices[0].message.content or ""
         agent.commit_assistant_reply(reply)
         print(f"\n主持人>\n{reply}")
+        if agent.last_context:
+            ctx = agent.last_context
+            print(f"[上下文 {ctx.prompt_tokens} tokens，完整历史 {ctx.full_tokens}，已省略 {ctx.dropped_messages} 条]")
+        usage = client.last_usage.get("narration")
+        if usage:
+            print(f"[缓存命中 {usage.cache_hit_tokens}/{usage.prompt_tokens} tokens，{usage.cache_hit_rate:.0%}]")
+    client.close()
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--search", help="在所有存档 / 回放中搜索关键词（空格分隔多个词）")
+    ap.add_argument("--limit", type=int, default=20)
+    args = ap.parse_args()
+    if args.search:
+        search_saves(args.search, limit=args.limit)
+    else:
+        main()
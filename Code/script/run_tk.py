@@ -1,4 +1,11 @@
+from __future__ import annotations
 print(">>> run_tk.py started")
+import time
+_T0 = time.perf_counter()
+
+import importlib
+import sys
+import threading
 from pathlib import Path
 import tkinter as tk
 from tkinter import ttk, messagebox
@@ -6,10 +13,35 @@ from tkinter import ttk, messagebox
 from paths import find_project_root, ProjectPaths
 from core.file_manager import FileManager
 from config import AppConfig, load_api_key
-from llm.llm_client import LLMClient
-from llm.agent_manager import AgentManager, AgentSession
-from audio.voice_manager import VoiceManager
-from ui.tk_app import StreamDisplayApp
+
+# 选完规则 / 剧本之后才用到的模块（openai / httpx、事件循环、朗读、主界面）。
+# 启动时只导入上面几个轻量模块，让“新游戏配置”对话框立刻出现；这些模块在对话框打开期间由后台线程预先导入。
+DEFERRED_IMPORTS = (
+    "llm.agent_manager",
+    "audio.voice_manager",
+    "ui.tk_app",
+    "openai",
+    "httpx",
+)
+
+
+def preload_modules(modules=DEFERRED_IMPORTS) -> threading.Thread:
+    """
+    后台线程依次导入 modules；主线程之后再 import 时直接命中 sys.modules。
+    失败只打印，真正用到时会在主线程里再报一次。
+    """
+    def run():
+        t0 = time.perf_counter()
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                print(f"[startup] 预加载 {name} 失败：{e}")
+        print(f">>> deferred imports ready in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    t = threading.Thread(target=run, name="preload", daemon=True)
+    t.start()
+    return t
 
 
 def list_rules(paths: ProjectPaths) -> list[str]:
@@ -40,6 +72,8 @@ def load_rule_story(paths: ProjectPaths, rule_name: str, story_name: str) -> Age
     """
     读取规则 prompt + 剧本 txt，封装成 AgentSession
     """
+    from llm.agent_manager import AgentSession
+
     fm = FileManager()
     rule_path = paths.rule_dir / f"{rule_name}_PROMPT.txt"
 
@@ -58,7 +92,7 @@ def load_rule_story(paths: ProjectPaths, rule_name: str, story_name: str) -> Age
     if not background.strip():
         raise FileNotFoundError(f"剧本文件为空或不存在：{story_path}")
 
-    return AgentSession(rule_text=rule, background_text=background)
+    return AgentSession(rule_text=rule, background_text=background, rule_name=rule_name, story_name=story_name)
 
 
 class NewGameDialog(tk.Toplevel):
@@ -165,6 +199,7 @@ class NewGameDialog(tk.Toplevel):
 
 def choose_session(root: tk.Tk, paths: ProjectPaths) -> tuple[str, str] | None:
     dlg = NewGameDialog(root, paths)
+    print(f">>> picker shown after {(time.perf_counter() - _T0) * 1000:.0f} ms")
     root.wait_window(dlg)
     return dlg.result
 
@@ -187,6 +222,7 @@ def main():
     root.geometry("420x220")
     root.update_idletasks()  # 确保 Tk 初始化完成
 
+    preload_modules()
     sel = choose_session(root, paths)
     if sel is None:
         root.destroy()
@@ -195,24 +231,70 @@ def main():
 
     rule_name, story_name = sel
 
+    from llm.async_bridge import AsyncLoopThread
+    from llm.async_client import AsyncLLMClient
+    from llm.llm_client import LLMClient
+    from llm.agent_manager import AgentManager
+    from llm.context_window import ContextWindow
+    from llm.summarizer import StorySummarizer
+    from audio.audio_cache import AudioCache
+    from audio.tts_backends import make_backend
+    from audio.voice_manager import VoiceManager
+    from ui.tk_app import StreamDisplayApp
+
     # 初始化 Agent
-    client = LLMClient(api_key=api_key, base_url=cfg.deepseek_url, model=cfg.default_model)
-    fm = FileManager()
-    agent = AgentManager(paths=paths, client=client, file_manager=fm)
+    client = LLMClient.from_config(cfg, api_key)
+    # 异步后端：事件循环线程 + 共用连接池的 AsyncLLMClient；同步 LLMClient 保留给兼容路径
+    loop = AsyncLoopThread() if cfg.async_llm else None
+    aclient = AsyncLLMClient.from_config(cfg, api_key) if cfg.async_llm else None
+    fm = FileManager(fsync_interval=cfg.save_fsync_interval)
+    summarizer = StorySummarizer(client, model=cfg.summary_model, trigger_tokens=cfg.summary_trigger_tokens,
+                                 keep_recent=cfg.summary_keep_recent)
+    agent = AgentManager(paths=paths, client=client, file_manager=fm,
+                         context=ContextWindow(cfg.context_token_budget), summarizer=summarizer,
+                         inline_status=cfg.inline_status, aclient=aclient, loop=loop)
 
     session = load_rule_story(paths, rule_name=rule_name, story_name=story_name)
     agent.init_session(session)
 
-    voice = VoiceManager(rate=200)
+    # 朗读线程在第一次朗读（或勾选“文本朗读”）时才启动
+    backend = make_backend(cfg.tts_backend, rate=cfg.tts_rate, voice=cfg.tts_voice)
+    voice = VoiceManager(backend=backend, cache=AudioCache(paths.tts_cache_dir, max_bytes=cfg.tts_cache_mb * 1024 * 1024))
 
     # 进入主 UI
     root.deiconify()
-    app = StreamDisplayApp(root, agent=agent, paths=paths, voice=voice)
-    root.protocol("WM_DELETE_WINDOW", lambda: (voice.close(), root.destroy()))
+    voice_model = Path(cfg.voice_input_model) if cfg.voice_input_model else None
+    app = StreamDisplayApp(root, agent=agent, paths=paths, voice=voice, voice_model=voice_model)
+    # app.on_window_close 负责导出回放 / 指标、关闭语音与事件循环并销毁窗口
+    root.protocol("WM_DELETE_WINDOW", lambda: (app.on_window_close(), client.close()))
     print(">>> entering mainloop")
 
     root.mainloop()
 
 
+def profile_startup(*, top: int = 30, budget_ms: float | None = None) -> int:
+    """
+    在全新子进程里测量导入耗时：startup = 对话框出现前导入的模块，deferred = 之后按需导入的模块。
+    startup 合计超过 budget_ms 时返回 1，可放进 CI 防止启动变慢。
+    """
+    from core.import_profile import format_table, phase_totals, profile_imports
+    rows = profile_imports([("startup", ["script.run_tk"]), ("deferred", DEFERRED_IMPORTS)],
+                           cwd=Path(__file__).resolve().parents[1])
+    print(format_table(rows, top=top))
+    startup = phase_totals(rows).get("startup", 0.0)
+    if budget_ms is not None and startup > budget_ms:
+        print(f"启动阶段导入耗时 {startup:.1f} ms，超过预算 {budget_ms:.1f} ms")
+        return 1
+    return 0
+
+
 if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--profile-imports", action="store_true", help="不启动界面，输出各模块的导入耗时表")
+    ap.add_argument("--top", type=int, default=30, help="导入耗时表显示的模块数")
+    ap.add_argument("--budget-ms", type=float, default=None, help="启动阶段导入耗时上限，超过时以状态码 1 退出")
+    args = ap.parse_args()
+    if args.profile_imports:
+        sys.exit(profile_startup(top=args.top, budget_ms=args.budget_ms))
     main()
@@ -0,0 +1,150 @@
+from __future__ import annotations
+from dataclasses import dataclass
+
+import tkinter as tk
+
+from core.general_tools import markdown_to_text
+from core.search_index import NGramIndex
+
+ROLE_CN = {"system": "系统", "user": "玩家", "assistant": "主持人", "tool": "工具"}
+
+
+@dataclass
+class _Entry:
+    msg: dict
+    seq: int
+    tag: str
+    role_cn: str
+    text: str    # markdown_to_text 之后的正文，只在首次渲染时转换一次
+    block: str   # 实际插入 Text 的整块文本（含分隔线与角色行）
+
+
+class HistoryView:
+    """
+    历史面板的增量渲染（倒序：最新的在最上面）。
+    - sync()：按对象身份对比 history，只渲染新增消息；重试 / 读档导致的变化只重绘变化之后的部分
+    - set_filter()：关键字过滤查倒排索引（core/search_index.py），只切换可见性发生变化的块，
+      并对可见结果高亮命中位置
+    """
+
+    # 高亮只处理最新的这么多条命中，避免关键字过短时大量打标签
+    max_highlight = 200
+
+    def __init__(self, text: tk.Text):
+        self.text = text
+        self.text.tag_configure("hidden", elide=True)
+        self.text.tag_configure("match", background="#ffe58f")
+        self._entries: list[_Entry] = []
+        self._start = 0
+        self._seq = 0
+        self._keyword = ""
+        self._index = NGramIndex()
+        self._hidden: set[int] = set()
+        self.last_matches = 0
+
+    def sync(self, history: list[dict]) -> int:
+        """
+        返回本次新渲染的消息条数。
+        """
+        # 开局阶段（只有规则 / 剧本）全部显示；之后隐藏开头两条 system
+        start = 2 if len(history) >= 3 else 0
+        if start != self._start:
+            self._truncate(0)
+            self._start = start
+
+        shown = history[start:]
+        keep = 0
+        n = min(len(shown), len(self._entries))
+        while keep < n and shown[keep] is self._entries[keep].msg:
+            keep += 1
+        self._truncate(keep)
+
+        for msg in shown[keep:]:
+            self._append(msg)
+        added = len(shown) - keep
+        # 过滤中：新消息在 _append 里逐条判定可见性，高亮整批只刷新一次
+        if added and self._keyword:
+            self.last_matches = len(self._entries) - len(self._hidden)
+            self._highlight()
+        return added
+
+    def set_filter(self, keyword: str, *, force: bool = False) -> None:
+        keyword = keyword.strip()
+        if keyword == self._keyword and not force:
+            return
+        self._keyword = keyword
+
+        matched = self._index.search(keyword) if keyword else None
+        hidden = set() if matched is None else {e.seq for e in self._entries} - matched
+        self.last_matches = len(self._entries) - len(hidden)
+
+        by_seq = {e.seq: e for e in self._entries} if hidden != self._hidden else {}
+        for seq in hidden - self._hidden:
+            self._set_hidden(by_seq[seq], True)
+        for seq in self._hidden - hidden:
+            if seq in by_seq:
+                self._set_hidden(by_seq[seq], False)
+        self._hidden = hidden
+
+        self._highlight()
+
+    def _set_hidden(self, e: _Entry, hidden: bool) -> None:
+        ranges = self.text.tag_ranges(e.tag)
+        if not ranges:
+            return
+        if hidden:
+            self.text.tag_add("hidden", ranges[0], ranges[1])
+        else:
+            self.text.tag_remove("hidden", ranges[0], ranges[1])
+
+    def _highlight(self) -> None:
+        self.text.tag_remove("match", "1.0", tk.END)
+        k = self._keyword
+        if not k:
+            return
+        done = 0
+        for e in reversed(self._entries):
+            if e.seq in self._hidden:
+                continue
+            ranges = self.text.tag_ranges(e.tag)
+            if not ranges:
+                continue
+            start = str(ranges[0])
+            for i in NGramIndex.find_all(e.block, k):
+                self.text.tag_add("match", f"{start}+{i}c", f"{start}+{i + len(k)}c")
+            done += 1
+            if done >= self.max_highlight:
+                break
+
+    def _append(self, msg: dict) -> None:
+        role = msg.get("role", "unknown")
+        role_cn = ROLE_CN.get(role, role)
+        content = msg.get("content", "")
+        try:
+            content_txt = markdown_to_text(str(content))
+        except Exception:
+            content_txt = str(content)
+
+        self._seq += 1
+        block = f"{'─' * 40}\n{role_cn}：\n{content_txt}\n\n"
+        e = _Entry(msg=msg, seq=self._seq, tag=f"msg{self._seq}", role_cn=role_cn, text=content_txt, block=block)
+        self._entries.append(e)
+        doc = f"{role_cn}\n{content_txt}"
+        self._index.add(e.seq, doc)
+
+        # 倒序显示：新消息插在最上面
+        self.text.insert("1.0", block, (e.tag,))
+        # 只判断这一条是否命中当前关键字，不重跑整体过滤
+        if self._keyword and self._keyword.lower() not in doc.lower():
+            self._hidden.add(e.seq)
+            self._set_hidden(e, True)
+
+    def _truncate(self, keep: int) -> None:
+        for e in self._entries[keep:]:
+            ranges = self.text.tag_ranges(e.tag)
+            if ranges:
+                self.text.delete(ranges[0], ranges[1])
+            self.text.tag_delete(e.tag)
+            self._index.remove(e.seq)
+            self._hidden.discard(e.seq)
+        del self._entries[keep:]
@@ -0,0 +1,72 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Optional
+
+import tkinter as tk
+from tkinter import ttk
+
+from core.metrics import MetricsRegistry
+
+
+class MetricsPanel(tk.Toplevel):
+    """
+    调试面板：每秒刷新一次各项延迟直方图的分位数，可导出 JSON / CSV 到 Log/。
+    非模态，游戏过程中可以一直开着。
+    """
+    def __init__(self, master: tk.Misc, metrics: MetricsRegistry, log_dir: Path, *, refresh_ms: int = 1000):
+        super().__init__(master)
+        self.title("性能指标")
+        self.metrics = metrics
+        self.log_dir = log_dir
+        self._refresh_ms = refresh_ms
+        self._after_id: Optional[str] = None
+
+        frm = ttk.Frame(self, padding=12)
+        frm.grid(row=0, column=0, sticky="nsew")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        frm.grid_rowconfigure(0, weight=1)
+        frm.grid_columnconfigure(0, weight=1)
+
+        cols = ("name", "count", "p50", "p95", "p99", "max", "mean")
+        self.tree = ttk.Treeview(frm, columns=cols, show="headings", height=16)
+        for c, text, w in (("name", "指标", 220), ("count", "次数", 60), ("p50", "p50", 80), ("p95", "p95", 80),
+                           ("p99", "p99", 80), ("max", "最大", 80), ("mean", "平均", 80)):
+            self.tree.heading(c, text=text)
+            self.tree.column(c, width=w, anchor="w" if c == "name" else "e")
+        self.tree.grid(row=0, column=0, sticky="nsew")
+
+        self.info_var = tk.StringVar(value="单位：*_ms 为毫秒，*_tokens_per_s 为 tokens/秒")
+        ttk.Label(frm, textvariable=self.info_var, foreground="#666").grid(row=1, column=0, sticky="w", pady=(8, 0))
+
+        btn_row = ttk.Frame(frm)
+        btn_row.grid(row=2, column=0, sticky="e", pady=(8, 0))
+        ttk.Button(btn_row, text="导出到 Log/", command=self._on_export).grid(row=0, column=0, padx=(0, 8))
+        ttk.Button(btn_row, text="关闭", command=self.destroy).grid(row=0, column=1)
+
+        self.bind("<Escape>", lambda e: self.destroy())
+        self._refresh()
+
+    def _refresh(self):
+        self._after_id = None
+        self.tree.delete(*self.tree.get_children())
+        for name, s in self.metrics.snapshot().items():
+            if not s.get("count"):
+                continue
+            self.tree.insert("", tk.END, values=(
+                name, s["count"], s["p50"], s["p95"], s["p99"], s["max"], s["mean"],
+            ))
+        self._after_id = self.after(self._refresh_ms, self._refresh)
+
+    def _on_export(self):
+        try:
+            json_path, csv_path = self.metrics.export(self.log_dir)
+            self.info_var.set(f"已导出：{json_path.name} / {csv_path.name}")
+        except Exception as e:
+            self.info_var.set(f"导出失败：{e}")
+
+    def destroy(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        super().destroy()
@@ -0,0 +1,87 @@
+from __future__ import annotations
+import time
+from pathlib import Path
+from typing import Optional
+
+import tkinter as tk
+from tkinter import ttk
+
+from core.save_index import SaveIndex
+
+_KIND_CN = {"journal": "自动(日志)", "auto": "自动", "manual": "手动"}
+
+
+class SaveBrowserDialog(tk.Toplevel):
+    """
+    读档列表：直接读取 Save/index.json，不逐个打开存档。
+    result 为选中的存档路径；选择“浏览文件...”时 browse=True。
+    """
+    def __init__(self, master: tk.Misc, index: SaveIndex):
+        super().__init__(master)
+        self.title("读档")
+        self.index = index
+        self.result: Optional[Path] = None
+        self.browse = False
+
+        self.transient(master)
+        self.grab_set()
+
+        frm = ttk.Frame(self, padding=12)
+        frm.grid(row=0, column=0, sticky="nsew")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        frm.grid_rowconfigure(0, weight=1)
+        frm.grid_columnconfigure(0, weight=1)
+
+        cols = ("time", "kind", "story", "turns", "preview")
+        self.tree = ttk.Treeview(frm, columns=cols, show="headings", height=14)
+        for c, text, w in (("time", "时间", 130), ("kind", "类型", 80), ("story", "剧本", 140),
+                           ("turns", "轮数", 50), ("preview", "最近剧情", 320)):
+            self.tree.heading(c, text=text)
+            self.tree.column(c, width=w, anchor="w")
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        sb = ttk.Scrollbar(frm, orient=tk.VERTICAL, command=self.tree.yview)
+        sb.grid(row=0, column=1, sticky="ns")
+        self.tree.configure(yscrollcommand=sb.set)
+
+        btn_row = ttk.Frame(frm)
+        btn_row.grid(row=1, column=0, columnspan=2, sticky="e", pady=(8, 0))
+        ttk.Button(btn_row, text="浏览文件...", command=self._on_browse).grid(row=0, column=0, padx=(0, 8))
+        ttk.Button(btn_row, text="读取", command=self._on_ok).grid(row=0, column=1, padx=(0, 8))
+        ttk.Button(btn_row, text="取消", command=self.destroy).grid(row=0, column=2)
+
+        self.reload()
+
+        self.tree.bind("<Double-1>", lambda e: self._on_ok())
+        self.bind("<Return>", lambda e: self._on_ok())
+        self.bind("<Escape>", lambda e: self.destroy())
+
+    def reload(self):
+        """
+        按索引当前内容重建列表（后台刷新完成后调用），尽量保留原来的选中项。
+        """
+        sel = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+        for e in self.index.entries():
+            label = "/".join(x for x in (e.get("rule"), e.get("story")) if x) or e["session"][:8]
+            self.tree.insert("", tk.END, iid=e["name"], values=(
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(e["mtime"])),
+                _KIND_CN.get(e.get("kind", ""), e.get("kind", "")),
+                label,
+                e.get("turns", 0),
+                e.get("preview", ""),
+            ))
+        keep = [x for x in sel if self.tree.exists(x)]
+        if keep:
+            self.tree.selection_set(keep)
+
+    def _on_ok(self):
+        sel = self.tree.selection()
+        if not sel:
+            return
+        self.result = self.index.save_dir / sel[0]
+        self.destroy()
+
+    def _on_browse(self):
+        self.browse = True
+        self.destroy()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+import time
+from pathlib import Path
+from typing import Optional
+
+import tkinter as tk
+from tkinter import ttk
+
+from core.save_search import SaveSearch
+from ui.history_view import ROLE_CN
+
+
+class SaveSearchDialog(tk.Toplevel):
+    """
+    跨存档搜索：只查询 Save/search.sqlite3，索引由后台维护线程在自动存档后更新。
+    result 为选中结果所在的存档路径（回放文本不能读档，只显示）。
+    """
+    def __init__(self, master: tk.Misc, search: SaveSearch, *, debounce_ms: int = 200):
+        super().__init__(master)
+        self.title("搜索存档")
+        self.search = search
+        self.result: Optional[Path] = None
+        self._debounce_ms = debounce_ms
+        self._after_id: Optional[str] = None
+        self._hits: dict[str, dict] = {}
+
+        self.transient(master)
+        self.grab_set()
+
+        frm = ttk.Frame(self, padding=12)
+        frm.grid(row=0, column=0, sticky="nsew")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        frm.grid_rowconfigure(1, weight=1)
+        frm.grid_columnconfigure(0, weight=1)
+
+        self.query_var = tk.StringVar(value="")
+        entry = ttk.Entry(frm, textvariable=self.query_var)
+        entry.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 8))
+        entry.bind("<KeyRelease>", lambda e: self._schedule())
+        entry.focus_set()
+
+        cols = ("time", "story", "role", "snippet")
+        self.tree = ttk.Treeview(frm, columns=cols, show="headings", height=14)
+        for c, text, w in (("time", "存档时间", 130), ("story", "剧本", 140),
+                           ("role", "角色", 60), ("snippet", "命中内容", 420)):
+            self.tree.heading(c, text=text)
+            self.tree.column(c, width=w, anchor="w")
+        self.tree.grid(row=1, column=0, sticky="nsew")
+        sb = ttk.Scrollbar(frm, orient=tk.VERTICAL, command=self.tree.yview)
+        sb.grid(row=1, column=1, sticky="ns")
+        self.tree.configure(yscrollcommand=sb.set)
+
+        self.info_var = tk.StringVar(value="输入关键词（空格分隔多个词）")
+        ttk.Label(frm, textvariable=self.info_var, foreground="#666").grid(row=2, column=0, sticky="w", pady=(8, 0))
+
+        btn_row = ttk.Frame(frm)
+        btn_row.grid(row=3, column=0, columnspan=2, sticky="e", pady=(8, 0))
+        ttk.Button(btn_row, text="读取该存档", command=self._on_ok).grid(row=0, column=0, padx=(0, 8))
+        ttk.Button(btn_row, text="关闭", command=self.destroy).grid(row=0, column=1)
+
+        self.tree.bind("<Double-1>", lambda e: self._on_ok())
+        self.bind("<Return>", lambda e: self._run_query())
+        self.bind("<Escape>", lambda e: self.destroy())
+
+    def _schedule(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+        self._after_id = self.after(self._debounce_ms, self._run_query)
+
+    def _run_query(self):
+        self._after_id = None
+        self.tree.delete(*self.tree.get_children())
+        self._hits.clear()
+        query = self.query_var.get().strip()
+        if not query:
+            self.info_var.set("输入关键词（空格分隔多个词）")
+            return
+
+        t0 = time.perf_counter()
+        try:
+            hits = self.search.search(query)
+        except Exception as e:
+            self.info_var.set(f"搜索失败：{e}")
+            return
+        ms = (time.perf_counter() - t0) * 1000
+
+        for i, h in enumerate(hits):
+            iid = str(i)
+            self._hits[iid] = h
+            label = "/".join(x for x in (h["rule"], h["story"]) if x) or h["file"]
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(h["mtime"]))
+            self.tree.insert("", tk.END, iid=iid, values=(when, label, ROLE_CN.get(h["role"], h["role"]), h["snippet"]))
+        self.info_var.set(f"{len(hits)} 条结果（{ms:.0f} ms）")
+
+    def _on_ok(self):
+        sel = self.tree.selection()
+        if not sel:
+            return
+        hit = self._hits.get(sel[0])
+        if not hit:
+            return
+        if hit["source"] != "save":
+            self.info_var.set(f"{hit['file']} 是导出的回放，不能读档")
+            return
+        self.result = self.search.save_dir / hit["file"]
+        self.destroy()
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import time
 import threading
 import queue
+import uuid
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Optional
@@ -12,8 +14,25 @@ import tkinter as tk
 from tkinter import scrolledtext, filedialog
 
 from paths import ProjectPaths
+from audio.sentence_splitter import SentenceSegmenter
+from audio.voice_input import MicrophoneSource, VoiceInput
 from core.general_tools import markdown_to_text
 from core.json_tools import parse_json_object
+from core.blob_store import BlobStore
+from core.file_manager import FileManager
+from core.save_journal import SaveJournal
+from core.stream_buffer import StreamBuffer
+from core.metrics import MetricsRegistry, get_registry
+from core.save_retention import RetentionPolicy, SaveMaintenance
+from core.save_search import SaveSearch
+from llm.llm_client import CancelToken, RequestCancelled
+from llm.async_bridge import AsyncLoopThread
+from llm.prefetch import AsyncSpeculative, Speculative
+from llm.status_stream import StatusBlockParser
+from ui.history_view import HistoryView
+from ui.save_browser import SaveBrowserDialog
+from ui.save_search_dialog import SaveSearchDialog
+from ui.metrics_panel import MetricsPanel
 
 
 @dataclass
@@ -30,11 +49,21 @@ class StreamDisplayApp:
     - 右下：状态（diff 高亮）
     """
 
-    def __init__(self, tk_root: tk.Tk, agent, paths: ProjectPaths, voice=None):
+    # 每轮流式回复使用的缓冲类型（基准测试可替换为带时间戳的子类）
+    stream_buffer_factory = StreamBuffer
+
+    def __init__(self, tk_root: tk.Tk, agent, paths: ProjectPaths, voice=None, loop: Optional[AsyncLoopThread] = None,
+                 voice_model: Optional[Path] = None):
         self.root = tk_root
         self.agent = agent
         self.paths = paths
         self.voice = voice
+        # 语音输入（Vosk）：首次勾选时才加载模型
+        self.voice_model = voice_model or paths.vosk_model_dir
+        self.voice_input: Optional[VoiceInput] = None
+        # 异步后端：Agent 带 AsyncLLMClient 时，开场 / 叙述流 / 先行状态请求都作为协程跑在同一个事件循环里
+        self.loop: Optional[AsyncLoopThread] = loop or getattr(agent, "loop", None)
+        self._async = self.loop is not None and getattr(agent, "supports_async", False)
 
         self.flags = UIFlags(read_aloud=False, auto_save=True)
 
@@ -45,15 +74,69 @@ class StreamDisplayApp:
         self.last_user_input = ""
         self.last_final_assistant_md = ""
         self.status: dict[str, Any] = {}
+        self._inline_status: Optional[dict] = None
+        # 本轮请求的取消句柄（停止 = 立即断开连接）与先行发出的状态请求（重试时取消）
+        self._request_token = CancelToken()
+        self._status_prefetch: Optional[Speculative | AsyncSpeculative] = None
 
         self.history_filter_var = tk.StringVar(value="")
+        self._filter_after_id: Optional[str] = None
+        self._filter_delay_ms = 150
         self.status_var = tk.StringVar(value="准备就绪")
 
-        # stream queue
-        self._stream_q: queue.Queue[str] = queue.Queue()
+        # 流式缓冲：接收线程 append，主线程按读取位置批量取出（每轮新建）
+        self._stream_buf = StreamBuffer()
+        # 排空循环按显示帧节奏运行：有数据时每帧至多插入一次；连续无数据时间隔翻倍，
+        # 再之后完全停下（idle），由接收线程在新数据到达时唤醒
         self._drain_after_id: Optional[str] = None
-        self._drain_interval_ms = 33
+        self._frame_ms = 16
+        self._drain_max_backoff = 4
         self._drain_batch_chars = 6000
+        self._drain_empty = 0
+        self._drain_idle = False
+        # 本轮流式统计：首字延迟、Tk 线程在排空回调里的耗时占比
+        self._stream_t0 = 0.0
+        self._ttft_ms: Optional[float] = None
+        self._tk_busy_s = 0.0
+        self._stream_status_at = 0.0
+        # 流式朗读：本轮的分句器与朗读段号；首字到第一次出声的延迟记入 turn.tts_first_audio_ms
+        self._tts_seg: Optional[SentenceSegmenter] = None
+        self._tts_gen = 0
+        self._tts_first_audio_ms: Optional[float] = None
+        if self.voice is not None and hasattr(self.voice, "on_audio_start"):
+            self.voice.on_audio_start = self._on_audio_start
+
+        # post-turn 后台阶段：状态提取 + 自动存档，不占用 Tk 主线程
+        self._post_turn_q: queue.Queue[Optional[dict]] = queue.Queue()
+        self._post_turn_seq = 0
+        # 会话代号：读档时 +1，队列里上一局的任务直接丢弃（不写进新局的日志、不覆盖读档后的状态）
+        self._session_gen = 0
+        # 延迟指标：与 LLMClient 共用同一个 MetricsRegistry（llm.* 与 turn.*），调试面板从这里读
+        client = getattr(self.agent, "client", None)
+        self.metrics: MetricsRegistry = getattr(client, "metrics", None) or get_registry()
+        self._metrics_panel: Optional[MetricsPanel] = None
+        # 所有存档 / 回放写入都走原子写（临时文件 + fsync + rename）
+        self.fm: FileManager = getattr(self.agent, "fm", None) or FileManager()
+        # 自动存档日志：每局一个 JSONL，只追加每轮增量；只在 post-turn 线程里读写，
+        # _journal_gen 记录它属于哪个会话代号，代号变了就换新文件
+        self._journal: Optional[SaveJournal] = None
+        self._journal_gen = 0
+        # 规则 / 剧本全文只在 Save/blobs 存一份，存档里写哈希引用
+        self.blobs = BlobStore(self.paths.blob_dir)
+        # 存档索引 + 保留策略 + 日志压缩 + 跨存档检索库，在后台线程执行
+        self.save_search = SaveSearch(self.paths.save_dir, self.paths.log_dir)
+        self.maintenance = SaveMaintenance(self.paths.save_dir, self.blobs, RetentionPolicy(), search=self.save_search)
+        # 启动时先同步一次，之前的存档 / 回放也能被搜到
+        self.maintenance.request()
+        session = getattr(self.agent, "session", None)
+        # campaign：这一局的标识，新游戏时生成、读档后沿用；存档保留策略按它归组
+        self.session_meta = {
+            "rule": getattr(session, "rule_name", ""),
+            "story": getattr(session, "story_name", ""),
+            "campaign": uuid.uuid4().hex,
+        }
+        self._post_turn_t = threading.Thread(target=self._post_turn_loop, daemon=True)
+        self._post_turn_t.start()
 
         self._build_window()
         self._build_layout()
@@ -106,6 +189,8 @@ class StreamDisplayApp:
         self.input_text = scrolledtext.ScrolledText(frame, wrap=tk.WORD, height=7)
         self.input_text.grid(row=1, column=0, sticky="nsew")
         self.input_text.bind("<Return>", self._on_enter)
+        # 语音识别中的部分结果：灰色显示，句子结束后替换为最终结果
+        self.input_text.tag_configure("voice_partial", foreground="#888")
 
         helper = "Enter 发送 | Shift+Enter 换行 | Ctrl+L 清空输入"
         tk.Label(frame, text=helper, fg="#666").grid(row=2, column=0, sticky="w", pady=(4, 0))
@@ -140,9 +225,9 @@ class StreamDisplayApp:
         tk.Label(header, text="搜索").grid(row=0, column=1, sticky="e", padx=(0, 6))
         search = tk.Entry(header, textvariable=self.history_filter_var, width=18)
         search.grid(row=0, column=2, sticky="e")
-        search.bind("<KeyRelease>", lambda e: self.safe_update_history())
+        search.bind("<KeyRelease>", lambda e: self._on_history_filter())
 
-        hint = tk.Label(frame, text="（倒序显示，输入关键字过滤）", fg="#666")
+        hint = tk.Label(frame, text="（倒序显示，输入关键字过滤并高亮）", fg="#666")
         hint.grid(row=1, column=0, sticky="w", pady=(4, 4))
 
         self.history_text = scrolledtext.ScrolledText(frame, wrap=tk.WORD)
@@ -150,6 +235,7 @@ class StreamDisplayApp:
         self.history_text.bind("<Key>", lambda e: "break")
         self.history_text.bind("<<Paste>>", lambda e: "break")
         self.history_text.bind("<<Cut>>", lambda e: "break")
+        self.history_view = HistoryView(self.history_text)
 
     def _build_status_panel(self):
         frame = tk.Frame(self.right, bd=2, relief=tk.GROOVE)
@@ -189,11 +275,19 @@ class StreamDisplayApp:
         self.export_btn = tk.Button(left, text="导出回放", command=self.export_replay_txt)
         self.export_btn.pack(side=tk.LEFT, padx=4)
 
+        self.search_btn = tk.Button(left, text="搜索存档", command=self.search_saves)
+        self.search_btn.pack(side=tk.LEFT, padx=4)
+
+        self.metrics_btn = tk.Button(left, text="性能", command=self.show_metrics_panel)
+        self.metrics_btn.pack(side=tk.LEFT, padx=4)
+
         self.read_var = tk.BooleanVar(value=self.flags.read_aloud)
         self.auto_save_var = tk.BooleanVar(value=self.flags.auto_save)
+        self.listen_var = tk.BooleanVar(value=False)
 
         tk.Checkbutton(left, text="文本朗读", variable=self.read_var, command=self._on_toggle_read).pack(side=tk.LEFT, padx=10)
         tk.Checkbutton(left, text="自动存档", variable=self.auto_save_var, command=self._on_toggle_autosave).pack(side=tk.LEFT)
+        tk.Checkbutton(left, text="语音输入", variable=self.listen_var, command=self._on_toggle_listen).pack(side=tk.LEFT, padx=10)
 
         self.stop_btn = tk.Button(right, text="停止", command=self.stop_stream, state=tk.DISABLED, bg="#ffe6e6")
         self.stop_btn.pack(side=tk.RIGHT, padx=4)
@@ -210,6 +304,7 @@ class StreamDisplayApp:
 
     def _bind_shortcuts(self):
         self.root.bind_all("<Control-l>", lambda e: self._clear_input())
+        self.root.bind_all("<F12>", lambda e: self.show_metrics_panel())
 
     # ---------------------------
     # Init content
@@ -219,12 +314,36 @@ class StreamDisplayApp:
         self.safe_update_status("初始化中...")
         self.input_text.insert(tk.END, "# 欢迎使用\n玩家在这里输入...")
 
+        if self._async:
+            # 开场白在事件循环里请求，窗口先显示出来；完成前禁用发送，可点停止取消
+            self.streaming = True
+            self.send_btn.config(state=tk.DISABLED)
+            self.stop_btn.config(state=tk.NORMAL)
+            fut = self.loop.submit(self.agent.ashow_beginning(), cancel=self._request_token)
+            self.loop.to_tk(self.root, fut, self._on_beginning_done)
+            return
+
         try:
             beginning = self._agent_show_beginning()
         except Exception as e:
             beginning = ""
             self._reply_clear_set(f"[错误] 初始化失败：{e}\n")
+        self._show_beginning(beginning)
 
+    def _on_beginning_done(self, fut):
+        self.streaming = False
+        self._reset_buttons()
+        beginning = ""
+        if fut.cancelled():
+            self.safe_update_status("已停止（未生成开场）")
+            return
+        try:
+            beginning = fut.result()
+        except Exception as e:
+            self._reply_clear_set(f"[错误] 初始化失败：{e}\n")
+        self._show_beginning(beginning)
+
+    def _show_beginning(self, beginning: str):
         initial_text = "# 这里是每轮主持人的回复\n" + (beginning or "")
         self._reply_clear_set(initial_text)
 
@@ -245,9 +364,9 @@ class StreamDisplayApp:
             return self.agent.show_background()
         return ""
 
-    def _agent_stream_chat(self, user_text: str):
+    def _agent_stream_chat(self, user_text: str, cancel: Optional[CancelToken] = None):
         if hasattr(self.agent, "talk"):
-            return self.agent.talk(user_text, stream=True)
+            return self.agent.talk(user_text, stream=True, cancel=cancel)
         if hasattr(self.agent, "talk_2_kp"):
             return self.agent.talk_2_kp(prompt=user_text, stream_mode=True)
         raise AttributeError("Agent does not support streaming chat")
@@ -260,14 +379,18 @@ class StreamDisplayApp:
             if hist is not None:
                 hist.append({"role": "assistant", "content": markdown_to_text(full_md)})
 
-    def _agent_update_status(self) -> dict:
+    def _agent_update_status(self, recent: Optional[list[dict]] = None, cancel: Optional[CancelToken] = None) -> dict:
         if hasattr(self.agent, "update_status_json"):
-            return self.agent.update_status_json()
+            return self.agent.update_status_json(recent=recent, cancel=cancel)
         if hasattr(self.agent, "json_reply"):
             raw = self.agent.json_reply(self.status)
             return parse_json_object(raw)
         return self.status
 
+    def _agent_usage(self, purpose: str):
+        client = getattr(self.agent, "aclient" if self._async else "client", None)
+        return getattr(client, "last_usage", {}).get(purpose)
+
     def _agent_get_history(self) -> Optional[list[dict]]:
         if hasattr(self.agent, "history"):
             return self.agent.history
@@ -295,10 +418,16 @@ class StreamDisplayApp:
 
         self.last_user_input = user_text
         self.full_response_md = ""
+        self._inline_status = None
         self.cancel_event.clear()
+        self._request_token = CancelToken()
 
-        self._drain_stream_queue(clear_only=True)
+        self._stream_buf = self.stream_buffer_factory()
         self._reply_clear_set("")  # 清空一次
+        self._stream_t0 = time.perf_counter()
+        self._ttft_ms = None
+        self._tk_busy_s = 0.0
+        self._start_read_aloud()
 
         self.streaming = True
         self.send_btn.config(state=tk.DISABLED)
@@ -307,13 +436,22 @@ class StreamDisplayApp:
 
         self._start_drain_loop()
 
-        t = threading.Thread(target=self._fetch_stream_worker, args=(user_text,), daemon=True)
+        if self._async:
+            self.loop.submit(self._fetch_stream_async(user_text, self._stream_buf), cancel=self._request_token)
+            return
+        t = threading.Thread(target=self._fetch_stream_worker,
+                             args=(user_text, self._stream_buf, self._request_token), daemon=True)
         t.start()
 
     def stop_stream(self):
         if not self.streaming:
             return
         self.cancel_event.set()
+        # 立即断开流式连接：服务端停止生成，接收线程不必等到下一块数据
+        self._request_token.cancel()
+        # 本轮不提交，已经开始的朗读也一并停下
+        if self._tts_seg is not None:
+            self.voice.stop()
         self.safe_update_status("正在停止生成...")
 
     def retry_last(self):
@@ -323,6 +461,11 @@ class StreamDisplayApp:
             self.safe_update_status("没有可重试的上一轮输入")
             return
 
+        # 上一轮的先行状态请求作废：不再采用、不再存档
+        if self._status_prefetch is not None:
+            self._status_prefetch.cancel()
+            self._status_prefetch = None
+
         hist = self._agent_get_history()
         if hist and hist[-1].get("role") == "assistant":
             hist.pop()
@@ -331,28 +474,119 @@ class StreamDisplayApp:
         self.input_text.insert("1.0", self.last_user_input)
         self.process_input()
 
-    def _fetch_stream_worker(self, user_text: str):
+    def _fetch_stream_worker(self, user_text: str, buf: StreamBuffer, token: CancelToken):
+        resp = None
         try:
-            resp = self._agent_stream_chat(user_text)
-            self.safe_update_status("正在接收回复...")
-
+            resp = self._agent_stream_chat(user_text, cancel=token)
+            parser = self._stream_begin()
             for chunk in resp:
                 if self.cancel_event.is_set():
                     break
+                self._stream_feed(buf, parser, chunk)
+            self._stream_end(buf, parser)
+        except Exception as e:
+            self._stream_failed(buf, e)
+        finally:
+            close = getattr(resp, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+            self.streaming = False
+            self.root.after(0, self._reset_buttons)
 
-                content = self._extract_stream_text(chunk)
-                if content:
-                    self.full_response_md += content
-                    self._stream_q.put(content)
-
-            self.root.after(0, self._finalize_stream)
-
+    async def _fetch_stream_async(self, user_text: str, buf: StreamBuffer):
+        """
+        _fetch_stream_worker 的协程版本；停止时所在任务被取消，连接立即断开。
+        """
+        resp = None
+        try:
+            resp = await self.agent.atalk(user_text)
+            parser = self._stream_begin()
+            async for chunk in resp:
+                if self.cancel_event.is_set():
+                    break
+                self._stream_feed(buf, parser, chunk)
+            self._stream_end(buf, parser)
+        except asyncio.CancelledError:
+            self.cancel_event.set()
+            self._stream_failed(buf, None)
+            raise
         except Exception as e:
-            self.root.after(0, lambda: self._reply_append_follow_latest(f"\n\n[错误]\n{e}\n"))
+            self._stream_failed(buf, e)
         finally:
+            if resp is not None:
+                try:
+                    await resp.aclose()
+                except Exception:
+                    pass
             self.streaming = False
             self.root.after(0, self._reset_buttons)
 
+    def _stream_begin(self) -> Optional[StatusBlockParser]:
+        ctx = getattr(self.agent, "last_context", None)
+        if ctx is not None:
+            self.safe_update_status(
+                f"正在接收回复...（上下文 {ctx.prompt_tokens} tokens，节省 {ctx.saved_tokens}）"
+            )
+        else:
+            self.safe_update_status("正在接收回复...")
+        # 内联状态模式：状态块从正文中剥离，不显示、不提交
+        return StatusBlockParser(expected_keys=set(self.status)) if getattr(self.agent, "inline_status", False) else None
+
+    def _stream_feed(self, buf: StreamBuffer, parser: Optional[StatusBlockParser], chunk) -> None:
+        content = self._extract_stream_text(chunk)
+        if parser is not None:
+            content = parser.feed(content)
+        if not content:
+            return
+        if self._ttft_ms is None:
+            self._ttft_ms = (time.perf_counter() - self._stream_t0) * 1000
+        buf.append(content)
+        self._wake_drain()
+        self._read_aloud(content)
+
+    def _stream_end(self, buf: StreamBuffer, parser: Optional[StatusBlockParser]) -> None:
+        if parser is not None and not self.cancel_event.is_set():
+            tail = parser.close()
+            buf.append(tail)
+            self._inline_status = parser.status
+            self._wake_drain()
+            self._read_aloud(tail)
+
+        buf.close()
+        if not self.cancel_event.is_set():
+            self._read_aloud(None)
+        prefetch = None
+        if not self.cancel_event.is_set():
+            prefetch = self._start_status_prefetch(buf)
+        self.root.after(0, lambda: self._finalize_stream(buf, prefetch))
+
+    def _stream_failed(self, buf: StreamBuffer, error: Optional[BaseException]) -> None:
+        if self.cancel_event.is_set():
+            # 主动停止导致的连接中断，不算错误
+            self.root.after(0, lambda: self._finalize_stream(buf, None))
+        else:
+            self.root.after(0, lambda: self._reply_append_follow_latest(f"\n\n[错误]\n{error}\n"))
+
+    def _start_status_prefetch(self, buf: StreamBuffer) -> Optional[Speculative | AsyncSpeculative]:
+        """
+        流一结束就在后台先发状态请求，不等 Tk 线程提交回复；回复内已带有效状态块时不需要。
+        recent 与提交后 history[-4:] 相同：history 末尾三条 + 本轮回复。
+        异步后端下状态请求与前情提要、下一轮叙述共用事件循环和连接池。
+        """
+        if isinstance(self._inline_status, dict) or not hasattr(self.agent, "update_status_json"):
+            return None
+        hist = self._agent_get_history() or []
+        recent = [dict(m) for m in hist[-3:]] + [{"role": "assistant", "content": markdown_to_text(buf.text())}]
+        if self._async:
+            prefetch = AsyncSpeculative(self.loop, self.agent.aupdate_status_json(recent))
+        else:
+            prefetch = Speculative(lambda tok: self._agent_update_status(recent, cancel=tok), name="status-prefetch")
+        self._status_prefetch = prefetch
+        return prefetch
+
     @staticmethod
     def _extract_stream_text(chunk) -> str:
         try:
@@ -382,82 +616,223 @@ class StreamDisplayApp:
     # ---------------------------
 
     def _start_drain_loop(self):
+        self._drain_idle = False
+        self._drain_empty = 0
         if self._drain_after_id is None:
-            self._drain_after_id = self.root.after(self._drain_interval_ms, self._drain_stream_queue)
+            self._drain_after_id = self.root.after(self._frame_ms, self._drain_stream)
 
-    def _drain_stream_queue(self, clear_only: bool = False):
-        if clear_only:
-            while True:
-                try:
-                    self._stream_q.get_nowait()
-                except queue.Empty:
-                    break
-            return
+    def _wake_drain(self):
+        """
+        接收线程调用：排空循环已停下时，投递一次唤醒（每次停下后只投递一次）。
+        """
+        if self._drain_idle:
+            self._drain_idle = False
+            self.root.after(0, self._start_drain_loop)
 
+    def _drain_stream(self):
         self._drain_after_id = None
-        if self.cancel_event.is_set():
+        if self.cancel_event.is_set() or not self.streaming:
             return
 
-        pieces: list[str] = []
-        total = 0
-        while True:
-            try:
-                s = self._stream_q.get_nowait()
-            except queue.Empty:
-                break
-            pieces.append(s)
-            total += len(s)
-            if total >= self._drain_batch_chars:
-                break
-
-        if pieces:
-            self._reply_append_follow_latest("".join(pieces))
-            self.status_var.set(f"接收中... {len(self.full_response_md)} 字符")
-
-        if self.streaming and not self.cancel_event.is_set():
-            self._drain_after_id = self.root.after(self._drain_interval_ms, self._drain_stream_queue)
+        t0 = time.perf_counter()
+        buf = self._stream_buf
+        text = buf.read(self._drain_batch_chars)
+        if text:
+            self._drain_empty = 0
+            self._reply_append_stream(text)
+            # 状态栏每 250ms 刷新一次就够了
+            if t0 - self._stream_status_at >= 0.25:
+                self._stream_status_at = t0
+                self.status_var.set(f"接收中... {len(buf)} 字符 | {self._stream_stats_text()}")
+        else:
+            self._drain_empty += 1
+        self._tk_busy_s += time.perf_counter() - t0
+
+        if self._drain_empty > self._drain_max_backoff:
+            # 停下等待唤醒；先置标志再复查，避免与接收线程的追加错过
+            self._drain_idle = True
+            if not buf.pending():
+                return
+            self._drain_idle = False
+            self._drain_empty = 0
+        delay = self._frame_ms << min(self._drain_empty, self._drain_max_backoff)
+        self._drain_after_id = self.root.after(delay, self._drain_stream)
+
+    def _stream_stats_text(self) -> str:
+        elapsed = time.perf_counter() - self._stream_t0
+        util = self._tk_busy_s / elapsed if elapsed > 0 else 0.0
+        ttft = f"{self._ttft_ms:.0f}ms" if self._ttft_ms is not None else "-"
+        return f"首字 {ttft} | Tk 占用 {util:.1%}"
 
     # ---------------------------
     # Finalize / Buttons
     # ---------------------------
 
-    def _finalize_stream(self):
+    def _finalize_stream(self, buf: StreamBuffer, prefetch: Optional[Speculative | AsyncSpeculative]):
         if self.cancel_event.is_set():
             self.safe_update_status("已停止（本轮未提交）")
             return
 
-        while True:
-            try:
-                s = self._stream_q.get_nowait()
-            except queue.Empty:
-                break
-            self._reply_append_follow_latest(s)
+        t0 = time.perf_counter()
 
+        self._reply_append_stream(buf.read())
+        self.full_response_md = buf.text()
         self.last_final_assistant_md = self.full_response_md
 
         self._agent_commit_assistant(self.full_response_md)
 
-        if self.read_var.get() and self.full_response_md:
+        # 流式朗读时已在接收过程中逐句排队，这里只处理不支持流式的朗读器
+        if self._tts_seg is None and self.read_var.get() and self.full_response_md:
             self._voice_speak(markdown_to_text(self.full_response_md))
 
         self.safe_update_history()
 
-        old_status = dict(self.status)
-        try:
-            new_status = self._agent_update_status()
-            if not isinstance(new_status, dict):
+        # 在主线程截取快照，后台线程只读快照，玩家可以立即开始下一轮
+        hist = self._agent_get_history() or []
+        self._post_turn_seq += 1
+        job = {
+            "seq": self._post_turn_seq,
+            "session_gen": self._session_gen,
+            "recent": [dict(m) for m in hist[-4:]],
+            "old_status": dict(self.status),
+            "save_payload": self._build_save_payload(auto=True) if self.auto_save_var.get() else None,
+            "inline_status": self._inline_status,
+            "prefetch": prefetch,
+            "ttft_ms": self._ttft_ms,
+            "stream_ms": (t0 - self._stream_t0) * 1000,
+            "tk_busy_ms": self._tk_busy_s * 1000,
+            "t_start": self._stream_t0,
+        }
+        job["ui_block_ms"] = (time.perf_counter() - t0) * 1000
+        self._post_turn_q.put(job)
+
+        self.safe_update_status("回复接收完成，正在后台更新状态...")
+
+    # ---------------------------
+    # Post-turn stage (worker thread)
+    # ---------------------------
+
+    def _post_turn_loop(self):
+        while True:
+            job = self._post_turn_q.get()
+            if job is None:
+                break
+            try:
+                self._run_post_turn(job)
+            finally:
+                self._post_turn_q.task_done()
+
+    def _run_post_turn(self, job: dict):
+        # 排队期间读了档：上一局的任务作废
+        if job["session_gen"] != self._session_gen:
+            return
+        old_status = job["old_status"]
+        error = None
+
+        t0 = time.perf_counter()
+        inline = job.get("inline_status")
+        prefetch: Optional[Speculative | AsyncSpeculative] = job.get("prefetch")
+        if isinstance(inline, dict):
+            # 回复里已带有效状态块：零额外请求
+            new_status = inline
+            if hasattr(self.agent, "accept_status"):
+                self.agent.accept_status(inline)
+        elif prefetch is not None:
+            # 流结束时已先行发出的状态请求；玩家重试时被取消，整轮后续处理（含存档）作废
+            try:
+                new_status = prefetch.result()
+                if not isinstance(new_status, dict):
+                    new_status = old_status
+            except RequestCancelled:
+                return
+            except Exception as e:
+                error = e
                 new_status = old_status
-        except Exception as e:
-            self.safe_update_status(f"状态更新失败：{e}")
-            new_status = old_status
+            if prefetch.cancelled:
+                return
+            if error is None and hasattr(self.agent, "accept_status"):
+                self.agent.accept_status(new_status)
+        else:
+            try:
+                new_status = self._agent_update_status(recent=job["recent"])
+                if not isinstance(new_status, dict):
+                    new_status = old_status
+            except Exception as e:
+                error = e
+                new_status = old_status
+        status_ms = (time.perf_counter() - t0) * 1000
+
+        save_ms = 0.0
+        save_result = None
+        payload = job["save_payload"]
+        if payload is not None:
+            payload["status"] = new_status
+            t1 = time.perf_counter()
+            save_result = self._append_journal(payload, job["session_gen"])
+            save_ms = (time.perf_counter() - t1) * 1000
+
+        metric = {
+            "seq": job["seq"],
+            "ui_block_ms": round(job["ui_block_ms"], 2),
+            "status_ms": round(status_ms, 2),
+            "save_ms": round(save_ms, 2),
+            "status_source": "inline" if isinstance(inline, dict) else ("prefetch" if prefetch is not None else "request"),
+            # 先行请求从发出到完成的耗时；status_ms 只是回合结束后还需等待的部分
+            "status_prefetch_ms": round((prefetch.finished - prefetch.started) * 1000, 2) if prefetch is not None and prefetch.finished else None,
+            # 旧实现中状态请求与存档都在 Tk 线程同步执行，界面会冻结这么久
+            "sync_block_ms": round(job["ui_block_ms"] + status_ms + save_ms, 2),
+            "ttft_ms": round(job["ttft_ms"], 2) if job.get("ttft_ms") is not None else None,
+            "tk_util": round(job["tk_busy_ms"] / job["stream_ms"], 4) if job.get("stream_ms") else 0.0,
+            # 首字到第一次出声（流式朗读）；第一句较长时可能此时还没出声
+            "tts_first_audio_ms": round(self._tts_first_audio_ms, 2) if self._tts_first_audio_ms is not None else None,
+        }
+        # 服务端前缀缓存命中（来自 API usage 字段）
+        for purpose in ("narration", "status"):
+            usage = self._agent_usage(purpose)
+            if usage is not None:
+                metric[f"{purpose}_prompt_tokens"] = usage.prompt_tokens
+                metric[f"{purpose}_cache_hit_tokens"] = usage.cache_hit_tokens
+        self.root.after(0, lambda: self._apply_post_turn(job, new_status, error, save_result, metric))
+
+    def _apply_post_turn(self, job: dict, new_status: dict, error, save_result, metric: dict):
+        t0 = time.perf_counter()
+        # 玩家在后台处理期间又完成了新一轮：旧结果不再覆盖界面
+        stale = job["seq"] != self._post_turn_seq or job["session_gen"] != self._session_gen
+        if not stale:
+            old_status = dict(self.status)
+            self.status = new_status
+            self.update_player_status(new_status, old_status=old_status)
+        metric["apply_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        metric["turn_ms"] = round((time.perf_counter() - job["t_start"]) * 1000, 2)
+        self._record_turn_metrics(metric)
+        if stale:
+            return
 
-        self.status = new_status
-        self.update_player_status(new_status, old_status=old_status)
+        if error is not None:
+            self.safe_update_status(f"状态更新失败：{error}")
+            return
+        cache = ""
+        if "narration_prompt_tokens" in metric:
+            cache = f"，缓存命中 {metric['narration_cache_hit_tokens']}/{metric['narration_prompt_tokens']} tokens"
+        ttft = f"首字 {metric['ttft_ms']:.0f}ms，" if metric.get("ttft_ms") is not None else ""
+        saved = f"｜{save_result}" if save_result else ""
+        self.safe_update_status(
+            f"回复接收完成（{ttft}Tk 占用 {metric['tk_util']:.1%}，UI 阻塞 {metric['ui_block_ms']:.0f}ms，"
+            f"同步模式需阻塞 {metric['sync_block_ms']:.0f}ms{cache}）{saved}"
+        )
 
-        if self.auto_save_var.get():
-            self.save_to_json(auto=True)
+    def _record_turn_metrics(self, metric: dict):
+        m = self.metrics
+        for key in ("ttft_ms", "turn_ms", "status_ms", "save_ms", "ui_block_ms", "apply_ms"):
+            m.observe(f"turn.{key}", metric.get(key))
+        m.record_turn(metric)
 
-        self.safe_update_status("回复接收完成")
+    def show_metrics_panel(self):
+        panel = self._metrics_panel
+        if panel is not None and panel.winfo_exists():
+            panel.lift()
+            return
+        self._metrics_panel = MetricsPanel(self.root, self.metrics, self.paths.log_dir)
 
     def _reset_buttons(self):
         self.send_btn.config(state=tk.NORMAL)
@@ -481,41 +856,38 @@ class StreamDisplayApp:
         # ✅ 强制显示最新：覆盖任何“被刷到顶部”的行为
         self.reply_text.see(tk.END)
 
+    def _reply_append_stream(self, text: str):
+        """
+        流式追加：只有视图本来就停在底部时才跟随；玩家向上翻看时不抢滚动条。
+        """
+        if not text:
+            return
+        at_bottom = self.reply_text.yview()[1] >= 0.999
+        self.reply_text.insert(tk.END, text)
+        if at_bottom:
+            self.reply_text.see(tk.END)
+
     # ---------------------------
     # History render
     # ---------------------------
 
     def safe_update_history(self):
         hist = self._agent_get_history() or []
-        keyword = self.history_filter_var.get().strip()
-
-        start_idx = 0
-        if len(hist) >= 3:
-            start_idx = 2
-
-        filtered = hist[start_idx:][::-1]
-
-        out_lines: list[str] = []
-        for msg in filtered:
-            role = msg.get("role", "unknown")
-            role_cn = {"system": "系统", "user": "玩家", "assistant": "主持人", "tool": "工具"}.get(role, role)
-
-            content = msg.get("content", "")
-            try:
-                content_txt = markdown_to_text(str(content))
-            except Exception:
-                content_txt = str(content)
-
-            if keyword and (keyword not in content_txt) and (keyword not in role_cn):
-                continue
-
-            out_lines.append("─" * 40)
-            out_lines.append(f"{role_cn}：")
-            out_lines.append(content_txt)
-            out_lines.append("")
-
-        self.history_text.delete("1.0", tk.END)
-        self.history_text.insert(tk.END, "\n".join(out_lines))
+        self.history_view.sync(hist)
+        self.history_view.set_filter(self.history_filter_var.get())
+
+    def _on_history_filter(self):
+        # 防抖：连续输入时只在停顿后查一次索引
+        if self._filter_after_id is not None:
+            self.root.after_cancel(self._filter_after_id)
+        self._filter_after_id = self.root.after(self._filter_delay_ms, self._apply_history_filter)
+
+    def _apply_history_filter(self):
+        self._filter_after_id = None
+        keyword = self.history_filter_var.get()
+        self.history_view.set_filter(keyword)
+        if keyword.strip():
+            self.status_var.set(f"历史搜索：{self.history_view.last_matches} 条匹配")
 
     # ---------------------------
     # Status render
@@ -550,47 +922,111 @@ class StreamDisplayApp:
     # ---------------------------
 
     def save_to_json(self, *, auto: bool):
-        hist = self._agent_get_history()
-        if not hist:
+        payload = self._build_save_payload(auto=auto)
+        if payload is None:
             self.safe_update_status("无历史可存档")
             return
+        self.safe_update_status(self._write_save(payload, auto=auto))
 
-        self.paths.save_dir.mkdir(parents=True, exist_ok=True)
+    def _build_save_payload(self, *, auto: bool) -> Optional[dict]:
+        """
+        在主线程生成存档快照（history 浅拷贝），写盘可以交给后台线程。
+        """
+        hist = self._agent_get_history()
+        if not hist:
+            return None
         ts = time.strftime("%Y%m%d_%H%M%S")
+        payload = {"history": list(hist), "status": dict(self.status), "meta": {"timestamp": ts, **self.session_meta}}
+        if hasattr(self.agent, "summary_state"):
+            payload["summary"] = self.agent.summary_state()
+        return payload
+
+    def _write_save(self, payload: dict, *, auto: bool) -> str:
+        """
+        整档写入（主线程）；每轮的自动存档走 _append_journal。
+        """
+        self.paths.save_dir.mkdir(parents=True, exist_ok=True)
+        ts = payload["meta"]["timestamp"]
         tag = "AUTO" if auto else "MANUAL"
         file_path = self.paths.save_dir / f"TRPG_SAVE_{tag}_{ts}.json"
 
-        payload = {"history": hist, "status": self.status, "meta": {"timestamp": ts}}
-
         try:
-            file_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-            self.safe_update_status(f"存档成功：{file_path.name}")
+            packed = dict(payload, history=self.blobs.pack_messages(payload["history"]))
+            self.fm.write_text_atomic(file_path, json.dumps(packed, ensure_ascii=False, indent=2))
+            self.maintenance.request()
+            return f"存档成功：{file_path.name}"
+        except Exception as e:
+            return f"存档失败：{e}"
+
+    def _append_journal(self, payload: dict, session_gen: int) -> str:
+        """
+        post-turn 线程调用。读档后（会话代号变化）的第一次自动存档写入新的日志文件，首行为完整快照。
+        """
+        journal = self._journal
+        if journal is None or self._journal_gen != session_gen:
+            ts = payload["meta"]["timestamp"]
+            journal = self._journal = SaveJournal(
+                self.paths.save_dir / f"TRPG_SAVE_AUTO_{ts}.jsonl", blobs=self.blobs, fm=self.fm
+            )
+            self._journal_gen = session_gen
+        try:
+            n = journal.append(payload)
+            self.maintenance.request(journal.path)
+            return f"自动存档：{journal.path.name}（+{n} 字节）"
         except Exception as e:
-            self.safe_update_status(f"存档失败：{e}")
+            return f"存档失败：{e}"
 
     def load_from_json(self):
-        initial = str(self.paths.save_dir) if self.paths.save_dir.exists() else str(self.paths.root)
-        fp = filedialog.askopenfilename(
-            title="选择存档文件",
-            initialdir=initial,
-            filetypes=[("JSON存档", "*.json"), ("所有文件", "*.*")]
-        )
+        # 先从存档索引里选：索引由后台维护线程保持更新，这里直接打开；
+        # 同时请求一次后台刷新，完成后重建列表（不在 Tk 线程里解析存档）
+        dlg = SaveBrowserDialog(self.root, self.maintenance.index)
+
+        def on_refreshed():
+            self.root.after(0, lambda: dlg.reload() if dlg.winfo_exists() else None)
+
+        self.maintenance.request(on_done=on_refreshed)
+        self.root.wait_window(dlg)
+        fp = str(dlg.result) if dlg.result else ""
+
+        if dlg.browse:
+            initial = str(self.paths.save_dir) if self.paths.save_dir.exists() else str(self.paths.root)
+            fp = filedialog.askopenfilename(
+                title="选择存档文件",
+                initialdir=initial,
+                filetypes=[("存档", "*.json *.jsonl"), ("JSON存档", "*.json"), ("自动存档日志", "*.jsonl"), ("所有文件", "*.*")]
+            )
         if not fp:
             self.safe_update_status("已取消读档")
             return
+        self._load_save_file(fp)
+
+    def search_saves(self):
+        dlg = SaveSearchDialog(self.root, self.save_search)
+        self.root.wait_window(dlg)
+        if dlg.result:
+            self._load_save_file(str(dlg.result))
 
+    def _load_save_file(self, fp: str):
         try:
-            data = json.loads(Path(fp).read_text(encoding="utf-8"))
+            if fp.endswith(".jsonl"):
+                data = SaveJournal.load(Path(fp), self.blobs)
+            else:
+                data = json.loads(Path(fp).read_text(encoding="utf-8"))
+            summary = None
             if isinstance(data, dict) and "history" in data:
                 hist = data["history"]
                 status = data.get("status", self.status)
+                summary = data.get("summary")
             elif isinstance(data, list):
                 hist = data
                 status = self.status
             else:
                 raise ValueError("存档格式不支持")
+            hist = self.blobs.unpack_messages(hist)
 
-            if hasattr(self.agent, "history"):
+            if hasattr(self.agent, "restore_history"):
+                self.agent.restore_history(hist, summary)
+            elif hasattr(self.agent, "history"):
                 self.agent.history = hist
             elif hasattr(self.agent, "kp_history"):
                 self.agent.kp_history = hist
@@ -600,6 +1036,13 @@ class StreamDisplayApp:
                 self.status = status
                 self.update_player_status(self.status, old_status=old_status)
 
+            # 读档后的自动存档写入新的日志文件（由 post-turn 线程按会话代号切换），排队中的旧任务作废
+            self._session_gen += 1
+            meta = data.get("meta", {}) if isinstance(data, dict) else {}
+            # 没有 campaign 的旧存档：读档后视为新的一局
+            self.session_meta = {"rule": meta.get("rule", ""), "story": meta.get("story", ""),
+                                 "campaign": meta.get("campaign") or uuid.uuid4().hex}
+
             self.safe_update_history()
             self.safe_update_status(f"读档成功：{Path(fp).name}")
 
@@ -618,12 +1061,13 @@ class StreamDisplayApp:
         file_path = self.paths.log_dir / f"TRPG_REPLAY_{ts}.txt"
 
         try:
-            with file_path.open("w", encoding="utf-8") as f:
-                for msg in hist:
-                    role = msg.get("role", "unknown")
-                    role_cn = {"system": "系统", "user": "玩家", "assistant": "主持人", "tool": "工具"}.get(role, role)
-                    content = msg.get("content", "")
-                    f.write(f"【{role_cn}】\n{content}\n" + "-" * 40 + "\n\n")
+            parts = []
+            for msg in hist:
+                role = msg.get("role", "unknown")
+                role_cn = {"system": "系统", "user": "玩家", "assistant": "主持人", "tool": "工具"}.get(role, role)
+                content = msg.get("content", "")
+                parts.append(f"【{role_cn}】\n{content}\n" + "-" * 40 + "\n\n")
+            self.fm.write_text_atomic(file_path, "".join(parts))
             self.safe_update_status(f"回放已导出：{file_path.name}")
         except Exception as e:
             self.safe_update_status(f"导出失败：{e}")
@@ -640,6 +1084,116 @@ class StreamDisplayApp:
         except Exception:
             pass
 
+    def _start_read_aloud(self):
+        """
+        主线程在每轮开始时调用：打断上一轮的朗读，勾选了朗读时为本轮准备分句器。
+        """
+        self._tts_seg = None
+        self._tts_first_audio_ms = None
+        if not (self.voice and self.read_var.get() and hasattr(self.voice, "begin_stream")):
+            return
+        self._tts_gen = self.voice.begin_stream()
+        self._tts_seg = SentenceSegmenter()
+
+    def _read_aloud(self, text: Optional[str]):
+        """
+        接收线程调用：把新到达的文本切句后送入朗读队列；text 为 None 表示本轮结束，送出剩余部分。
+        """
+        seg = self._tts_seg
+        if seg is None:
+            return
+        for sentence in (seg.flush() if text is None else seg.feed(text)):
+            self.voice.enqueue(sentence, self._tts_gen)
+
+    def _on_audio_start(self, gen: int, t: float):
+        # 朗读线程回调：只统计本轮流式朗读的第一次出声
+        if gen != self._tts_gen or self._tts_seg is None or self._ttft_ms is None:
+            return
+        ms = (t - self._stream_t0) * 1000 - self._ttft_ms
+        self._tts_first_audio_ms = ms
+        self.metrics.observe("turn.tts_first_audio_ms", ms)
+
+    # ---------------------------
+    # Voice input
+    # ---------------------------
+
+    def _on_toggle_listen(self):
+        if not self.listen_var.get():
+            if self.voice_input is not None:
+                self.voice_input.stop()
+            self.safe_update_status("语音输入已关闭")
+            return
+        if not self.voice_model.exists():
+            self.listen_var.set(False)
+            self.safe_update_status(f"未找到语音识别模型：{self.voice_model}")
+            return
+        if self.voice_input is None:
+            # 回调来自识别线程，统一投递回 Tk 主线程
+            self.voice_input = VoiceInput(
+                self.voice_model,
+                on_partial=lambda text: self.root.after(0, lambda: self._voice_partial(text)),
+                on_final=lambda text: self.root.after(0, lambda: self._voice_final(text)),
+                on_error=lambda e: self.root.after(0, lambda: self._voice_input_failed(e)),
+                muted=self._voice_busy,
+            )
+        self._start_listening()
+
+    def _start_listening(self):
+        # 期间又取消了勾选：不再启动
+        if not self.listen_var.get():
+            return
+        try:
+            started = self.voice_input.start(MicrophoneSource())
+        except Exception as e:
+            self._voice_input_failed(e)
+            return
+        if not started:
+            # 上一次的识别线程还没退出（多半在加载模型），稍后重试，不让界面误报已开启
+            self.safe_update_status("语音输入正在结束上一次识别，稍后自动开启…")
+            self.root.after(500, self._start_listening)
+            return
+        self.safe_update_status("语音输入已开启（首次使用需加载模型）")
+
+    def _voice_partial(self, text: str):
+        self._clear_voice_partial()
+        if text:
+            self.input_text.insert(tk.END, text, "voice_partial")
+            self.input_text.see(tk.END)
+
+    def _voice_busy(self) -> bool:
+        # 识别线程调用：朗读中（含刚说完的余音）不识别
+        return bool(self.voice is not None and getattr(self.voice, "busy", False))
+
+    def _voice_final(self, text: str):
+        """
+        一句话说完：输入框为空时填入并直接提交；玩家已经打了字、或回复还在生成时，追加到末尾等玩家确认。
+        """
+        self._clear_voice_partial()
+        # 识别结果投递过来时朗读已经开始：多半是朗读声的回音，丢弃
+        if self._voice_busy():
+            return
+        typed = self.input_text.get("1.0", tk.END).strip()
+        if typed or self.streaming:
+            sep = " " if typed else ""
+            self.input_text.insert(tk.END, sep + text)
+            self.input_text.see(tk.END)
+            self.safe_update_status("识别结果已追加到输入框，确认后点“下一步”")
+            return
+        self.input_text.insert("1.0", text)
+        self.process_input()
+
+    def _clear_voice_partial(self):
+        ranges = self.input_text.tag_ranges("voice_partial")
+        if ranges:
+            self.input_text.delete(ranges[0], ranges[-1])
+
+    def _voice_input_failed(self, error: BaseException):
+        self.listen_var.set(False)
+        if self.voice_input is not None:
+            self.voice_input.stop()
+        self._clear_voice_partial()
+        self.safe_update_status(f"语音输入失败：{error}")
+
     # ---------------------------
     # UI helpers
     # ---------------------------
@@ -649,6 +1203,9 @@ class StreamDisplayApp:
 
     def _on_toggle_read(self):
         self.flags.read_aloud = bool(self.read_var.get())
+        # 朗读线程按需启动：勾选时提前拉起，第一句不用再等后端初始化
+        if self.flags.read_aloud and self.voice is not None and hasattr(self.voice, "start"):
+            self.voice.start()
 
     def _on_toggle_autosave(self):
         self.flags.auto_save = bool(self.auto_save_var.get())
@@ -662,15 +1219,38 @@ class StreamDisplayApp:
     # ---------------------------
 
     def on_window_close(self):
+        self._post_turn_q.put(None)
+        self.maintenance.close()
+
         try:
             self.export_replay_txt()
         except Exception:
             pass
 
+        # 本次运行有完整回合时留一份指标，便于对比不同时间 / 不同服务商的延迟
+        if self.metrics.turns:
+            try:
+                self.metrics.export(self.paths.log_dir)
+            except Exception:
+                pass
+
+        try:
+            self.fm.flush()
+        except Exception:
+            pass
+
+        # 取消仍在进行的请求（叙述流 / 前情提要 / 先行状态），关闭连接池后停止事件循环
+        if self.loop is not None:
+            aclient = getattr(self.agent, "aclient", None)
+            self.loop.close(cleanup=aclient.aclose if aclient is not None else None)
+
         try:
             if self.voice and hasattr(self.voice, "close"):
                 self.voice.close()
         except Exception:
             pass
 
+        if self.voice_input is not None:
+            self.voice_input.stop()
+
         self.root.destroy()